@@ -8,11 +8,90 @@ class Settings(BaseSettings):
 
     MONGODB_URL: str
     MONGODB_DATABASE: str = "oficina_execucao"
+    MONGODB_VERIFICAR_INDICES: bool = True  # No startup, só avisa nos logs se faltam índices declarados
+
+    # Pool de conexões com o MongoDB
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 10  # Conexões abertas antes de a réplica ficar pronta
+    MONGODB_MAX_IDLE_TIME_MS: int | None = None  # Tempo máximo de uma conexão ociosa no pool; None mantém
+
+    # Roteamento de leituras por operação (replica set): primary, primaryPreferred,
+    # secondary, secondaryPreferred ou nearest. Leituras de item e das transições
+    # ficam sempre na primária.
+    MONGODB_LEITURA_LISTAGEM: str = "secondaryPreferred"
+    MONGODB_LEITURA_METRICAS: str = "secondaryPreferred"
+    MONGODB_LEITURA_EXPORTACAO: str = "secondaryPreferred"
+    MONGODB_MAX_STALENESS_SECONDS: int = 90  # Defasagem máxima aceita de uma secundária; mínimo do MongoDB: 90
+
+    # Prontidão (GET /health/ready)
+    PRONTIDAO_INTERVALO: float = 2.0  # Segundos entre tentativas das verificações pendentes
+    PRONTIDAO_EXIGE_OS: bool = True  # Exige conexão com o serviço de OS antes de receber tráfego
     SECRET_KEY: str
     ALGORITHM: str
     JWT_ISSUER: str
     JWT_AUDIENCE: str
     URL_API_OS: str  # URL do microsserviço de Ordem de Serviço
 
+    # Tracing do Datadog (ddtrace só é importado se habilitado)
+    TRACING_HABILITADO: bool = True
+    TRACING_INTEGRACOES: str = "fastapi,pymongo,httpx"  # Integrações instrumentadas, separadas por vírgula
+
+    # Pool de conexões com o serviço de OS
+    OS_HTTP_MAX_CONEXOES: int = 100
+    OS_HTTP_MAX_CONEXOES_KEEPALIVE: int = 20
+    OS_HTTP_KEEPALIVE_EXPIRY: float = 30.0  # Segundos que uma conexão ociosa fica no pool
+    OS_HTTP2: bool = False
+    OS_HTTP_TIMEOUT: float = 5.0
+    OS_HTTP_TIMEOUT_CONEXAO: float = 2.0
+    OS_URL_HEALTH: str = "/health"  # Caminho usado para abrir a primeira conexão do pool no startup
+
+    # Notificações de status agrupadas
+    OS_URL_LOTE_STATUS: str | None = None  # Caminho do endpoint de lote no serviço de OS; sem ele, um PATCH por OS
+    OS_NOTIFICACAO_JANELA: float = 0.05  # Segundos em que as atualizações são acumuladas antes do envio
+    OS_NOTIFICACAO_LOTE_MAXIMO: int = 100
+    OS_NOTIFICACAO_CONCORRENCIA: int = 10  # PATCHes simultâneos sem endpoint de lote
+
+    # Outbox de notificações para o serviço de OS
+    OUTBOX_HABILITADO: bool = True
+    OUTBOX_INTERVALO: float = 1.0  # Segundos entre varreduras quando não há pendências
+    OUTBOX_LOTE: int = 50  # Itens reservados por varredura
+    OUTBOX_LEASE: float = 30.0  # Segundos de posse exclusiva de um item por réplica
+    OUTBOX_MAX_TENTATIVAS: int = 8
+    OUTBOX_BACKOFF_BASE: float = 2.0
+    OUTBOX_BACKOFF_MAXIMO: float = 300.0
+
+    # Cache de leitura dos itens da fila (por fila_id e ordem_servico_id)
+    CACHE_FILA_HABILITADO: bool = True
+    CACHE_FILA_TAMANHO: int = 10000  # Itens mantidos em memória (LRU)
+    CACHE_FILA_TTL: float = 2.0  # Segundos; limita a defasagem em relação às escritas de outras réplicas
+
+    METRICAS_CACHE_TTL: float = 30.0  # Segundos em que as métricas agregadas da fila são reaproveitadas
+
+    # Visão da fila em memória alimentada por change stream (requer replica set)
+    VISAO_FILA_HABILITADA: bool = False
+    VISAO_FILA_RECONEXAO: float = 5.0  # Segundos até reabrir o change stream após uma queda
+
+    # Feed de eventos da fila (SSE); exige VISAO_FILA_HABILITADA, cujo change stream
+    # enxerga as escritas de todas as réplicas
+    SSE_HEARTBEAT: float = 15.0  # Segundos sem eventos até enviar um comentário de keep-alive
+    SSE_FILA_MAXIMA: int = 1000  # Eventos pendentes por conexão antes de desconectar o cliente lento
+    SSE_FONTE_LOCAL: bool = False  # Sem a visão, feed só com as escritas desta réplica (uma réplica, desenvolvimento)
+
+    # Totais diários de diagnósticos e reparos (fila_execucao_rollup)
+    ROLLUP_HABILITADO: bool = True
+    ROLLUP_INTERVALO: float = 300.0  # Segundos entre consolidações
+    ROLLUP_ATRASO: float = 60.0  # Segundos de folga para escritas em andamento antes da marca d'água
+    ROLLUP_JANELA_MAXIMA_DIAS: float = 7.0  # Dias consolidados por janela, no máximo (recuperação do histórico)
+    ROLLUP_PERIODO_MAXIMO: int = 366  # Dias aceitos por consulta
+
+    # Arquivamento dos itens finalizados em fila_execucao_historico
+    ARQUIVAMENTO_HABILITADO: bool = True
+    ARQUIVAMENTO_IDADE_DIAS: float = 7.0  # Dias desde a última alteração de um item FINALIZADA até o arquivamento
+    ARQUIVAMENTO_INTERVALO: float = 3600.0  # Segundos entre rodadas
+    ARQUIVAMENTO_LOTE: int = 500  # Itens movidos por lote
+
+    FILA_LOTE_MAXIMO: int = 1000  # Itens aceitos por requisição nos endpoints de lote
+    EXPORTACAO_TAMANHO_LOTE: int = 500  # Documentos lidos/escritos por lote na exportação
+
 
 settings = Settings()  # type: ignore
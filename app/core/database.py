@@ -1,17 +1,132 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.monitoring import ConnectionPoolListener
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
 from app.core.config import settings
 
 
+class MonitorPool(ConnectionPoolListener):
+    """Conexões prontas de cada pool do driver, pelos eventos CMAP.
+
+    Os eventos chegam pelas threads do driver; o estado fica sob um lock. Um
+    pool limpo (queda ou troca de primária) deixa de contar até ficar pronto
+    de novo, e as conexões dele saem conforme são fechadas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools_prontos: set = set()
+        self._conexoes: dict[tuple, set[int]] = defaultdict(set)
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        with self._lock:
+            self._pools_prontos.add(event.address)
+
+    def pool_cleared(self, event) -> None:
+        with self._lock:
+            self._pools_prontos.discard(event.address)
+
+    def pool_closed(self, event) -> None:
+        with self._lock:
+            self._pools_prontos.discard(event.address)
+            self._conexoes.pop(event.address, None)
+
+    def connection_created(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        with self._lock:
+            self._conexoes[event.address].add(event.connection_id)
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            self._conexoes[event.address].discard(event.connection_id)
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        pass
+
+    def connection_checked_out(self, event) -> None:
+        pass
+
+    def connection_checked_in(self, event) -> None:
+        pass
+
+    def conexoes_prontas(self) -> dict[tuple, int]:
+        """Conexões prontas por servidor, só dos pools prontos"""
+        with self._lock:
+            return {address: len(self._conexoes[address]) for address in self._pools_prontos}
+
+    def aquecido(self, minimo: int) -> bool:
+        """Todo pool pronto tem ao menos `minimo` conexões prontas (e há algum pool pronto)"""
+        if minimo <= 0:
+            return True
+        prontas = self.conexoes_prontas()
+        return bool(prontas) and all(quantidade >= minimo for quantidade in prontas.values())
+
+
 class MongoDB:
     client: AsyncIOMotorClient = None
     database: AsyncIOMotorDatabase = None
+    monitor: MonitorPool = None
 
 
 mongodb = MongoDB()
 
 
+def opcoes_pool() -> dict:
+    """Tamanho e ociosidade do pool de conexões, vindos de Settings"""
+    opcoes = {
+        "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+    }
+    if settings.MONGODB_MAX_IDLE_TIME_MS is not None:
+        opcoes["maxIdleTimeMS"] = settings.MONGODB_MAX_IDLE_TIME_MS
+    return opcoes
+
+
+MODOS_LEITURA = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def preferencia_leitura(modo: str) -> Primary | PrimaryPreferred | Secondary | SecondaryPreferred | Nearest:
+    """ReadPreference do modo configurado, limitada a MONGODB_MAX_STALENESS_SECONDS de defasagem"""
+    if modo == "primary":
+        return Primary()
+    if modo not in MODOS_LEITURA:
+        raise ValueError(f"Modo de leitura inválido: {modo}")
+    return MODOS_LEITURA[modo](max_staleness=settings.MONGODB_MAX_STALENESS_SECONDS)
+
+
+def validar_roteamento_leituras() -> None:
+    """Falha no startup, e não na primeira consulta, com um modo de leitura inválido"""
+    for modo in (
+        settings.MONGODB_LEITURA_LISTAGEM,
+        settings.MONGODB_LEITURA_METRICAS,
+        settings.MONGODB_LEITURA_EXPORTACAO,
+    ):
+        preferencia_leitura(modo)
+
+
 async def connect_to_mongo():
     """Conecta ao MongoDB"""
+    validar_roteamento_leituras()
+    # Um monitor por cliente: o estado de um cliente anterior não vale para o novo
+    monitor = mongodb.monitor = MonitorPool()
+    
     # Detectar se é MongoDB Atlas (usa TLS) ou local (sem TLS)
     use_tls = "mongodb+srv://" in settings.MONGODB_URL or "mongodb.net" in settings.MONGODB_URL
     
@@ -23,7 +138,11 @@ async def connect_to_mongo():
             tlsAllowInvalidCertificates=True,
             serverSelectionTimeoutMS=30000,
             connectTimeoutMS=30000,
-            socketTimeoutMS=30000
+            socketTimeoutMS=30000,
+            # Padrão do cliente; as leituras que toleram defasagem escolhem outra por coleção
+            readPreference="primary",
+            event_listeners=[monitor],
+            **opcoes_pool()
         )
     else:
         # MongoDB local sem TLS
@@ -31,18 +150,40 @@ async def connect_to_mongo():
             settings.MONGODB_URL,
             serverSelectionTimeoutMS=30000,
             connectTimeoutMS=30000,
-            socketTimeoutMS=30000
+            socketTimeoutMS=30000,
+            # Padrão do cliente; as leituras que toleram defasagem escolhem outra por coleção
+            readPreference="primary",
+            event_listeners=[monitor],
+            **opcoes_pool()
         )
     
     mongodb.database = mongodb.client[settings.MONGODB_DATABASE]
     
-    await mongodb.database.fila_execucao.create_index("ordem_servico_id", unique=True)
-    await mongodb.database.fila_execucao.create_index("status")
-    await mongodb.database.fila_execucao.create_index([("prioridade", -1), ("dta_criacao", 1)])
-    
+    # Os índices são criados por `python -m app.manage migrar`, não a cada startup
     print(f"Conectado ao MongoDB: {settings.MONGODB_DATABASE}")
 
 
+async def aquecer_pool_mongo():
+    """Abre MONGODB_MIN_POOL_SIZE conexões antes da primeira requisição.
+
+    Os pings simultâneos apressam a abertura, mas o driver abre no máximo
+    maxConnecting (2) conexões por vez e devolve o ping pela primeira livre:
+    o pool só é dado como aquecido quando o monitor viu MONGODB_MIN_POOL_SIZE
+    conexões prontas (ConnectionReadyEvent, handshake/TLS feito) em cada pool.
+    Falha depois de PRONTIDAO_INTERVALO segundos, para a prontidão tentar de novo.
+    """
+    minimo = settings.MONGODB_MIN_POOL_SIZE
+    await asyncio.gather(*(mongodb.database.command("ping") for _ in range(max(1, minimo))))
+    
+    prazo = time.monotonic() + settings.PRONTIDAO_INTERVALO
+    while not mongodb.monitor.aquecido(minimo):
+        if time.monotonic() >= prazo:
+            raise RuntimeError(
+                f"Pool do MongoDB abaixo de {minimo} conexões prontas: {mongodb.monitor.conexoes_prontas()}"
+            )
+        await asyncio.sleep(0.05)
+
+
 async def close_mongo_connection():
     """Fecha conexão com MongoDB"""
     if mongodb.client:
@@ -15,6 +15,14 @@ class StatusExecucaoInvalido(Exception):
         self.status_esperado = status_esperado
 
 
+class FeedFilaIndisponivelError(Exception):
+    pass
+
+
+class NotificacaoPendenteError(Exception):
+    pass
+
+
 def tratar_erro_dominio(exc: Exception) -> HTTPException:
     if isinstance(exc, ExecucaoNotFoundError):
         return HTTPException(status_code=404, detail='Execução não encontrada.')
@@ -25,6 +33,16 @@ def tratar_erro_dominio(exc: Exception) -> HTTPException:
             status_code=400,
             detail=f'Não é possível alterar o status de {exc.status_atual} para outro que não seja {exc.status_esperado}.',
         )
+    if isinstance(exc, FeedFilaIndisponivelError):
+        return HTTPException(
+            status_code=503,
+            detail='Feed de eventos indisponível: requer VISAO_FILA_HABILITADA (ou SSE_FONTE_LOCAL com uma réplica).',
+        )
+    if isinstance(exc, NotificacaoPendenteError):
+        return HTTPException(
+            status_code=409,
+            detail='Item com notificação de status ainda não entregue ao serviço de OS; tente novamente em instantes.',
+        )
     if isinstance(exc, ValueError):
         return HTTPException(status_code=400, detail=str(exc))
     return HTTPException(status_code=500, detail='Erro interno do servidor.')
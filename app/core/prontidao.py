@@ -0,0 +1,64 @@
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Awaitable, Callable
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class Prontidao:
+    """Verificações que precisam passar antes de a réplica receber tráfego.
+
+    Rodam em segundo plano depois do startup, repetidas a cada
+    PRONTIDAO_INTERVALO segundos até todas passarem. Uma vez pronta, a réplica
+    continua pronta: uma queda posterior do MongoDB tiraria todas as réplicas
+    do balanceador ao mesmo tempo, sem ganho para quem já estava conectado.
+    """
+
+    def __init__(self):
+        self._verificacoes: dict[str, Callable[[], Awaitable[None]]] = {}
+        self.estado: dict[str, bool] = {}
+        self._tarefa: asyncio.Task | None = None
+
+    @property
+    def pronta(self) -> bool:
+        return bool(self.estado) and all(self.estado.values())
+
+    def registrar(self, nome: str, verificacao: Callable[[], Awaitable[None]]) -> None:
+        self._verificacoes[nome] = verificacao
+        self.estado[nome] = False
+
+    def iniciar(self) -> None:
+        self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self) -> None:
+        if self._tarefa:
+            self._tarefa.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._tarefa
+            self._tarefa = None
+        self._verificacoes.clear()
+        self.estado.clear()
+
+    async def verificar(self) -> bool:
+        """Executa uma vez as verificações pendentes; retorna se a réplica ficou pronta"""
+        for nome, verificacao in self._verificacoes.items():
+            if self.estado[nome]:
+                continue
+            try:
+                await verificacao()
+                self.estado[nome] = True
+                logger.info(f"Verificação de prontidão concluída: {nome}")
+            except Exception as e:
+                logger.warning(f"Verificação de prontidão pendente ({nome}): {e}")
+        return self.pronta
+
+    async def _executar(self) -> None:
+        while not await self.verificar():
+            await asyncio.sleep(settings.PRONTIDAO_INTERVALO)
+
+
+prontidao = Prontidao()
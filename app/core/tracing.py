@@ -0,0 +1,38 @@
+"""Tracing do Datadog, ativado uma vez no startup e só para as integrações usadas.
+
+Substitui o `ddtrace-run` + `patch_all()`: o ddtrace só é importado quando
+TRACING_HABILITADO, e só as integrações de TRACING_INTEGRACOES são instrumentadas.
+"""
+from app.core.config import settings
+
+
+_tracer = None
+
+
+def iniciar_tracing() -> bool:
+    """Instrumenta as integrações configuradas; chamadas seguintes não fazem nada.
+
+    Deve ser chamada antes do import do FastAPI e dos drivers: a instrumentação
+    dos módulos ainda não importados acontece quando eles forem importados.
+    """
+    global _tracer
+    if _tracer is not None or not settings.TRACING_HABILITADO:
+        return _tracer is not None
+
+    from ddtrace import patch
+    from ddtrace.trace import tracer
+
+    integracoes = [nome.strip() for nome in settings.TRACING_INTEGRACOES.split(",") if nome.strip()]
+    patch(raise_errors=False, **{nome: True for nome in integracoes})
+    _tracer = tracer
+    return True
+
+
+def ids_span_atual() -> dict:
+    """trace_id/span_id do span ativo para correlação de logs; vazio sem tracing"""
+    if _tracer is None:
+        return {}
+    span = _tracer.current_span()
+    if not span:
+        return {}
+    return {"dd.trace_id": span.trace_id, "dd.span_id": span.span_id}
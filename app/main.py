@@ -1,6 +1,7 @@
-from ddtrace import patch_all
+from app.core.tracing import iniciar_tracing, ids_span_atual
 
-patch_all()
+# Antes dos imports do FastAPI e dos drivers, para que sejam instrumentados
+iniciar_tracing()
 
 import logging
 import sys
@@ -10,7 +11,17 @@ from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 
 from app.core.exceptions import tratar_erro_dominio
-from app.core.database import connect_to_mongo, close_mongo_connection
+from app.core.config import settings
+from app.core.database import aquecer_pool_mongo, connect_to_mongo, close_mongo_connection, get_database
+from app.core.prontidao import prontidao
+from app.modules.execucao.infrastructure.arquivamento import arquivador_fila_execucao
+from app.modules.execucao.infrastructure.cache import cache_fila_execucao
+from app.modules.execucao.infrastructure.indices import indices_pendentes
+from app.modules.execucao.infrastructure.notificador import notificador_ordem_servico
+from app.modules.execucao.infrastructure.ordem_servico_client import ordem_servico_client
+from app.modules.execucao.infrastructure.outbox import despachante_outbox
+from app.modules.execucao.infrastructure.rollup import consolidador_rollup_fila
+from app.modules.execucao.infrastructure.visao_fila import visao_fila_execucao
 from app.modules.execucao.presentation.routes import router as router_execucao
 
 
@@ -24,14 +35,7 @@ class JsonFormatter(logging.Formatter):
         }
 
         # Datadog correlation
-        try:
-            from ddtrace import tracer
-            span = tracer.current_span()
-            if span:
-                log["dd.trace_id"] = span.trace_id
-                log["dd.span_id"] = span.span_id
-        except Exception:
-            pass
+        log.update(ids_span_atual())
 
         return json.dumps(log)
 
@@ -50,15 +54,45 @@ app = FastAPI(
 )
 
 
+async def aquecer_mongodb():
+    """Prontidão: pool do MongoDB aberto até o mínimo configurado"""
+    await aquecer_pool_mongo()
+    if settings.MONGODB_VERIFICAR_INDICES:
+        pendentes = await indices_pendentes(get_database())
+        if pendentes:
+            logging.getLogger(__name__).warning(
+                f"Índices ausentes, execute `python -m app.manage migrar`: {', '.join(pendentes)}"
+            )
+
+
 @app.on_event("startup")
 async def startup_event():
-    """Evento de inicialização"""
+    """Evento de inicialização; o aquecimento das conexões segue em segundo plano"""
     await connect_to_mongo()
+    prontidao.registrar("mongodb", aquecer_mongodb)
+    if settings.PRONTIDAO_EXIGE_OS:
+        prontidao.registrar("ordem_servico", ordem_servico_client.aquecer)
+    prontidao.iniciar()
+    if settings.OUTBOX_HABILITADO:
+        despachante_outbox.iniciar(get_database())
+    if settings.VISAO_FILA_HABILITADA:
+        visao_fila_execucao.iniciar(get_database().fila_execucao)
+    if settings.ROLLUP_HABILITADO:
+        consolidador_rollup_fila.iniciar(get_database())
+    if settings.ARQUIVAMENTO_HABILITADO:
+        arquivador_fila_execucao.iniciar(get_database())
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Evento de encerramento"""
+    await prontidao.parar()
+    await visao_fila_execucao.parar()
+    await consolidador_rollup_fila.parar()
+    await arquivador_fila_execucao.parar()
+    await despachante_outbox.parar()
+    await notificador_ordem_servico.parar()
+    await ordem_servico_client.fechar()
     await close_mongo_connection()
 
 
@@ -67,9 +101,25 @@ app.include_router(router_execucao, tags=['Execução'])
 
 @app.get("/health")
 def health():
+    return {"status": "ok", "cache_fila": cache_fila_execucao.estatisticas()}
+
+
+@app.get("/health/live")
+def health_live():
+    """Liveness: o processo responde; não depende do MongoDB nem do serviço de OS"""
     return {"status": "ok"}
 
 
+@app.get("/health/ready")
+def health_ready():
+    """Readiness: pool do MongoDB aquecido e serviço de OS conectado"""
+    status_code = 200 if prontidao.pronta else 503
+    return JSONResponse(
+        status_code=status_code,
+        content={"status": "ok" if prontidao.pronta else "aguardando", "verificacoes": prontidao.estado},
+    )
+
+
 @app.exception_handler(Exception)
 async def handle_exceptions(request, exc):
     http_exception = tratar_erro_dominio(exc)
@@ -0,0 +1,67 @@
+"""Comandos de manutenção executados fora do ciclo de vida da API.
+
+Uso:
+    python -m app.manage migrar            # migrações de dados e sincronização dos índices
+    python -m app.manage indices           # só a sincronização dos índices
+    python -m app.manage verificar-indices # lista os índices pendentes (código de saída 1 se houver)
+"""
+import argparse
+import asyncio
+
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.modules.execucao.infrastructure.indices import indices_pendentes, sincronizar_indices
+from app.modules.execucao.infrastructure.migrations import executar_migracoes
+
+
+async def migrar() -> int:
+    """Aplica as migrações de dados e sincroniza os índices declarados"""
+    await connect_to_mongo()
+    try:
+        resultados = await executar_migracoes(get_database())
+        for nome, resultado in resultados.items():
+            print(f"{nome}: {resultado}")
+    finally:
+        await close_mongo_connection()
+    return 0
+
+
+async def indices() -> int:
+    """Cria os índices declarados que faltam e remove os não declarados"""
+    await connect_to_mongo()
+    try:
+        diferencas = await sincronizar_indices(get_database())
+        for colecao, diferenca in diferencas.items():
+            print(f"{colecao}: criados {diferenca['criar']}, removidos {diferenca['remover']}")
+    finally:
+        await close_mongo_connection()
+    return 0
+
+
+async def verificar_indices() -> int:
+    """Lista os índices declarados que ainda não existem, sem alterar nada"""
+    await connect_to_mongo()
+    try:
+        pendentes = await indices_pendentes(get_database())
+    finally:
+        await close_mongo_connection()
+    for nome in pendentes:
+        print(f"pendente: {nome}")
+    return 1 if pendentes else 0
+
+
+COMANDOS = {
+    "migrar": migrar,
+    "indices": indices,
+    "verificar-indices": verificar_indices,
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    parser.add_argument("comando", choices=sorted(COMANDOS))
+    args = parser.parse_args(argv)
+    return asyncio.run(COMANDOS[args.comando]())
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,4 +1,5 @@
-from datetime import datetime
+from datetime import date, datetime
+from enum import StrEnum
 from pydantic import BaseModel
 
 from app.modules.execucao.domain.entities import StatusExecucao, PrioridadeExecucao
@@ -20,11 +21,99 @@ class FilaExecucaoOutputDTO(BaseModel):
     dta_atualizacao: datetime
 
 
+class FilaExecucaoParcialOutputDTO(BaseModel):
+    """Item da listagem com apenas os campos pedidos em `fields` (só documenta o contrato)"""
+    fila_id: str | None = None
+    ordem_servico_id: int | None = None
+    status: StatusExecucao | None = None
+    prioridade: PrioridadeExecucao | None = None
+    mecanico_responsavel_id: int | None = None
+    diagnostico: str | None = None
+    observacoes_reparo: str | None = None
+    dta_inicio_diagnostico: datetime | None = None
+    dta_fim_diagnostico: datetime | None = None
+    dta_inicio_reparo: datetime | None = None
+    dta_fim_reparo: datetime | None = None
+    dta_criacao: datetime | None = None
+    dta_atualizacao: datetime | None = None
+
+
+class FilaExecucaoPaginaJSONOutputDTO(BaseModel):
+    """Página da fila já serializada (lista JSON de itens) e a sua versão, para o ETag.
+
+    `conteudo` é None quando o cliente já tem essa versão.
+    """
+    conteudo: bytes | None
+    versao: str
+    next_cursor: str | None = None
+
+
+class FilaExecucaoMetricasOutputDTO(BaseModel):
+    """Métricas da coleção ativa da fila.
+
+    Os itens FINALIZADA arquivados (sem alteração há ARQUIVAMENTO_IDADE_DIAS
+    dias) não entram em `total`, `por_status`, `por_prioridade` nem nas
+    durações; `arquivados` traz quantos já estão no histórico. Totais por dia
+    de todo o período ficam em GET /fila-execucao/rollups.
+    """
+    total: int
+    por_status: dict[StatusExecucao, int]
+    por_prioridade: dict[PrioridadeExecucao, int]
+    duracao_media_diagnostico_segundos: float | None = None
+    duracao_media_reparo_segundos: float | None = None
+    arquivados: int = 0
+    dta_calculo: datetime
+
+
+class RollupDiarioOutputDTO(BaseModel):
+    dia: date
+    prioridade: PrioridadeExecucao
+    mecanico_responsavel_id: int | None = None
+    diagnosticos_iniciados: int
+    diagnosticos_finalizados: int
+    reparos_iniciados: int
+    reparos_finalizados: int
+    duracao_media_diagnostico_segundos: float | None = None
+    duracao_media_reparo_segundos: float | None = None
+
+
+class FilaExecucaoRollupOutputDTO(BaseModel):
+    consolidado_ate: datetime | None = None
+    dias: list[RollupDiarioOutputDTO]
+
+
+class FormatoExportacao(StrEnum):
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+
+
+class TipoEventoFila(StrEnum):
+    ADICIONADO = 'ADICIONADO'
+    TRANSICIONADO = 'TRANSICIONADO'
+    REPRIORIZADO = 'REPRIORIZADO'
+    ATUALIZADO = 'ATUALIZADO'
+    REMOVIDO = 'REMOVIDO'
+
+
+class EventoFilaOutputDTO(BaseModel):
+    """Evento do feed da fila; `fila` traz o item completo, exceto em REMOVIDO"""
+    tipo: TipoEventoFila
+    fila_id: str
+    fila: FilaExecucaoOutputDTO | None = None
+
+
 class FilaExecucaoCriacaoInputDTO(BaseModel):
     ordem_servico_id: int
     prioridade: PrioridadeExecucao = PrioridadeExecucao.NORMAL
 
 
+class FilaExecucaoLoteItemOutputDTO(BaseModel):
+    ordem_servico_id: int
+    criado: bool
+    fila: FilaExecucaoOutputDTO | None = None
+    erro: str | None = None
+
+
 class IniciarDiagnosticoInputDTO(BaseModel):
     mecanico_responsavel_id: int
 
@@ -43,3 +132,29 @@ class FinalizarReparoInputDTO(BaseModel):
 
 class AtualizarPrioridadeInputDTO(BaseModel):
     prioridade: PrioridadeExecucao
+
+
+class OperacaoFila(StrEnum):
+    ATUALIZAR_PRIORIDADE = 'ATUALIZAR_PRIORIDADE'
+    INICIAR_DIAGNOSTICO = 'INICIAR_DIAGNOSTICO'
+    FINALIZAR_DIAGNOSTICO = 'FINALIZAR_DIAGNOSTICO'
+    INICIAR_REPARO = 'INICIAR_REPARO'
+    FINALIZAR_REPARO = 'FINALIZAR_REPARO'
+
+
+class OperacaoFilaInputDTO(BaseModel):
+    """Operação do lote; os campos usados dependem da operação, como nas rotas individuais"""
+    fila_id: str
+    operacao: OperacaoFila
+    prioridade: PrioridadeExecucao | None = None
+    mecanico_responsavel_id: int | None = None
+    diagnostico: str | None = None
+    observacoes_reparo: str | None = None
+
+
+class OperacaoFilaResultadoOutputDTO(BaseModel):
+    fila_id: str
+    operacao: OperacaoFila
+    aplicada: bool
+    fila: FilaExecucaoOutputDTO | None = None
+    erro: str | None = None
@@ -1,5 +1,17 @@
 from abc import ABC, abstractmethod
-from app.modules.execucao.domain.entities import FilaExecucao, StatusExecucao
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import AsyncIterator
+from app.modules.execucao.domain.entities import FilaExecucao, PrioridadeExecucao, StatusExecucao
+
+
+@dataclass
+class AlteracaoFila:
+    """Alteração condicional de um item, como em `atualizar_campos`, para aplicação em lote"""
+    fila_id: str
+    alteracoes: dict
+    status_esperado: StatusExecucao | None = None
+    status_os: str | None = None
 
 
 class IFilaExecucaoRepository(ABC):
@@ -8,6 +20,10 @@ class IFilaExecucaoRepository(ABC):
     async def salvar(self, fila: FilaExecucao) -> FilaExecucao:
         pass
     
+    @abstractmethod
+    async def salvar_lote(self, filas: list[FilaExecucao]) -> list[FilaExecucao | None]:
+        pass
+    
     @abstractmethod
     async def buscar_por_id(self, fila_id: str) -> FilaExecucao | None:
         pass
@@ -17,17 +33,76 @@ class IFilaExecucaoRepository(ABC):
         pass
     
     @abstractmethod
-    async def listar_por_status(self, status: StatusExecucao) -> list[FilaExecucao]:
+    async def listar_por_status(
+        self, status: StatusExecucao, limite: int | None = None, cursor: str | None = None
+    ) -> list[FilaExecucao]:
+        pass
+    
+    @abstractmethod
+    async def listar_todas(self, limite: int | None = None, cursor: str | None = None) -> list[FilaExecucao]:
         pass
     
     @abstractmethod
-    async def listar_todas(self) -> list[FilaExecucao]:
+    async def listar_projetado(
+        self,
+        status: StatusExecucao | None,
+        projecao: dict,
+        limite: int | None = None,
+        cursor: str | None = None,
+    ) -> list[dict]:
+        pass
+    
+    @abstractmethod
+    async def calcular_metricas(self) -> dict:
+        pass
+    
+    @abstractmethod
+    def iterar_lotes(
+        self, status: StatusExecucao | None = None, tamanho_lote: int = 500
+    ) -> AsyncIterator[list[FilaExecucao]]:
+        pass
+    
+    @abstractmethod
+    async def atualizar_campos(
+        self,
+        fila_id: str,
+        alteracoes: dict,
+        status_esperado: StatusExecucao | None = None,
+        status_os: str | None = None,
+    ) -> FilaExecucao | None:
+        pass
+    
+    @abstractmethod
+    async def atualizar_campos_lote(self, alteracoes: list[AlteracaoFila]) -> list[tuple[bool, FilaExecucao | None]]:
+        pass
+    
+    @abstractmethod
+    async def reivindicar_proxima(
+        self, status_esperado: StatusExecucao, alteracoes: dict, status_os: str | None = None
+    ) -> FilaExecucao | None:
+        pass
+    
+    @abstractmethod
+    async def remover(self, fila_id: str) -> bool:
+        pass
+
+
+class IRollupFilaRepository(ABC):
+    
+    @abstractmethod
+    async def consolidar(self) -> bool:
         pass
     
     @abstractmethod
-    async def atualizar(self, fila: FilaExecucao) -> FilaExecucao:
+    async def listar(
+        self,
+        inicio: date,
+        fim: date,
+        prioridade: PrioridadeExecucao | None = None,
+        mecanico_responsavel_id: int | None = None,
+    ) -> list[dict]:
         pass
     
     @abstractmethod
-    async def remover(self, fila_id: str) -> None:
+    async def marca_dagua(self) -> datetime | None:
         pass
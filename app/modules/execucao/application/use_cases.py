@@ -1,28 +1,67 @@
+import asyncio
+from abc import ABC, abstractmethod
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from datetime import datetime
-import httpx
+from datetime import date, datetime
+from typing import AsyncIterator
+from pydantic import TypeAdapter, ValidationError
 
 from app.core.config import settings
 from app.modules.execucao.domain.entities import FilaExecucao, StatusExecucao, PrioridadeExecucao
 from app.modules.execucao.application.dto import (
     FilaExecucaoOutputDTO,
+    FilaExecucaoPaginaJSONOutputDTO,
+    FilaExecucaoMetricasOutputDTO,
+    FilaExecucaoRollupOutputDTO,
+    RollupDiarioOutputDTO,
     FilaExecucaoCriacaoInputDTO,
+    FilaExecucaoLoteItemOutputDTO,
     IniciarDiagnosticoInputDTO,
     FinalizarDiagnosticoInputDTO,
     IniciarReparoInputDTO,
     FinalizarReparoInputDTO,
     AtualizarPrioridadeInputDTO,
+    FormatoExportacao,
+    OperacaoFila,
+    OperacaoFilaInputDTO,
+    OperacaoFilaResultadoOutputDTO,
+    EventoFilaOutputDTO,
+    TipoEventoFila,
 )
+from app.modules.execucao.application.interfaces import AlteracaoFila
 from app.modules.execucao.infrastructure.mapper import FilaExecucaoMapper
-from app.modules.execucao.infrastructure.repositories import FilaExecucaoRepository
-from app.core.exceptions import FilaExecucaoNotFoundError, StatusExecucaoInvalido
+from app.modules.execucao.infrastructure.exportacao import (
+    cabecalho_csv,
+    compactar_gzip,
+    serializar_csv,
+    serializar_ndjson,
+)
+from app.modules.execucao.infrastructure.eventos import (
+    EventoFila, feed_disponivel, formatar_sse, publicador_eventos_fila,
+)
+from app.modules.execucao.infrastructure.serializacao import CAMPOS_SAIDA, documentos_to_json, entidades_to_json
+from app.modules.execucao.infrastructure.paginacao import codificar_cursor, codificar_cursor_documento, versao_pagina
+from app.modules.execucao.infrastructure.cache import cache_metricas_fila, criar_repositorio
+from app.modules.execucao.infrastructure.visao_fila import visao_fila_execucao
+from app.modules.execucao.infrastructure.rollup import RollupFilaRepository
+from app.core.exceptions import (
+    FeedFilaIndisponivelError,
+    FilaExecucaoNotFoundError,
+    NotificacaoPendenteError,
+    StatusExecucaoInvalido,
+    tratar_erro_dominio,
+)
+
+
+def versao_conhecida(versao: str, versoes_conhecidas: set[str]) -> bool:
+    """If-None-Match: a versão enviada pelo cliente, ou `*` (qualquer representação atual)"""
+    return versao in versoes_conhecidas or "*" in versoes_conhecidas
 
 
 class AdicionarFilaExecucaoUseCase:
     """Adiciona uma nova Ordem de Serviço à fila de execução"""
     
     def __init__(self, db: AsyncIOMotorDatabase):
-        self.repo = FilaExecucaoRepository(db)
+        self.repo = criar_repositorio(db)
     
     async def execute(self, dados: FilaExecucaoCriacaoInputDTO) -> FilaExecucaoOutputDTO:
         # Verifica se a OS já está na fila
@@ -41,155 +80,159 @@ class AdicionarFilaExecucaoUseCase:
         return FilaExecucaoMapper.entity_to_output_dto(fila_salva)
 
 
-class IniciarDiagnosticoUseCase:
-    """Inicia o diagnóstico de uma OS na fila"""
+class AdicionarFilaExecucaoLoteUseCase:
+    """Adiciona várias Ordens de Serviço à fila de execução de uma vez"""
     
     def __init__(self, db: AsyncIOMotorDatabase):
-        self.repo = FilaExecucaoRepository(db)
+        self.repo = criar_repositorio(db)
     
-    async def execute(self, fila_id: str, dados: IniciarDiagnosticoInputDTO) -> FilaExecucaoOutputDTO:
-        fila = await self.repo.buscar_por_id(fila_id)
-        if not fila:
-            raise FilaExecucaoNotFoundError()
+    async def execute(self, dados: list[FilaExecucaoCriacaoInputDTO]) -> list[FilaExecucaoLoteItemOutputDTO]:
+        if len(dados) > settings.FILA_LOTE_MAXIMO:
+            raise ValueError(f"O lote aceita no máximo {settings.FILA_LOTE_MAXIMO} itens.")
+        if not dados:
+            return []
         
-        if fila.status != StatusExecucao.AGUARDANDO:
-            raise StatusExecucaoInvalido(fila.status, StatusExecucao.AGUARDANDO)
+        filas = [
+            FilaExecucao(
+                fila_id=None,
+                ordem_servico_id=item.ordem_servico_id,
+                status=StatusExecucao.AGUARDANDO,
+                prioridade=item.prioridade,
+            )
+            for item in dados
+        ]
         
-        fila.status = StatusExecucao.EM_DIAGNOSTICO
-        fila.mecanico_responsavel_id = dados.mecanico_responsavel_id
-        fila.dta_inicio_diagnostico = datetime.now()
+        # Sem pré-consulta: duplicidades são detectadas pelo índice único
+        salvas = await self.repo.salvar_lote(filas)
         
-        fila_atualizada = await self.repo.atualizar(fila)
-        
-        # Atualiza status na OS
-        await self._atualizar_status_os(fila.ordem_servico_id, 'EM_DIAGNOSTICO')
-        
-        return FilaExecucaoMapper.entity_to_output_dto(fila_atualizada)
-    
-    async def _atualizar_status_os(self, ordem_servico_id: int, status: str):
-        """Comunica com o serviço de OS para atualizar o status"""
-        try:
-            url = f"{settings.URL_API_OS}/ordens_servico/{ordem_servico_id}/status"
-            async with httpx.AsyncClient() as client:
-                await client.patch(url, json={"status": status}, timeout=5.0)
-        except Exception as e:
-            # Log do erro, mas não falha a operação
-            print(f"Erro ao atualizar status da OS {ordem_servico_id}: {e}")
+        return [
+            FilaExecucaoLoteItemOutputDTO(
+                ordem_servico_id=item.ordem_servico_id,
+                criado=True,
+                fila=FilaExecucaoMapper.entity_to_output_dto(fila),
+            )
+            if fila else
+            FilaExecucaoLoteItemOutputDTO(
+                ordem_servico_id=item.ordem_servico_id,
+                criado=False,
+                erro=f"Ordem de Serviço {item.ordem_servico_id} já está na fila de execução.",
+            )
+            for item, fila in zip(dados, salvas)
+        ]
 
 
-class FinalizarDiagnosticoUseCase:
-    """Finaliza o diagnóstico e salva as informações"""
+class TransicaoFilaUseCase(ABC):
+    """Base das transições de status da fila.
+
+    Cada transição é aplicada em uma única operação atômica, condicionada ao
+    status esperado, e registra no outbox a notificação para o serviço de OS.
+    """
+    
+    STATUS_ESPERADO: StatusExecucao
+    STATUS_OS: str
     
     def __init__(self, db: AsyncIOMotorDatabase):
-        self.repo = FilaExecucaoRepository(db)
+        self.repo = criar_repositorio(db)
+    
+    @staticmethod
+    @abstractmethod
+    def alteracoes(dados) -> dict:
+        """Campos alterados pela transição, a partir dos dados recebidos"""
     
-    async def execute(self, fila_id: str, dados: FinalizarDiagnosticoInputDTO) -> FilaExecucaoOutputDTO:
+    async def execute(self, fila_id: str, dados) -> FilaExecucaoOutputDTO:
+        fila = await self.repo.atualizar_campos(
+            fila_id, self.alteracoes(dados), status_esperado=self.STATUS_ESPERADO, status_os=self.STATUS_OS
+        )
+        if not fila:
+            raise await self._erro_transicao(fila_id)
+        return FilaExecucaoMapper.entity_to_output_dto(fila)
+    
+    async def _erro_transicao(self, fila_id: str) -> Exception:
+        """Distingue item inexistente de status inválido (só no caminho de erro)"""
         fila = await self.repo.buscar_por_id(fila_id)
+        if not fila:
+            return FilaExecucaoNotFoundError()
+        return StatusExecucaoInvalido(fila.status, self.STATUS_ESPERADO)
+
+
+class IniciarDiagnosticoUseCase(TransicaoFilaUseCase):
+    """Inicia o diagnóstico de uma OS na fila"""
+    
+    STATUS_ESPERADO = StatusExecucao.AGUARDANDO
+    STATUS_OS = 'EM_DIAGNOSTICO'
+    
+    @staticmethod
+    def alteracoes(dados: IniciarDiagnosticoInputDTO) -> dict:
+        return {
+            "status": StatusExecucao.EM_DIAGNOSTICO,
+            "mecanico_responsavel_id": dados.mecanico_responsavel_id,
+            "dta_inicio_diagnostico": datetime.now(),
+        }
+    
+    async def execute_proxima(self, dados: IniciarDiagnosticoInputDTO) -> FilaExecucaoOutputDTO:
+        """Atribui ao mecânico o próximo item da fila e inicia seu diagnóstico"""
+        fila = await self.repo.reivindicar_proxima(
+            self.STATUS_ESPERADO, self.alteracoes(dados), status_os=self.STATUS_OS
+        )
         if not fila:
             raise FilaExecucaoNotFoundError()
-        
-        if fila.status != StatusExecucao.EM_DIAGNOSTICO:
-            raise StatusExecucaoInvalido(fila.status, StatusExecucao.EM_DIAGNOSTICO)
-        
-        fila.diagnostico = dados.diagnostico
-        fila.dta_fim_diagnostico = datetime.now()
-        # Após diagnóstico, volta para aguardando aprovação
-        fila.status = StatusExecucao.AGUARDANDO
-        
-        fila_atualizada = await self.repo.atualizar(fila)
-        
-        # Atualiza status na OS para AGUARDANDO_APROVACAO
-        await self._atualizar_status_os(fila.ordem_servico_id, 'AGUARDANDO_APROVACAO')
-        
-        return FilaExecucaoMapper.entity_to_output_dto(fila_atualizada)
+        return FilaExecucaoMapper.entity_to_output_dto(fila)
+
+
+class FinalizarDiagnosticoUseCase(TransicaoFilaUseCase):
+    """Finaliza o diagnóstico e salva as informações"""
     
-    async def _atualizar_status_os(self, ordem_servico_id: int, status: str):
-        """Comunica com o serviço de OS para atualizar o status"""
-        try:
-            url = f"{settings.URL_API_OS}/ordens_servico/{ordem_servico_id}/status"
-            async with httpx.AsyncClient() as client:
-                await client.patch(url, json={"status": status}, timeout=5.0)
-        except Exception as e:
-            print(f"Erro ao atualizar status da OS {ordem_servico_id}: {e}")
+    STATUS_ESPERADO = StatusExecucao.EM_DIAGNOSTICO
+    STATUS_OS = 'AGUARDANDO_APROVACAO'
+    
+    @staticmethod
+    def alteracoes(dados: FinalizarDiagnosticoInputDTO) -> dict:
+        return {
+            "diagnostico": dados.diagnostico,
+            "dta_fim_diagnostico": datetime.now(),
+            # Após diagnóstico, volta para aguardando aprovação
+            "status": StatusExecucao.AGUARDANDO,
+        }
 
 
-class IniciarReparoUseCase:
+class IniciarReparoUseCase(TransicaoFilaUseCase):
     """Inicia o reparo após aprovação do orçamento"""
     
-    def __init__(self, db: AsyncIOMotorDatabase):
-        self.repo = FilaExecucaoRepository(db)
+    # Pode iniciar reparo se estiver aguardando (após aprovação)
+    STATUS_ESPERADO = StatusExecucao.AGUARDANDO
+    STATUS_OS = 'EM_EXECUCAO'
     
-    async def execute(self, fila_id: str, dados: IniciarReparoInputDTO) -> FilaExecucaoOutputDTO:
-        fila = await self.repo.buscar_por_id(fila_id)
-        if not fila:
-            raise FilaExecucaoNotFoundError()
-        
-        # Pode iniciar reparo se estiver aguardando (após aprovação)
-        if fila.status != StatusExecucao.AGUARDANDO:
-            raise StatusExecucaoInvalido(fila.status, StatusExecucao.AGUARDANDO)
-        
-        fila.status = StatusExecucao.EM_REPARO
+    @staticmethod
+    def alteracoes(dados: IniciarReparoInputDTO) -> dict:
+        alteracoes = {
+            "status": StatusExecucao.EM_REPARO,
+            "dta_inicio_reparo": datetime.now(),
+        }
         if dados.mecanico_responsavel_id:
-            fila.mecanico_responsavel_id = dados.mecanico_responsavel_id
-        fila.dta_inicio_reparo = datetime.now()
-        
-        fila_atualizada = await self.repo.atualizar(fila)
-        
-        # Atualiza status na OS
-        await self._atualizar_status_os(fila.ordem_servico_id, 'EM_EXECUCAO')
-        
-        return FilaExecucaoMapper.entity_to_output_dto(fila_atualizada)
-    
-    async def _atualizar_status_os(self, ordem_servico_id: int, status: str):
-        """Comunica com o serviço de OS para atualizar o status"""
-        try:
-            url = f"{settings.URL_API_OS}/ordens_servico/{ordem_servico_id}/status"
-            async with httpx.AsyncClient() as client:
-                await client.patch(url, json={"status": status}, timeout=5.0)
-        except Exception as e:
-            print(f"Erro ao atualizar status da OS {ordem_servico_id}: {e}")
+            alteracoes["mecanico_responsavel_id"] = dados.mecanico_responsavel_id
+        return alteracoes
 
 
-class FinalizarReparoUseCase:
+class FinalizarReparoUseCase(TransicaoFilaUseCase):
     """Finaliza o reparo e remove da fila"""
     
-    def __init__(self, db: AsyncIOMotorDatabase):
-        self.repo = FilaExecucaoRepository(db)
-    
-    async def execute(self, fila_id: str, dados: FinalizarReparoInputDTO) -> FilaExecucaoOutputDTO:
-        fila = await self.repo.buscar_por_id(fila_id)
-        if not fila:
-            raise FilaExecucaoNotFoundError()
-        
-        if fila.status != StatusExecucao.EM_REPARO:
-            raise StatusExecucaoInvalido(fila.status, StatusExecucao.EM_REPARO)
-        
-        fila.status = StatusExecucao.FINALIZADA
-        fila.observacoes_reparo = dados.observacoes_reparo
-        fila.dta_fim_reparo = datetime.now()
-        
-        fila_atualizada = await self.repo.atualizar(fila)
-        
-        # Atualiza status na OS
-        await self._atualizar_status_os(fila.ordem_servico_id, 'FINALIZADA')
-        
-        return FilaExecucaoMapper.entity_to_output_dto(fila_atualizada)
+    STATUS_ESPERADO = StatusExecucao.EM_REPARO
+    STATUS_OS = 'FINALIZADA'
     
-    async def _atualizar_status_os(self, ordem_servico_id: int, status: str):
-        """Comunica com o serviço de OS para atualizar o status"""
-        try:
-            url = f"{settings.URL_API_OS}/ordens_servico/{ordem_servico_id}/status"
-            async with httpx.AsyncClient() as client:
-                await client.patch(url, json={"status": status}, timeout=5.0)
-        except Exception as e:
-            print(f"Erro ao atualizar status da OS {ordem_servico_id}: {e}")
+    @staticmethod
+    def alteracoes(dados: FinalizarReparoInputDTO) -> dict:
+        return {
+            "status": StatusExecucao.FINALIZADA,
+            "observacoes_reparo": dados.observacoes_reparo,
+            "dta_fim_reparo": datetime.now(),
+        }
 
 
 class ConsultarFilaExecucaoUseCase:
     """Consulta itens da fila de execução"""
     
-    def __init__(self, db: AsyncIOMotorDatabase):
-        self.repo = FilaExecucaoRepository(db)
+    def __init__(self, db: AsyncIOMotorDatabase, leitura_secundaria: bool = True):
+        self.repo = criar_repositorio(db, leitura_secundaria)
     
     async def execute_por_id(self, fila_id: str) -> FilaExecucaoOutputDTO:
         fila = await self.repo.buscar_por_id(fila_id)
@@ -203,41 +246,350 @@ class ConsultarFilaExecucaoUseCase:
             raise FilaExecucaoNotFoundError()
         return FilaExecucaoMapper.entity_to_output_dto(fila)
     
+    async def execute_versionado_por_id(
+        self, fila_id: str, versoes_conhecidas: set[str]
+    ) -> tuple[str, FilaExecucaoOutputDTO | None]:
+        """Retorna a versão do item e o DTO, ou None no lugar do DTO se o cliente já tem essa versão"""
+        fila = await self.repo.buscar_por_id(fila_id)
+        if not fila:
+            raise FilaExecucaoNotFoundError()
+        return self._versionar(fila, versoes_conhecidas)
+    
+    async def execute_versionado_por_ordem_servico(
+        self, ordem_servico_id: int, versoes_conhecidas: set[str]
+    ) -> tuple[str, FilaExecucaoOutputDTO | None]:
+        fila = await self.repo.buscar_por_ordem_servico(ordem_servico_id)
+        if not fila:
+            raise FilaExecucaoNotFoundError()
+        return self._versionar(fila, versoes_conhecidas)
+    
+    @staticmethod
+    def _versionar(fila: FilaExecucao, versoes_conhecidas: set[str]) -> tuple[str, FilaExecucaoOutputDTO | None]:
+        versao = f"{fila.fila_id}-{fila.dta_atualizacao.timestamp():.3f}"
+        if versao_conhecida(versao, versoes_conhecidas):
+            return versao, None
+        return versao, FilaExecucaoMapper.entity_to_output_dto(fila)
+    
     async def execute_por_status(self, status: StatusExecucao) -> list[FilaExecucaoOutputDTO]:
-        filas = await self.repo.listar_por_status(status)
+        filas = await self._listar(status)
         return [FilaExecucaoMapper.entity_to_output_dto(fila) for fila in filas]
     
     async def execute_listar_todas(self) -> list[FilaExecucaoOutputDTO]:
-        filas = await self.repo.listar_todas()
+        filas = await self._listar(None)
         return [FilaExecucaoMapper.entity_to_output_dto(fila) for fila in filas]
+    
+    async def execute_paginado_json(
+        self,
+        status: StatusExecucao | None,
+        limite: int,
+        cursor: str | None = None,
+        campos: list[str] | None = None,
+        versoes_conhecidas: set[str] = frozenset(),
+    ) -> FilaExecucaoPaginaJSONOutputDTO:
+        """Uma página da fila, serializada direto dos documentos para JSON.
+
+        Sem entidades nem DTOs no caminho: os documentos vêm do MongoDB só com os
+        campos de saída (ou os pedidos em `campos`) e viram bytes em uma única passada.
+        Se o cliente já tem a versão da página, o conteúdo não é serializado (None).
+        """
+        if campos:
+            invalidos = [campo for campo in campos if campo not in CAMPOS_SAIDA]
+            if invalidos:
+                raise ValueError(f"Campos inválidos em fields: {', '.join(invalidos)}.")
+        campos = campos or CAMPOS_SAIDA
+        
+        filas = visao_fila_execucao.listar(status, limite + 1, cursor)
+        if filas is not None:
+            next_cursor = codificar_cursor(filas[limite - 1]) if len(filas) > limite else None
+            filas = filas[:limite]
+            versao = versao_pagina([(fila.fila_id, fila.dta_atualizacao) for fila in filas], next_cursor, campos)
+            return FilaExecucaoPaginaJSONOutputDTO(
+                conteudo=None if versao_conhecida(versao, versoes_conhecidas) else entidades_to_json(filas, campos),
+                versao=versao,
+                next_cursor=next_cursor,
+            )
+        
+        documents = await self.repo.listar_projetado(
+            status, FilaExecucaoMapper.projecao(campos), limite + 1, cursor
+        )
+        next_cursor = codificar_cursor_documento(documents[limite - 1]) if len(documents) > limite else None
+        documents = documents[:limite]
+        versao = versao_pagina(
+            [(str(document["_id"]), document["dta_atualizacao"]) for document in documents], next_cursor, campos
+        )
+        return FilaExecucaoPaginaJSONOutputDTO(
+            conteudo=None if versao_conhecida(versao, versoes_conhecidas) else documentos_to_json(documents, campos),
+            versao=versao,
+            next_cursor=next_cursor,
+        )
+    
+    async def _listar(
+        self, status: StatusExecucao | None, limite: int | None = None, cursor: str | None = None
+    ) -> list[FilaExecucao]:
+        """Responde pela visão em memória quando ela está pronta; senão, pelo MongoDB"""
+        filas = visao_fila_execucao.listar(status, limite, cursor)
+        if filas is not None:
+            return filas
+        if status:
+            return await self.repo.listar_por_status(status, limite, cursor)
+        return await self.repo.listar_todas(limite, cursor)
+
+
+class ConsultarMetricasFilaUseCase:
+    """Métricas agregadas da fila, reaproveitadas por METRICAS_CACHE_TTL segundos"""
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.repo = criar_repositorio(db)
+    
+    async def execute(self) -> FilaExecucaoMetricasOutputDTO:
+        return await cache_metricas_fila.obter(self._calcular)
+    
+    async def _calcular(self) -> FilaExecucaoMetricasOutputDTO:
+        metricas = await self.repo.calcular_metricas()
+        por_status = {status: metricas["por_status"].get(status.value, 0) for status in StatusExecucao}
+        return FilaExecucaoMetricasOutputDTO(
+            total=sum(por_status.values()),
+            por_status=por_status,
+            por_prioridade={
+                prioridade: metricas["por_prioridade"].get(prioridade.value, 0) for prioridade in PrioridadeExecucao
+            },
+            duracao_media_diagnostico_segundos=metricas["duracao_media_diagnostico"],
+            duracao_media_reparo_segundos=metricas["duracao_media_reparo"],
+            arquivados=metricas["arquivados"],
+            dta_calculo=datetime.now(),
+        )
+
+
+class ConsultarRollupFilaUseCase:
+    """Totais diários já consolidados, sem varrer a fila"""
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.repo = RollupFilaRepository(db)
+    
+    async def execute(
+        self,
+        inicio: date,
+        fim: date,
+        prioridade: PrioridadeExecucao | None = None,
+        mecanico_responsavel_id: int | None = None,
+    ) -> FilaExecucaoRollupOutputDTO:
+        if fim < inicio:
+            raise ValueError("Data final anterior à data inicial.")
+        if (fim - inicio).days >= settings.ROLLUP_PERIODO_MAXIMO:
+            raise ValueError(f"Período maior que {settings.ROLLUP_PERIODO_MAXIMO} dias.")
+        
+        consolidado_ate, documents = await asyncio.gather(
+            self.repo.marca_dagua(),
+            self.repo.listar(inicio, fim, prioridade, mecanico_responsavel_id),
+        )
+        return FilaExecucaoRollupOutputDTO(
+            consolidado_ate=consolidado_ate,
+            dias=[self._to_dto(document) for document in documents],
+        )
+    
+    @staticmethod
+    def _to_dto(document: dict) -> RollupDiarioOutputDTO:
+        return RollupDiarioOutputDTO(
+            **document,
+            duracao_media_diagnostico_segundos=_media_segundos(
+                document["duracao_diagnostico_ms"], document["diagnosticos_finalizados"]
+            ),
+            duracao_media_reparo_segundos=_media_segundos(
+                document["duracao_reparo_ms"], document["reparos_finalizados"]
+            ),
+        )
+
+
+class ExportarFilaExecucaoUseCase:
+    """Exporta a fila de execução em NDJSON ou CSV, lote a lote"""
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.repo = criar_repositorio(db)
+    
+    def execute(
+        self, status: StatusExecucao | None, formato: FormatoExportacao, compactar: bool = False
+    ) -> AsyncIterator[bytes]:
+        partes = self._serializar(status, formato)
+        if compactar:
+            return compactar_gzip(partes)
+        return partes
+    
+    async def _serializar(self, status: StatusExecucao | None, formato: FormatoExportacao) -> AsyncIterator[bytes]:
+        if formato == FormatoExportacao.CSV:
+            yield cabecalho_csv()
+        serializar = serializar_csv if formato == FormatoExportacao.CSV else serializar_ndjson
+        
+        async for filas in self.repo.iterar_lotes(status, settings.EXPORTACAO_TAMANHO_LOTE):
+            yield serializar([FilaExecucaoMapper.entity_to_output_dto(fila) for fila in filas])
+
+
+class AcompanharFilaExecucaoUseCase:
+    """Feed da fila em Server-Sent Events: um snapshot e depois só as alterações"""
+    
+    SNAPSHOT = TypeAdapter(list[FilaExecucaoOutputDTO])
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        # Publicado só pelas escritas desta réplica, o feed perderia as das demais
+        if not feed_disponivel():
+            raise FeedFilaIndisponivelError()
+        # O snapshot vem da primária: numa secundária atrasada, alterações já
+        # publicadas antes da assinatura poderiam faltar nele
+        self.consulta = ConsultarFilaExecucaoUseCase(db, leitura_secundaria=False)
+    
+    async def execute(self, status: StatusExecucao | None = None) -> AsyncIterator[str]:
+        # Assina antes do snapshot: uma alteração concorrente pode chegar repetida,
+        # nunca perdida (os eventos trazem o item completo e podem ser reaplicados)
+        assinatura = publicador_eventos_fila.assinar()
+        try:
+            if status:
+                itens = await self.consulta.execute_por_status(status)
+            else:
+                itens = await self.consulta.execute_listar_todas()
+            yield formatar_sse("snapshot", self.SNAPSHOT.dump_json(itens).decode())
+            
+            while True:
+                try:
+                    evento = await asyncio.wait_for(assinatura.get(), settings.SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if evento is None:
+                    # Cliente atrasado ou eventos perdidos: reconecta e recebe novo snapshot
+                    return
+                
+                dto = self._filtrar(evento, status)
+                if dto:
+                    yield formatar_sse(dto.tipo, dto.model_dump_json())
+        finally:
+            publicador_eventos_fila.cancelar(assinatura)
+    
+    @staticmethod
+    def _filtrar(evento: EventoFila, status: StatusExecucao | None) -> EventoFilaOutputDTO | None:
+        """Com filtro de status, um item que sai do status chega ao cliente como REMOVIDO"""
+        if evento.fila is None:
+            return EventoFilaOutputDTO(tipo=evento.tipo, fila_id=evento.fila_id)
+        if status and evento.fila.status != status:
+            if evento.tipo == TipoEventoFila.TRANSICIONADO:
+                return EventoFilaOutputDTO(tipo=TipoEventoFila.REMOVIDO, fila_id=evento.fila_id)
+            return None
+        return EventoFilaOutputDTO(
+            tipo=evento.tipo,
+            fila_id=evento.fila_id,
+            fila=FilaExecucaoMapper.entity_to_output_dto(evento.fila),
+        )
 
 
 class AtualizarPrioridadeUseCase:
     """Atualiza a prioridade de uma OS na fila"""
     
     def __init__(self, db: AsyncIOMotorDatabase):
-        self.repo = FilaExecucaoRepository(db)
+        self.repo = criar_repositorio(db)
     
     async def execute(self, fila_id: str, dados: AtualizarPrioridadeInputDTO) -> FilaExecucaoOutputDTO:
-        fila = await self.repo.buscar_por_id(fila_id)
+        fila = await self.repo.atualizar_campos(fila_id, {"prioridade": dados.prioridade})
         if not fila:
             raise FilaExecucaoNotFoundError()
         
-        fila.prioridade = dados.prioridade
-        fila_atualizada = await self.repo.atualizar(fila)
+        return FilaExecucaoMapper.entity_to_output_dto(fila)
+
+
+class AplicarOperacoesLoteUseCase:
+    """Aplica em lote alterações de prioridade e transições de status.
+
+    As transições seguem as mesmas regras das rotas individuais (status esperado,
+    alterações e notificação da OS via outbox), mas todas vão em um único
+    bulk_write; o resultado informa cada operação.
+    """
+    
+    TRANSICOES = {
+        OperacaoFila.INICIAR_DIAGNOSTICO: (IniciarDiagnosticoUseCase, IniciarDiagnosticoInputDTO),
+        OperacaoFila.FINALIZAR_DIAGNOSTICO: (FinalizarDiagnosticoUseCase, FinalizarDiagnosticoInputDTO),
+        OperacaoFila.INICIAR_REPARO: (IniciarReparoUseCase, IniciarReparoInputDTO),
+        OperacaoFila.FINALIZAR_REPARO: (FinalizarReparoUseCase, FinalizarReparoInputDTO),
+    }
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.repo = criar_repositorio(db)
+    
+    async def execute(self, operacoes: list[OperacaoFilaInputDTO]) -> list[OperacaoFilaResultadoOutputDTO]:
+        if len(operacoes) > settings.FILA_LOTE_MAXIMO:
+            raise ValueError(f"O lote aceita no máximo {settings.FILA_LOTE_MAXIMO} operações.")
+        
+        erros: dict[int, str] = {}
+        validas: dict[int, AlteracaoFila] = {}
+        vistos = set()
+        for indice, operacao in enumerate(operacoes):
+            # A ordem entre operações do mesmo item não é garantida em um bulk_write não ordenado
+            if operacao.fila_id in vistos:
+                erros[indice] = "Item repetido no lote."
+                continue
+            vistos.add(operacao.fila_id)
+            try:
+                validas[indice] = self._alteracao(operacao)
+            except ValueError as e:
+                erros[indice] = str(e)
+        
+        aplicadas = dict(zip(validas, await self.repo.atualizar_campos_lote(list(validas.values()))))
+        
+        resultado = []
+        for indice, operacao in enumerate(operacoes):
+            if indice in erros:
+                resultado.append(OperacaoFilaResultadoOutputDTO(
+                    fila_id=operacao.fila_id, operacao=operacao.operacao, aplicada=False, erro=erros[indice]
+                ))
+                continue
+            
+            aplicada, fila = aplicadas[indice]
+            erro = None
+            if not fila:
+                erro = tratar_erro_dominio(FilaExecucaoNotFoundError()).detail
+            elif not aplicada:
+                erro = tratar_erro_dominio(StatusExecucaoInvalido(fila.status, validas[indice].status_esperado)).detail
+            resultado.append(OperacaoFilaResultadoOutputDTO(
+                fila_id=operacao.fila_id,
+                operacao=operacao.operacao,
+                aplicada=aplicada,
+                fila=FilaExecucaoMapper.entity_to_output_dto(fila) if fila else None,
+                erro=erro,
+            ))
+        return resultado
+    
+    def _alteracao(self, operacao: OperacaoFilaInputDTO) -> AlteracaoFila:
+        if operacao.operacao == OperacaoFila.ATUALIZAR_PRIORIDADE:
+            if not operacao.prioridade:
+                raise ValueError("Campo obrigatório para ATUALIZAR_PRIORIDADE: prioridade.")
+            return AlteracaoFila(operacao.fila_id, {"prioridade": operacao.prioridade})
         
-        return FilaExecucaoMapper.entity_to_output_dto(fila_atualizada)
+        transicao, input_dto = self.TRANSICOES[operacao.operacao]
+        try:
+            dados = input_dto.model_validate(operacao.model_dump())
+        except ValidationError as e:
+            campos = ", ".join(str(erro["loc"][0]) for erro in e.errors())
+            raise ValueError(f"Campo obrigatório para {operacao.operacao}: {campos}.")
+        return AlteracaoFila(
+            operacao.fila_id,
+            transicao.alteracoes(dados),
+            status_esperado=transicao.STATUS_ESPERADO,
+            status_os=transicao.STATUS_OS,
+        )
 
 
 class RemoverDaFilaUseCase:
-    """Remove uma OS da fila (cancelamento)"""
+    """Remove uma OS da fila (cancelamento).
+
+    Um item com notificações de status ainda no outbox não é removido: o
+    cancelamento espera o despachante entregá-las (ou movê-las para outbox_falhas).
+    """
     
     def __init__(self, db: AsyncIOMotorDatabase):
-        self.repo = FilaExecucaoRepository(db)
+        self.repo = criar_repositorio(db)
     
     async def execute(self, fila_id: str) -> None:
-        fila = await self.repo.buscar_por_id(fila_id)
-        if not fila:
+        if not await self.repo.remover(fila_id):
+            if await self.repo.buscar_por_id(fila_id):
+                raise NotificacaoPendenteError()
             raise FilaExecucaoNotFoundError()
-        
-        await self.repo.remover(fila_id)
+
+
+def _media_segundos(total_ms: float, quantidade: int) -> float | None:
+    return total_ms / quantidade / 1000 if quantidade else None
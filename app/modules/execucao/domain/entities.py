@@ -16,6 +16,19 @@ class PrioridadeExecucao(StrEnum):
     ALTA = 'ALTA'
     URGENTE = 'URGENTE'
 
+    @property
+    def peso(self) -> int:
+        """Peso numérico usado na ordenação da fila (maior primeiro)"""
+        return PESO_PRIORIDADE[self]
+
+
+PESO_PRIORIDADE: dict[PrioridadeExecucao, int] = {
+    PrioridadeExecucao.BAIXA: 1,
+    PrioridadeExecucao.NORMAL: 2,
+    PrioridadeExecucao.ALTA: 3,
+    PrioridadeExecucao.URGENTE: 4,
+}
+
 
 @dataclass
 class FilaExecucao:
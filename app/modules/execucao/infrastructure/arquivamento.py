@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from contextlib import suppress
+from datetime import datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+
+from app.core.config import settings
+from app.modules.execucao.application.dto import TipoEventoFila
+from app.modules.execucao.domain.entities import StatusExecucao
+from app.modules.execucao.infrastructure.cache import cache_fila_execucao
+from app.modules.execucao.infrastructure.eventos import EventoFila, publicacao_local, publicador_eventos_fila
+from app.modules.execucao.infrastructure.rollup import RollupFilaRepository
+
+
+logger = logging.getLogger(__name__)
+
+
+class ArquivadorFilaExecucao:
+    """Move os itens FINALIZADA antigos de `fila_execucao` para `fila_execucao_historico`.
+
+    A coleção ativa (e seus índices) fica com o que ainda está sendo trabalhado
+    e os finalizados recentes. Cada lote é copiado para o histórico antes de
+    ser removido, então uma falha no meio só repete a cópia na próxima rodada.
+    """
+
+    def __init__(self):
+        self._tarefa: asyncio.Task | None = None
+
+    def iniciar(self, db: AsyncIOMotorDatabase) -> None:
+        self._tarefa = asyncio.create_task(self._executar(db))
+
+    async def parar(self) -> None:
+        if self._tarefa:
+            self._tarefa.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._tarefa
+            self._tarefa = None
+
+    async def _executar(self, db: AsyncIOMotorDatabase) -> None:
+        while True:
+            try:
+                arquivados = await self.arquivar(db)
+                if arquivados:
+                    logger.info(f"{arquivados} itens finalizados movidos para o histórico")
+            except Exception as e:
+                logger.error(f"Erro ao arquivar itens finalizados: {e}")
+            await asyncio.sleep(settings.ARQUIVAMENTO_INTERVALO)
+
+    async def arquivar(self, db: AsyncIOMotorDatabase) -> int:
+        """Arquiva, lote a lote, os itens elegíveis agora; retorna quantos saíram da fila ativa"""
+        limite = await self._limite(db)
+        if limite is None:
+            return 0
+
+        # Itens com notificação pendente no outbox ficam até a entrega
+        filtro = {
+            "status": StatusExecucao.FINALIZADA.value,
+            "dta_atualizacao": {"$lt": limite},
+            "outbox_disponivel_em": {"$exists": False},
+        }
+        total = 0
+        while True:
+            documents = await db.fila_execucao.find(filtro).limit(settings.ARQUIVAMENTO_LOTE).to_list(length=None)
+            if not documents:
+                return total
+            total += await self._mover(db, filtro, documents)
+            if len(documents) < settings.ARQUIVAMENTO_LOTE:
+                return total
+
+    async def _limite(self, db: AsyncIOMotorDatabase) -> datetime | None:
+        """Data de corte; nunca à frente dos totais diários, que leem da coleção ativa"""
+        limite = datetime.now() - timedelta(days=settings.ARQUIVAMENTO_IDADE_DIAS)
+        if not settings.ROLLUP_HABILITADO:
+            return limite
+        marca_dagua = await RollupFilaRepository(db).marca_dagua()
+        return min(limite, marca_dagua) if marca_dagua else None
+
+    async def _mover(self, db: AsyncIOMotorDatabase, filtro: dict, documents: list[dict]) -> int:
+        ids = [document["_id"] for document in documents]
+        await db.fila_execucao_historico.bulk_write(
+            [ReplaceOne({"_id": document["_id"]}, document, upsert=True) for document in documents],
+            ordered=False,
+        )
+        # O filtro é repetido: um item alterado depois da leitura fica na fila ativa
+        await db.fila_execucao.delete_many({**filtro, "_id": {"$in": ids}})
+        restantes = set(await db.fila_execucao.distinct("_id", {"_id": {"$in": ids}}))
+        if restantes:
+            # A cópia já gravada no histórico ficou velha: o item segue ativo
+            await db.fila_execucao_historico.delete_many({"_id": {"$in": list(restantes)}})
+
+        arquivados = [document for document in documents if document["_id"] not in restantes]
+        for document in arquivados:
+            fila_id = str(document["_id"])
+            cache_fila_execucao.invalidar(fila_id)
+            # Com a visão da fila, o change stream publica a remoção
+            if publicacao_local():
+                publicador_eventos_fila.publicar(EventoFila(TipoEventoFila.REMOVIDO, fila_id))
+        return len(arquivados)
+
+
+arquivador_fila_execucao = ArquivadorFilaExecucao()
@@ -0,0 +1,225 @@
+import asyncio
+import copy
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.config import settings
+from app.modules.execucao.domain.entities import FilaExecucao, StatusExecucao
+from app.modules.execucao.application.interfaces import AlteracaoFila, IFilaExecucaoRepository
+from app.modules.execucao.infrastructure.repositories import FilaExecucaoRepository
+
+
+class CacheFilaExecucao:
+    """Cache LRU com TTL dos itens da fila, por fila_id e por ordem_servico_id.
+
+    Os itens ficam indexados por fila_id; ordem_servico_id aponta para o fila_id.
+    O TTL limita por quanto tempo uma escrita feita por outra réplica pode não
+    ser vista aqui; as escritas desta réplica invalidam o cache na hora.
+    """
+
+    def __init__(self, tamanho_maximo: int, ttl: float):
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self.acertos = 0
+        self.falhas = 0
+        self._itens: OrderedDict[str, tuple[float, FilaExecucao]] = OrderedDict()
+        self._por_ordem_servico: dict[int, str] = {}
+        # Incrementada a cada invalidação: uma leitura iniciada antes dela não é guardada
+        self.versao = 0
+
+    def buscar_por_id(self, fila_id: str) -> FilaExecucao | None:
+        item = self._itens.get(fila_id)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                self._descartar(fila_id)
+            self.falhas += 1
+            return None
+        self._itens.move_to_end(fila_id)
+        self.acertos += 1
+        return copy.copy(item[1])
+
+    def buscar_por_ordem_servico(self, ordem_servico_id: int) -> FilaExecucao | None:
+        fila_id = self._por_ordem_servico.get(ordem_servico_id)
+        if fila_id is None:
+            self.falhas += 1
+            return None
+        return self.buscar_por_id(fila_id)
+
+    def guardar(self, fila: FilaExecucao, versao: int) -> None:
+        """Guarda o item lido do banco, se nada foi invalidado desde o início da leitura"""
+        if versao != self.versao:
+            return
+        self._itens[fila.fila_id] = (time.monotonic() + self.ttl, copy.copy(fila))
+        self._itens.move_to_end(fila.fila_id)
+        self._por_ordem_servico[fila.ordem_servico_id] = fila.fila_id
+        while len(self._itens) > self.tamanho_maximo:
+            self._descartar(next(iter(self._itens)))
+
+    def invalidar(self, fila_id: str | None = None, ordem_servico_id: int | None = None) -> None:
+        self.versao += 1
+        if ordem_servico_id is not None:
+            fila_id = self._por_ordem_servico.pop(ordem_servico_id, None) or fila_id
+        if fila_id is not None:
+            self._descartar(fila_id)
+
+    def limpar(self) -> None:
+        self.versao += 1
+        self._itens.clear()
+        self._por_ordem_servico.clear()
+        self.acertos = 0
+        self.falhas = 0
+
+    def estatisticas(self) -> dict:
+        return {"itens": len(self._itens), "acertos": self.acertos, "falhas": self.falhas}
+
+    def _descartar(self, fila_id: str) -> None:
+        item = self._itens.pop(fila_id, None)
+        if item and self._por_ordem_servico.get(item[1].ordem_servico_id) == fila_id:
+            del self._por_ordem_servico[item[1].ordem_servico_id]
+
+
+cache_fila_execucao = CacheFilaExecucao(settings.CACHE_FILA_TAMANHO, settings.CACHE_FILA_TTL)
+
+
+class CacheValor:
+    """Guarda um único valor calculado por `ttl` segundos.
+
+    Chamadas concorrentes com o valor expirado esperam um único recálculo.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._valor: Any = None
+        self._expira_em = 0.0
+        self._trava = asyncio.Lock()
+
+    async def obter(self, calcular: Callable[[], Awaitable[Any]]) -> Any:
+        if time.monotonic() < self._expira_em:
+            return self._valor
+        async with self._trava:
+            if time.monotonic() >= self._expira_em:
+                self._valor = await calcular()
+                self._expira_em = time.monotonic() + self.ttl
+        return self._valor
+
+    def limpar(self) -> None:
+        self._valor = None
+        self._expira_em = 0.0
+
+
+cache_metricas_fila = CacheValor(settings.METRICAS_CACHE_TTL)
+
+
+class FilaExecucaoRepositoryCache(IFilaExecucaoRepository):
+    """Repositório com leitura via cache das consultas por fila_id e ordem_servico_id.
+
+    Delega tudo ao repositório envolvido; toda escrita invalida os itens afetados.
+    """
+
+    def __init__(self, repo: IFilaExecucaoRepository, cache: CacheFilaExecucao = cache_fila_execucao):
+        self.repo = repo
+        self.cache = cache
+
+    async def salvar(self, fila: FilaExecucao) -> FilaExecucao:
+        try:
+            return await self.repo.salvar(fila)
+        finally:
+            self.cache.invalidar(ordem_servico_id=fila.ordem_servico_id)
+
+    async def salvar_lote(self, filas: list[FilaExecucao]) -> list[FilaExecucao | None]:
+        try:
+            return await self.repo.salvar_lote(filas)
+        finally:
+            for fila in filas:
+                self.cache.invalidar(ordem_servico_id=fila.ordem_servico_id)
+
+    async def buscar_por_id(self, fila_id: str) -> FilaExecucao | None:
+        fila = self.cache.buscar_por_id(fila_id)
+        if fila:
+            return fila
+        versao = self.cache.versao
+        fila = await self.repo.buscar_por_id(fila_id)
+        if fila:
+            self.cache.guardar(fila, versao)
+        return fila
+
+    async def buscar_por_ordem_servico(self, ordem_servico_id: int) -> FilaExecucao | None:
+        fila = self.cache.buscar_por_ordem_servico(ordem_servico_id)
+        if fila:
+            return fila
+        versao = self.cache.versao
+        fila = await self.repo.buscar_por_ordem_servico(ordem_servico_id)
+        if fila:
+            self.cache.guardar(fila, versao)
+        return fila
+
+    async def listar_por_status(
+        self, status: StatusExecucao, limite: int | None = None, cursor: str | None = None
+    ) -> list[FilaExecucao]:
+        return await self.repo.listar_por_status(status, limite, cursor)
+
+    async def listar_todas(self, limite: int | None = None, cursor: str | None = None) -> list[FilaExecucao]:
+        return await self.repo.listar_todas(limite, cursor)
+
+    async def calcular_metricas(self) -> dict:
+        return await self.repo.calcular_metricas()
+
+    async def listar_projetado(
+        self,
+        status: StatusExecucao | None,
+        projecao: dict,
+        limite: int | None = None,
+        cursor: str | None = None,
+    ) -> list[dict]:
+        return await self.repo.listar_projetado(status, projecao, limite, cursor)
+
+    def iterar_lotes(
+        self, status: StatusExecucao | None = None, tamanho_lote: int = 500
+    ) -> AsyncIterator[list[FilaExecucao]]:
+        return self.repo.iterar_lotes(status, tamanho_lote)
+
+    async def atualizar_campos(
+        self,
+        fila_id: str,
+        alteracoes: dict,
+        status_esperado: StatusExecucao | None = None,
+        status_os: str | None = None,
+    ) -> FilaExecucao | None:
+        # Invalida depois da escrita; a troca de versão impede que uma leitura
+        # iniciada antes dela guarde o estado anterior
+        try:
+            return await self.repo.atualizar_campos(fila_id, alteracoes, status_esperado, status_os)
+        finally:
+            self.cache.invalidar(fila_id)
+
+    async def atualizar_campos_lote(self, alteracoes: list[AlteracaoFila]) -> list[tuple[bool, FilaExecucao | None]]:
+        try:
+            return await self.repo.atualizar_campos_lote(alteracoes)
+        finally:
+            for alteracao in alteracoes:
+                self.cache.invalidar(alteracao.fila_id)
+
+    async def reivindicar_proxima(
+        self, status_esperado: StatusExecucao, alteracoes: dict, status_os: str | None = None
+    ) -> FilaExecucao | None:
+        fila = await self.repo.reivindicar_proxima(status_esperado, alteracoes, status_os)
+        if fila:
+            self.cache.invalidar(fila.fila_id)
+        return fila
+
+    async def remover(self, fila_id: str) -> bool:
+        try:
+            return await self.repo.remover(fila_id)
+        finally:
+            self.cache.invalidar(fila_id)
+
+
+def criar_repositorio(db: AsyncIOMotorDatabase, leitura_secundaria: bool = True) -> IFilaExecucaoRepository:
+    """Repositório usado pelos casos de uso: com cache, salvo se desabilitado"""
+    repo = FilaExecucaoRepository(db, leitura_secundaria)
+    if not settings.CACHE_FILA_HABILITADO:
+        return repo
+    return FilaExecucaoRepositoryCache(repo)
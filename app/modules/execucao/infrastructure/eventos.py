@@ -0,0 +1,77 @@
+import asyncio
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.modules.execucao.application.dto import TipoEventoFila
+from app.modules.execucao.domain.entities import FilaExecucao
+
+
+@dataclass
+class EventoFila:
+    tipo: TipoEventoFila
+    fila_id: str
+    fila: FilaExecucao | None = None
+
+
+def tipo_evento_alteracao(alteracoes: dict) -> TipoEventoFila:
+    """Classifica uma alteração de campos: mudança de status tem precedência"""
+    if "status" in alteracoes:
+        return TipoEventoFila.TRANSICIONADO
+    if "prioridade" in alteracoes:
+        return TipoEventoFila.REPRIORIZADO
+    return TipoEventoFila.ATUALIZADO
+
+
+def feed_disponivel() -> bool:
+    """O feed só é completo com o change stream da visão ou, explicitamente, com uma réplica só"""
+    return settings.VISAO_FILA_HABILITADA or settings.SSE_FONTE_LOCAL
+
+
+def publicacao_local() -> bool:
+    """Escritas desta réplica publicadas direto no feed, sem passar pelo change stream"""
+    return settings.SSE_FONTE_LOCAL and not settings.VISAO_FILA_HABILITADA
+
+
+def formatar_sse(evento: str, dados: str) -> str:
+    return f"event: {evento}\ndata: {dados}\n\n"
+
+
+class PublicadorEventosFila:
+    """Distribui as alterações da fila para os assinantes do feed desta réplica.
+
+    Cada assinante tem uma fila limitada a SSE_FILA_MAXIMA eventos; um assinante
+    que não acompanha recebe None e é desconectado, para recarregar o snapshot
+    ao reconectar.
+    """
+
+    def __init__(self):
+        self._assinantes: set[asyncio.Queue] = set()
+
+    def assinar(self) -> asyncio.Queue:
+        assinatura = asyncio.Queue(maxsize=settings.SSE_FILA_MAXIMA)
+        self._assinantes.add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura: asyncio.Queue) -> None:
+        self._assinantes.discard(assinatura)
+
+    def publicar(self, evento: EventoFila) -> None:
+        for assinatura in list(self._assinantes):
+            try:
+                assinatura.put_nowait(evento)
+            except asyncio.QueueFull:
+                self._encerrar(assinatura)
+
+    def encerrar_assinaturas(self) -> None:
+        """Desconecta todos os assinantes, quando eventos podem ter sido perdidos"""
+        for assinatura in list(self._assinantes):
+            self._encerrar(assinatura)
+
+    def _encerrar(self, assinatura: asyncio.Queue) -> None:
+        self._assinantes.discard(assinatura)
+        while not assinatura.empty():
+            assinatura.get_nowait()
+        assinatura.put_nowait(None)
+
+
+publicador_eventos_fila = PublicadorEventosFila()
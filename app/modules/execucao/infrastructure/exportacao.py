@@ -0,0 +1,45 @@
+import csv
+import io
+import zlib
+from typing import AsyncIterator
+
+from app.modules.execucao.application.dto import FilaExecucaoOutputDTO, FormatoExportacao
+
+
+COLUNAS_CSV = list(FilaExecucaoOutputDTO.model_fields)
+
+MEDIA_TYPES = {
+    FormatoExportacao.NDJSON: "application/x-ndjson",
+    FormatoExportacao.CSV: "text/csv",
+}
+
+
+def serializar_ndjson(itens: list[FilaExecucaoOutputDTO]) -> bytes:
+    """Um objeto JSON por linha, com os mesmos campos da API"""
+    return b"".join(item.model_dump_json().encode() + b"\n" for item in itens)
+
+
+def cabecalho_csv() -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(COLUNAS_CSV)
+    return buffer.getvalue().encode()
+
+
+def serializar_csv(itens: list[FilaExecucaoOutputDTO]) -> bytes:
+    """Linhas CSV na ordem de COLUNAS_CSV; campos nulos ficam vazios"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for item in itens:
+        linha = item.model_dump(mode="json")
+        writer.writerow(["" if linha[coluna] is None else linha[coluna] for coluna in COLUNAS_CSV])
+    return buffer.getvalue().encode()
+
+
+async def compactar_gzip(partes: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Compacta o fluxo incrementalmente, sem acumular o arquivo inteiro"""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    async for parte in partes:
+        compactado = compressor.compress(parte)
+        if compactado:
+            yield compactado
+    yield compressor.flush()
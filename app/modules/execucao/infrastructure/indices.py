@@ -0,0 +1,67 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+
+# Índices declarados por coleção, comparados com os existentes pelo nome: um
+# índice cujo nome não está aqui é removido pela sincronização (exceto _id_).
+# Mudar a definição de um índice exige mudar o nome.
+INDICES: dict[str, list[IndexModel]] = {
+    "fila_execucao": [
+        IndexModel("ordem_servico_id", unique=True),
+        # Listagem por status já ordenada, só com os status ativos
+        IndexModel(
+            [("status", ASCENDING), ("peso_prioridade", DESCENDING), ("dta_criacao", ASCENDING), ("_id", ASCENDING)],
+            name="fila_ativa_status_peso_prioridade",
+            partialFilterExpression={"status": {"$in": ["AGUARDANDO", "EM_DIAGNOSTICO", "EM_REPARO"]}},
+        ),
+        IndexModel([("peso_prioridade", DESCENDING), ("dta_criacao", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel("outbox_disponivel_em", sparse=True),
+        IndexModel([("dta_atualizacao", DESCENDING)]),
+    ],
+    "fila_execucao_rollup": [
+        IndexModel("dia"),
+    ],
+    "fila_execucao_historico": [
+        IndexModel("ordem_servico_id", unique=True),
+    ],
+}
+
+
+async def diferencas_indices(db: AsyncIOMotorDatabase) -> dict[str, dict[str, list[str]]]:
+    """Compara os índices declarados com os existentes, sem alterar nada.
+
+    Retorna, por coleção, os nomes declarados a `criar` e os existentes não
+    declarados a `remover`. Custa uma listagem de índices por coleção.
+    """
+    diferencas = {}
+    for colecao, declarados in INDICES.items():
+        existentes = {indice["name"] async for indice in db[colecao].list_indexes()} - {"_id_"}
+        nomes = [modelo.document["name"] for modelo in declarados]
+        diferencas[colecao] = {
+            "criar": [nome for nome in nomes if nome not in existentes],
+            "remover": sorted(existentes - set(nomes)),
+        }
+    return diferencas
+
+
+async def sincronizar_indices(db: AsyncIOMotorDatabase) -> dict[str, dict[str, list[str]]]:
+    """Cria os índices declarados que faltam e remove os que não são mais declarados.
+
+    Os novos são criados antes das remoções, para a consulta que usava um índice
+    substituído já encontrar o substituto. Idempotente: sem diferenças, só lista
+    os índices de cada coleção.
+    """
+    diferencas = await diferencas_indices(db)
+    for colecao, diferenca in diferencas.items():
+        modelos = [modelo for modelo in INDICES[colecao] if modelo.document["name"] in diferenca["criar"]]
+        if modelos:
+            await db[colecao].create_indexes(modelos)
+        for nome in diferenca["remover"]:
+            await db[colecao].drop_index(nome)
+    return diferencas
+
+
+async def indices_pendentes(db: AsyncIOMotorDatabase) -> list[str]:
+    """Índices declarados ausentes, como `colecao.nome`"""
+    diferencas = await diferencas_indices(db)
+    return [f"{colecao}.{nome}" for colecao, diferenca in diferencas.items() for nome in diferenca["criar"]]
@@ -31,6 +31,7 @@ class FilaExecucaoMapper:
             "ordem_servico_id": entity.ordem_servico_id,
             "status": entity.status.value,
             "prioridade": entity.prioridade.value,
+            "peso_prioridade": entity.prioridade.peso,
             "mecanico_responsavel_id": entity.mecanico_responsavel_id,
             "diagnostico": entity.diagnostico,
             "observacoes_reparo": entity.observacoes_reparo,
@@ -48,6 +49,33 @@ class FilaExecucaoMapper:
         
         return doc
     
+    @staticmethod
+    def alteracoes_to_document(alteracoes: dict) -> dict:
+        """Converte alterações de campos da entidade para o $set do documento"""
+        doc = {}
+        for campo, valor in alteracoes.items():
+            if campo == "status":
+                valor = valor.value
+            elif campo == "prioridade":
+                doc["peso_prioridade"] = valor.peso
+                valor = valor.value
+            doc[campo] = valor
+        return doc
+    
+    @staticmethod
+    def projecao(campos: list[str]) -> dict:
+        """Projeção do MongoDB para os campos de saída pedidos.
+
+        Inclui sempre a chave de ordenação da fila, usada para gerar o cursor
+        (com prioridade, de onde o peso é derivado se faltar), e dta_atualizacao,
+        usada na versão da página.
+        """
+        projecao = {"_id": 1, "peso_prioridade": 1, "prioridade": 1, "dta_criacao": 1, "dta_atualizacao": 1}
+        for campo in campos:
+            if campo != "fila_id":
+                projecao[campo] = 1
+        return projecao
+    
     @staticmethod
     def entity_to_output_dto(entity: FilaExecucao) -> FilaExecucaoOutputDTO:
         """Converte entidade para DTO de saída"""
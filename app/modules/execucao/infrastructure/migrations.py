@@ -0,0 +1,37 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.modules.execucao.domain.entities import PrioridadeExecucao
+from app.modules.execucao.infrastructure.indices import sincronizar_indices
+
+
+async def backfill_peso_prioridade(db: AsyncIOMotorDatabase) -> int:
+    """Preenche peso_prioridade nos documentos existentes a partir de prioridade.
+
+    Também corrige o peso de documentos gravados sem ele, ou com o peso antigo
+    depois de uma repriorização, por réplicas da versão anterior durante um
+    rollout: por isso o deploy executa as migrações de novo ao final.
+    """
+    total = 0
+    for prioridade in PrioridadeExecucao:
+        result = await db.fila_execucao.update_many(
+            {"prioridade": prioridade.value, "peso_prioridade": {"$ne": prioridade.peso}},
+            {"$set": {"peso_prioridade": prioridade.peso}},
+        )
+        total += result.modified_count
+    return total
+
+
+# Executadas em ordem; cada migração deve ser idempotente
+MIGRACOES = [
+    backfill_peso_prioridade,
+    # Depois do backfill: os índices de ordenação são construídos já com peso_prioridade
+    sincronizar_indices,
+]
+
+
+async def executar_migracoes(db: AsyncIOMotorDatabase) -> dict:
+    """Executa todas as migrações e retorna o resultado de cada uma"""
+    resultados = {}
+    for migracao in MIGRACOES:
+        resultados[migracao.__name__] = await migracao(db)
+    return resultados
@@ -11,6 +11,7 @@ class FilaExecucaoDocument(TypedDict, total=False):
     ordem_servico_id: int
     status: str
     prioridade: str
+    peso_prioridade: int  # Derivado de prioridade, usado na ordenação
     mecanico_responsavel_id: int | None
     diagnostico: str | None
     observacoes_reparo: str | None
@@ -20,3 +21,9 @@ class FilaExecucaoDocument(TypedDict, total=False):
     dta_fim_reparo: datetime | None
     dta_criacao: datetime
     dta_atualizacao: datetime
+    # Campos internos, fora da entidade e das respostas
+    lotes_aplicados: list[str]  # ObjectIds dos lotes de operações ainda em releitura
+    outbox: list[dict]  # Notificações de status para a OS ainda não entregues
+    outbox_disponivel_em: datetime  # Próxima entrega do outbox; ausente sem eventos pendentes
+    outbox_lease_ate: datetime  # Reserva do outbox por uma réplica do despachante
+    outbox_falhas: list[dict]  # Notificações descartadas após OUTBOX_MAX_TENTATIVAS (dead-letter)
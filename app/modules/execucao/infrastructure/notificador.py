@@ -0,0 +1,88 @@
+import asyncio
+
+from app.core.config import settings
+from app.modules.execucao.infrastructure.ordem_servico_client import OrdemServicoClient, ordem_servico_client
+
+
+class NotificadorOrdemServico:
+    """Agrupa as notificações de status para o serviço de OS em janelas curtas.
+
+    As atualizações recebidas durante `OS_NOTIFICACAO_JANELA` segundos são
+    colapsadas para o último status de cada `ordem_servico_id` e enviadas em uma
+    única chamada de lote (ou em PATCHes concorrentes, sem endpoint de lote).
+    Quem chama `notificar` aguarda o resultado da entrega do seu lote.
+    """
+
+    def __init__(self, client: OrdemServicoClient = ordem_servico_client):
+        self.client = client
+        self._pendentes: dict[int, tuple[str, list[asyncio.Future]]] = {}
+        self._descarga: asyncio.Task | None = None
+        # Referência forte às descargas em andamento: o event loop só guarda referência fraca
+        self._tarefas: set[asyncio.Task] = set()
+
+    async def notificar(self, ordem_servico_id: int, status: str) -> None:
+        futuro = asyncio.get_running_loop().create_future()
+        _, futuros = self._pendentes.get(ordem_servico_id, (None, []))
+        futuros.append(futuro)
+        self._pendentes[ordem_servico_id] = (status, futuros)
+
+        if len(self._pendentes) >= settings.OS_NOTIFICACAO_LOTE_MAXIMO:
+            self._agendar(self._descarregar())
+        elif self._descarga is None:
+            self._descarga = self._agendar(self._descarregar_apos_janela())
+
+        await futuro
+
+    async def parar(self) -> None:
+        """Aguarda as entregas em andamento e cancela o que ainda esperava a janela.
+
+        As notificações canceladas continuam no outbox e são reenviadas pelo
+        despachante de outra réplica (ou desta, no próximo startup).
+        """
+        if self._descarga is not None:
+            self._descarga.cancel()
+            self._descarga = None
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+
+        lote, self._pendentes = self._pendentes, {}
+        for _, futuros in lote.values():
+            for futuro in futuros:
+                futuro.cancel()
+
+    def _agendar(self, corrotina) -> asyncio.Task:
+        tarefa = asyncio.create_task(corrotina)
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+        return tarefa
+
+    async def _descarregar_apos_janela(self) -> None:
+        await asyncio.sleep(settings.OS_NOTIFICACAO_JANELA)
+        await self._descarregar()
+
+    async def _descarregar(self) -> None:
+        lote, self._pendentes = self._pendentes, {}
+        if self._descarga is not None and self._descarga is not asyncio.current_task():
+            self._descarga.cancel()
+        self._descarga = None
+        if not lote:
+            return
+
+        try:
+            erros = await self.client.atualizar_status_lote(
+                {ordem_servico_id: status for ordem_servico_id, (status, _) in lote.items()}
+            )
+        except Exception as e:
+            erros = {ordem_servico_id: e for ordem_servico_id in lote}
+
+        for ordem_servico_id, (_, futuros) in lote.items():
+            erro = erros.get(ordem_servico_id)
+            for futuro in futuros:
+                if futuro.done():
+                    continue
+                if erro:
+                    futuro.set_exception(erro)
+                else:
+                    futuro.set_result(None)
+
+
+notificador_ordem_servico = NotificadorOrdemServico()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class OrdemServicoClient:
+    """Cliente HTTP do microsserviço de Ordem de Serviço.
+
+    Uma única instância por processo, aberta no aquecimento da prontidão (ou na
+    primeira notificação) e fechada no shutdown, mantém um pool de conexões
+    keep-alive reaproveitado por todas as notificações de status. O httpx só é
+    importado nesse momento, depois do startup.
+    """
+
+    def __init__(self):
+        self.client: httpx.AsyncClient | None = None
+
+    def iniciar(self, transport: httpx.AsyncBaseTransport | None = None) -> None:
+        """Cria o pool de conexões; `transport` permite substituir a rede nos testes"""
+        import httpx
+
+        self.client = httpx.AsyncClient(
+            base_url=settings.URL_API_OS,
+            http2=settings.OS_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.OS_HTTP_MAX_CONEXOES,
+                max_keepalive_connections=settings.OS_HTTP_MAX_CONEXOES_KEEPALIVE,
+                keepalive_expiry=settings.OS_HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(settings.OS_HTTP_TIMEOUT, connect=settings.OS_HTTP_TIMEOUT_CONEXAO),
+            transport=transport,
+        )
+
+    async def aquecer(self) -> None:
+        """Abre a primeira conexão do pool (TCP/TLS) com o serviço de OS.
+
+        Qualquer resposta HTTP serve; só falhas de conexão são propagadas.
+        """
+        if self.client is None:
+            self.iniciar()
+        await self.client.get(settings.OS_URL_HEALTH)
+
+    async def fechar(self) -> None:
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+
+    async def atualizar_status(self, ordem_servico_id: int, status: str) -> None:
+        """Comunica com o serviço de OS para atualizar o status.
+
+        Falhas são propagadas para que o despachante do outbox reagende a entrega.
+        """
+        if self.client is None:
+            self.iniciar()
+        response = await self.client.patch(f"/ordens_servico/{ordem_servico_id}/status", json={"status": status})
+        response.raise_for_status()
+
+    async def atualizar_status_lote(self, atualizacoes: dict[int, str]) -> dict[int, Exception | None]:
+        """Envia várias atualizações de status e retorna o erro (ou None) de cada OS.
+
+        Usa o endpoint de lote quando OS_URL_LOTE_STATUS está configurado; senão
+        faz um PATCH por OS, com no máximo OS_NOTIFICACAO_CONCORRENCIA simultâneos.
+        """
+        if settings.OS_URL_LOTE_STATUS:
+            if self.client is None:
+                self.iniciar()
+            try:
+                response = await self.client.patch(settings.OS_URL_LOTE_STATUS, json={"atualizacoes": [
+                    {"ordem_servico_id": ordem_servico_id, "status": status}
+                    for ordem_servico_id, status in atualizacoes.items()
+                ]})
+                response.raise_for_status()
+            except Exception as e:
+                return {ordem_servico_id: e for ordem_servico_id in atualizacoes}
+            return {ordem_servico_id: None for ordem_servico_id in atualizacoes}
+
+        semaforo = asyncio.Semaphore(settings.OS_NOTIFICACAO_CONCORRENCIA)
+
+        async def enviar(ordem_servico_id: int, status: str) -> Exception | None:
+            async with semaforo:
+                try:
+                    await self.atualizar_status(ordem_servico_id, status)
+                except Exception as e:
+                    return e
+            return None
+
+        erros = await asyncio.gather(*(enviar(ordem_servico_id, status) for ordem_servico_id, status in atualizacoes.items()))
+        return dict(zip(atualizacoes, erros))
+
+
+ordem_servico_client = OrdemServicoClient()
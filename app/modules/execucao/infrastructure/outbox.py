@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import uuid
+from contextlib import suppress
+from datetime import datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.modules.execucao.infrastructure.notificador import NotificadorOrdemServico, notificador_ordem_servico
+
+
+logger = logging.getLogger(__name__)
+
+
+def registrar_evento_outbox(update: dict, status_os: str, agora: datetime) -> dict:
+    """Acrescenta a um update do item da fila a notificação de status para a OS.
+
+    O evento é gravado no próprio documento, na mesma escrita da transição:
+    ou os dois são persistidos, ou nenhum.
+    """
+    update.setdefault("$push", {})["outbox"] = {
+        "evento_id": uuid.uuid4().hex,
+        "status": status_os,
+        "tentativas": 0,
+        "dta_criacao": agora,
+    }
+    # $min mantém um agendamento já vencido e antecipa um backoff pendente
+    update.setdefault("$min", {})["outbox_disponivel_em"] = agora
+    return update
+
+
+class DespachanteOutbox:
+    """Entrega ao serviço de OS os eventos pendentes no outbox dos itens da fila.
+
+    Cada item é reservado por um lease (`outbox_lease_ate`) antes da entrega, então
+    só uma réplica processa o outbox de uma OS por vez e a ordem dos eventos é
+    preservada. Se a réplica morrer, o lease expira e outra assume. Eventos que
+    esgotam as tentativas vão para `outbox_falhas` (dead-letter).
+
+    Os eventos acumulados de uma OS são colapsados para o último status, e os
+    itens reservados no mesmo ciclo seguem juntos pelo notificador em lote.
+    """
+
+    def __init__(self, notificador: NotificadorOrdemServico = notificador_ordem_servico):
+        self.notificador = notificador
+        self._tarefa: asyncio.Task | None = None
+        self._acordar: asyncio.Event | None = None
+
+    def iniciar(self, db: AsyncIOMotorDatabase) -> None:
+        self._acordar = asyncio.Event()
+        self._tarefa = asyncio.create_task(self._executar(db))
+
+    async def parar(self) -> None:
+        if self._tarefa:
+            self._tarefa.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._tarefa
+            self._tarefa = None
+
+    def acordar(self) -> None:
+        """Antecipa o próximo ciclo após uma escrita no outbox desta réplica"""
+        if self._acordar:
+            self._acordar.set()
+
+    async def _executar(self, db: AsyncIOMotorDatabase) -> None:
+        while True:
+            try:
+                reservados = await self.processar_pendentes(db)
+            except Exception as e:
+                logger.error(f"Erro ao processar o outbox: {e}")
+                reservados = 0
+
+            if reservados == 0:
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._acordar.wait(), settings.OUTBOX_INTERVALO)
+                self._acordar.clear()
+
+    async def processar_pendentes(self, db: AsyncIOMotorDatabase) -> int:
+        """Reserva até OUTBOX_LOTE itens com eventos vencidos e entrega seus outboxes.
+
+        Retorna quantos itens foram reservados.
+        """
+        colecao = db.fila_execucao
+        reservados = []
+        for _ in range(settings.OUTBOX_LOTE):
+            document = await self._reservar(colecao)
+            if not document:
+                break
+            reservados.append(document)
+
+        await asyncio.gather(*(self._entregar(colecao, document) for document in reservados))
+        return len(reservados)
+
+    async def _reservar(self, colecao: AsyncIOMotorCollection) -> dict | None:
+        agora = datetime.now()
+        return await colecao.find_one_and_update(
+            {
+                "outbox_disponivel_em": {"$lte": agora},
+                "$or": [{"outbox_lease_ate": None}, {"outbox_lease_ate": {"$lt": agora}}],
+            },
+            {"$set": {"outbox_lease_ate": agora + timedelta(seconds=settings.OUTBOX_LEASE)}},
+            sort=[("outbox_disponivel_em", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _entregar(self, colecao: AsyncIOMotorCollection, document: dict) -> None:
+        """Entrega o status mais recente do outbox e confirma todos os eventos cobertos por ele"""
+        eventos = document.get("outbox", [])
+        if eventos:
+            try:
+                await self.notificador.notificar(document["ordem_servico_id"], eventos[-1]["status"])
+            except Exception as e:
+                await self._registrar_falha(colecao, document, eventos, e)
+                return
+
+            await colecao.update_one(
+                {"_id": document["_id"]},
+                {"$pull": {"outbox": {"evento_id": {"$in": [evento["evento_id"] for evento in eventos]}}}},
+            )
+
+        await self._liberar(colecao, document["_id"])
+
+    async def _liberar(self, colecao: AsyncIOMotorCollection, fila_id) -> None:
+        result = await colecao.update_one(
+            {"_id": fila_id, "outbox": {"$size": 0}},
+            {"$unset": {"outbox_disponivel_em": "", "outbox_lease_ate": ""}},
+        )
+        if result.modified_count == 0:
+            # Chegaram eventos durante a entrega: ficam para o próximo ciclo
+            await colecao.update_one({"_id": fila_id}, {"$unset": {"outbox_lease_ate": ""}})
+
+    async def _registrar_falha(
+        self, colecao: AsyncIOMotorCollection, document: dict, eventos: list[dict], erro: Exception
+    ) -> None:
+        agora = datetime.now()
+        tentativas = eventos[0]["tentativas"] + 1
+        ultimo = eventos[-1]
+        filtro = {"_id": document["_id"], "outbox.0.evento_id": eventos[0]["evento_id"]}
+
+        if tentativas >= settings.OUTBOX_MAX_TENTATIVAS:
+            logger.error(
+                f"Notificação {ultimo['status']} da OS {document['ordem_servico_id']} "
+                f"descartada após {tentativas} tentativas: {erro}"
+            )
+            await colecao.update_one(filtro, {
+                "$pull": {"outbox": {"evento_id": {"$in": [evento["evento_id"] for evento in eventos]}}},
+                "$push": {"outbox_falhas": {
+                    **ultimo,
+                    "tentativas": tentativas,
+                    "eventos_coalescidos": len(eventos),
+                    "erro": str(erro),
+                    "dta_falha": agora,
+                }},
+                "$set": {"outbox_disponivel_em": agora},
+                "$unset": {"outbox_lease_ate": ""},
+            })
+            return
+
+        atraso = min(settings.OUTBOX_BACKOFF_BASE * 2 ** (tentativas - 1), settings.OUTBOX_BACKOFF_MAXIMO)
+        logger.warning(
+            f"Erro ao atualizar status da OS {document['ordem_servico_id']} "
+            f"(tentativa {tentativas}, nova tentativa em {atraso:.0f}s): {erro}"
+        )
+        await colecao.update_one(filtro, {
+            "$inc": {"outbox.0.tentativas": 1},
+            "$set": {"outbox_disponivel_em": agora + timedelta(seconds=atraso)},
+            "$unset": {"outbox_lease_ate": ""},
+        })
+
+
+despachante_outbox = DespachanteOutbox()
@@ -0,0 +1,71 @@
+import base64
+import hashlib
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.modules.execucao.domain.entities import FilaExecucao, PrioridadeExecucao
+
+
+def codificar_cursor(fila: FilaExecucao) -> str:
+    """Gera o cursor opaco que aponta para depois de `fila` na ordenação da fila"""
+    return _codificar(fila.prioridade.peso, fila.dta_criacao, fila.fila_id)
+
+
+def codificar_cursor_documento(document: dict) -> str:
+    """Como codificar_cursor, a partir de um documento (inclusive projetado)"""
+    return _codificar(peso_documento(document), document["dta_criacao"], str(document["_id"]))
+
+
+def peso_documento(document: dict) -> int:
+    """peso_prioridade do documento; derivado de prioridade se ainda não foi gravado.
+
+    Durante um rollout, réplicas da versão anterior gravam documentos sem o
+    campo até o backfill da migração rodar de novo.
+    """
+    peso = document.get("peso_prioridade")
+    if peso is None:
+        return PrioridadeExecucao(document["prioridade"]).peso
+    return peso
+
+
+def _codificar(peso: int, dta_criacao: datetime, fila_id: str) -> str:
+    chave = [peso, dta_criacao.isoformat(), fila_id]
+    return base64.urlsafe_b64encode(json.dumps(chave).encode()).decode()
+
+
+def decodificar_cursor(cursor: str) -> tuple[int, datetime, ObjectId]:
+    """Extrai (peso_prioridade, dta_criacao, _id) de um cursor gerado por codificar_cursor"""
+    try:
+        peso, dta_criacao, fila_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(peso), datetime.fromisoformat(dta_criacao), ObjectId(fila_id)
+    except (ValueError, TypeError, InvalidId):
+        raise ValueError("Cursor de paginação inválido.")
+
+
+def filtro_apos_cursor(cursor: str) -> dict:
+    """Filtro keyset equivalente a `chave > cursor` na ordenação
+    (peso_prioridade desc, dta_criacao asc, _id asc)"""
+    peso, dta_criacao, fila_id = decodificar_cursor(cursor)
+    return {"$or": [
+        {"peso_prioridade": {"$lt": peso}},
+        {"peso_prioridade": peso, "dta_criacao": {"$gt": dta_criacao}},
+        {"peso_prioridade": peso, "dta_criacao": dta_criacao, "_id": {"$gt": fila_id}},
+    ]}
+
+
+def versao_pagina(itens: list[tuple[str, datetime]], next_cursor: str | None, campos: list[str]) -> str:
+    """Versão de uma página da listagem, a partir dos itens de fato devolvidos.
+
+    Muda quando um item da página é incluído, alterado (dta_atualizacao) ou
+    removido, quando a fronteira da página muda ou com outros campos. Não depende
+    de onde a página foi lida: MongoDB (qualquer nó) e visão em memória de
+    qualquer réplica chegam à mesma versão para os mesmos itens.
+    """
+    resumo = hashlib.blake2b(digest_size=16)
+    for fila_id, dta_atualizacao in itens:
+        resumo.update(f"{fila_id}@{dta_atualizacao.isoformat(timespec='milliseconds')};".encode())
+    resumo.update(f"{next_cursor}|{','.join(campos)}".encode())
+    return resumo.hexdigest()
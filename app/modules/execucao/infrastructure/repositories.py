@@ -1,18 +1,62 @@
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from datetime import datetime
+from typing import AsyncIterator
 from bson import ObjectId
-from pymongo.errors import DuplicateKeyError
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
+from app.core.config import settings
+from app.core.database import preferencia_leitura
+from app.modules.execucao.application.dto import TipoEventoFila
 from app.modules.execucao.domain.entities import FilaExecucao, StatusExecucao
 from app.modules.execucao.infrastructure.mapper import FilaExecucaoMapper
-from app.modules.execucao.application.interfaces import IFilaExecucaoRepository
+from app.modules.execucao.infrastructure.paginacao import filtro_apos_cursor
+from app.modules.execucao.infrastructure.eventos import (
+    EventoFila, publicacao_local, publicador_eventos_fila, tipo_evento_alteracao,
+)
+from app.modules.execucao.infrastructure.outbox import despachante_outbox, registrar_evento_outbox
+from app.modules.execucao.application.interfaces import AlteracaoFila, IFilaExecucaoRepository
+
+
+# Maior prioridade primeiro (URGENTE > ALTA > NORMAL > BAIXA), mais antiga primeiro.
+# _id desempata e torna a chave única para a paginação por cursor.
+# Coberta pelos índices (status, peso_prioridade, dta_criacao, _id) e (peso_prioridade, dta_criacao, _id).
+ORDENACAO_FILA = [("peso_prioridade", -1), ("dta_criacao", 1), ("_id", 1)]
+
+# Lotes em andamento que alteraram cada item: identificam, na releitura, as
+# alterações aplicadas por um lote mesmo que outros o alterem em seguida. O id
+# sai do documento após a releitura; o limite só vale se ela não acontecer.
+LOTES_APLICADOS_MAXIMO = 8
 
 
 class FilaExecucaoRepository(IFilaExecucaoRepository):
     
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(self, db: AsyncIOMotorDatabase, leitura_secundaria: bool = True):
+        """Escritas, leituras de item e leituras das transições usam sempre a primária.
+
+        Listagens, métricas e exportação toleram a defasagem limitada de uma
+        secundária e seguem MONGODB_LEITURA_*; com `leitura_secundaria=False`
+        (snapshot do feed, que precisa ver tudo o que já foi publicado, e
+        listagens logo depois de uma escrita do mesmo cliente), tudo fica na
+        primária.
+        """
         self.db = db
         self.collection = db.fila_execucao
+        self.historico = db.fila_execucao_historico
+        listagem, metricas, exportacao = (
+            settings.MONGODB_LEITURA_LISTAGEM, settings.MONGODB_LEITURA_METRICAS, settings.MONGODB_LEITURA_EXPORTACAO
+        )
+        self.leitura_listagem = self._colecao_leitura("fila_execucao", listagem, leitura_secundaria)
+        self.leitura_metricas = self._colecao_leitura("fila_execucao", metricas, leitura_secundaria)
+        self.leitura_exportacao = self._colecao_leitura("fila_execucao", exportacao, leitura_secundaria)
+        self.historico_metricas = self._colecao_leitura("fila_execucao_historico", metricas, leitura_secundaria)
+        self.historico_exportacao = self._colecao_leitura("fila_execucao_historico", exportacao, leitura_secundaria)
+    
+    def _colecao_leitura(self, nome: str, modo: str, leitura_secundaria: bool):
+        if not leitura_secundaria or modo == "primary":
+            return self.db[nome]
+        return self.db.get_collection(nome, read_preference=preferencia_leitura(modo))
     
     async def salvar(self, fila: FilaExecucao) -> FilaExecucao:
         """Salva uma nova fila de execução"""
@@ -27,10 +71,53 @@ class FilaExecucaoRepository(IFilaExecucaoRepository):
         
         try:
             result = await self.collection.insert_one(document)
-            fila.fila_id = str(result.inserted_id)
-            return fila
         except DuplicateKeyError:
             raise ValueError(f"Ordem de Serviço {fila.ordem_servico_id} já existe na fila")
+        
+        fila.fila_id = str(result.inserted_id)
+        self._publicar(TipoEventoFila.ADICIONADO, fila)
+        return fila
+    
+    async def salvar_lote(self, filas: list[FilaExecucao]) -> list[FilaExecucao | None]:
+        """Salva várias filas em um único insert_many não ordenado.
+
+        A unicidade de ordem_servico_id fica a cargo do índice único, mais uma
+        consulta ao histórico para as OSs já arquivadas: o resultado traz, na
+        ordem da entrada, a fila salva ou None para as OSs duplicadas.
+        """
+        arquivadas = set(await self.historico.distinct(
+            "ordem_servico_id", {"ordem_servico_id": {"$in": [fila.ordem_servico_id for fila in filas]}}
+        ))
+        
+        agora = datetime.now()
+        documents = []
+        for fila in filas:
+            fila.dta_criacao = agora
+            fila.dta_atualizacao = agora
+            document = FilaExecucaoMapper.entity_to_document(fila)
+            document["_id"] = ObjectId()
+            documents.append(document)
+        
+        duplicados = {indice for indice, fila in enumerate(filas) if fila.ordem_servico_id in arquivadas}
+        inseridos = [indice for indice in range(len(filas)) if indice not in duplicados]
+        try:
+            if inseridos:
+                await self.collection.insert_many([documents[indice] for indice in inseridos], ordered=False)
+        except BulkWriteError as e:
+            erros = e.details.get("writeErrors", [])
+            if any(erro["code"] != 11000 for erro in erros):
+                raise
+            duplicados |= {inseridos[erro["index"]] for erro in erros}
+        
+        resultado = []
+        for indice, (fila, document) in enumerate(zip(filas, documents)):
+            if indice in duplicados:
+                resultado.append(None)
+                continue
+            fila.fila_id = str(document["_id"])
+            self._publicar(TipoEventoFila.ADICIONADO, fila)
+            resultado.append(fila)
+        return resultado
     
     async def buscar_por_id(self, fila_id: str) -> FilaExecucao | None:
         """Busca fila por ID"""
@@ -43,55 +130,260 @@ class FilaExecucaoRepository(IFilaExecucaoRepository):
             return None
     
     async def buscar_por_ordem_servico(self, ordem_servico_id: int) -> FilaExecucao | None:
-        """Busca fila por ID da ordem de serviço"""
+        """Busca fila por ID da ordem de serviço, também entre os itens já arquivados"""
         document = await self.collection.find_one({"ordem_servico_id": ordem_servico_id})
+        if not document:
+            document = await self.historico.find_one({"ordem_servico_id": ordem_servico_id})
         if not document:
             return None
         return FilaExecucaoMapper.document_to_entity(document)
     
-    async def listar_por_status(self, status: StatusExecucao) -> list[FilaExecucao]:
+    async def listar_por_status(
+        self, status: StatusExecucao, limite: int | None = None, cursor: str | None = None
+    ) -> list[FilaExecucao]:
         """Lista filas por status, ordenadas por prioridade e data"""
-        cursor = self.collection.find({"status": status.value}).sort([
-            ("prioridade", -1),  # Maior prioridade primeiro (URGENTE > ALTA > NORMAL > BAIXA)
-            ("dta_criacao", 1)   # Mais antiga primeiro
-        ])
-        
-        documents = await cursor.to_list(length=None)
-        return [FilaExecucaoMapper.document_to_entity(doc) for doc in documents]
+        return await self._listar({"status": status.value}, limite, cursor)
     
-    async def listar_todas(self) -> list[FilaExecucao]:
+    async def listar_todas(self, limite: int | None = None, cursor: str | None = None) -> list[FilaExecucao]:
         """Lista todas as filas, ordenadas por prioridade e data"""
-        cursor = self.collection.find().sort([
-            ("prioridade", -1),
-            ("dta_criacao", 1)
-        ])
-        
-        documents = await cursor.to_list(length=None)
+        return await self._listar({}, limite, cursor)
+    
+    async def listar_projetado(
+        self,
+        status: StatusExecucao | None,
+        projecao: dict,
+        limite: int | None = None,
+        cursor: str | None = None,
+    ) -> list[dict]:
+        """Como listar_por_status/listar_todas, mas retorna os documentos só com os campos da projeção"""
+        filtro = {"status": status.value} if status else {}
+        return await self._buscar(filtro, limite, cursor, projecao)
+    
+    async def _listar(self, filtro: dict, limite: int | None, cursor: str | None) -> list[FilaExecucao]:
+        documents = await self._buscar(filtro, limite, cursor)
         return [FilaExecucaoMapper.document_to_entity(doc) for doc in documents]
     
-    async def atualizar(self, fila: FilaExecucao) -> FilaExecucao:
-        """Atualiza uma fila existente"""
-        if not fila.fila_id:
-            raise ValueError("fila_id é obrigatório para atualização")
+    async def _buscar(
+        self, filtro: dict, limite: int | None, cursor: str | None, projecao: dict | None = None
+    ) -> list[dict]:
+        """Busca uma página da fila a partir do cursor (keyset), sem skip"""
+        if cursor:
+            filtro = {"$and": [filtro, filtro_apos_cursor(cursor)]}
         
-        fila.dta_atualizacao = datetime.now()
+        busca = self.leitura_listagem.find(filtro, projecao).sort(ORDENACAO_FILA)
+        if limite:
+            busca = busca.limit(limite)
         
-        document = FilaExecucaoMapper.entity_to_document(fila)
-        fila_id = document.pop("_id")
+        return await busca.to_list(length=limite)
+    
+    async def calcular_metricas(self) -> dict:
+        """Totais por status e prioridade e durações médias, em uma única agregação.
+
+        Cobrem só a coleção ativa: os itens já arquivados entram apenas no total
+        `arquivados`, lido dos metadados do histórico (sem varredura).
+        Durações em segundos; $avg ignora os itens em que a etapa não terminou
+        ($subtract com campo nulo ou ausente resulta em null).
+        """
+        agregacao = self.leitura_metricas.aggregate([{"$facet": {
+            "por_status": [{"$group": {"_id": "$status", "total": {"$sum": 1}}}],
+            "por_prioridade": [{"$group": {"_id": "$prioridade", "total": {"$sum": 1}}}],
+            "duracoes": [{"$group": {
+                "_id": None,
+                "diagnostico": {"$avg": {"$subtract": ["$dta_fim_diagnostico", "$dta_inicio_diagnostico"]}},
+                "reparo": {"$avg": {"$subtract": ["$dta_fim_reparo", "$dta_inicio_reparo"]}},
+            }}],
+        }}]).to_list(length=1)
+        resultado, arquivados = await asyncio.gather(agregacao, self.historico_metricas.estimated_document_count())
+        
+        facetas = resultado[0]
+        duracoes = facetas["duracoes"][0] if facetas["duracoes"] else {}
+        return {
+            "por_status": {grupo["_id"]: grupo["total"] for grupo in facetas["por_status"]},
+            "por_prioridade": {grupo["_id"]: grupo["total"] for grupo in facetas["por_prioridade"]},
+            "duracao_media_diagnostico": _milissegundos_para_segundos(duracoes.get("diagnostico")),
+            "duracao_media_reparo": _milissegundos_para_segundos(duracoes.get("reparo")),
+            "arquivados": arquivados,
+        }
+    
+    async def iterar_lotes(
+        self, status: StatusExecucao | None = None, tamanho_lote: int = 500
+    ) -> AsyncIterator[list[FilaExecucao]]:
+        """Percorre a fila em lotes de tamanho fixo, sem carregar a coleção em memória.
+
+        Sem filtro ou com FINALIZADA, os itens já arquivados vêm depois dos da
+        coleção ativa, na mesma ordenação entre si.
+        """
+        filtro = {"status": status.value} if status else {}
+        colecoes = [self.leitura_exportacao]
+        if status in (None, StatusExecucao.FINALIZADA):
+            colecoes.append(self.historico_exportacao)
+        
+        lote = []
+        for colecao in colecoes:
+            async for document in colecao.find(filtro, batch_size=tamanho_lote).sort(ORDENACAO_FILA):
+                lote.append(FilaExecucaoMapper.document_to_entity(document))
+                if len(lote) >= tamanho_lote:
+                    yield lote
+                    lote = []
+        if lote:
+            yield lote
+    
+    async def atualizar_campos(
+        self,
+        fila_id: str,
+        alteracoes: dict,
+        status_esperado: StatusExecucao | None = None,
+        status_os: str | None = None,
+    ) -> FilaExecucao | None:
+        """Aplica as alterações em uma única operação atômica e retorna o item atualizado.
+
+        Com `status_esperado`, a alteração só acontece se o item ainda estiver nesse
+        status; duas transições concorrentes não podem ambas ter sucesso.
+        Retorna None se o item não existir ou não estiver no status esperado.
+        """
+        if not ObjectId.is_valid(fila_id):
+            return None
         
-        result = await self.collection.update_one(
-            {"_id": fila_id},
-            {"$set": document}
+        filtro = {"_id": ObjectId(fila_id)}
+        if status_esperado:
+            filtro["status"] = status_esperado.value
+        
+        agora = datetime.now()
+        update = {"$set": {**FilaExecucaoMapper.alteracoes_to_document(alteracoes), "dta_atualizacao": agora}}
+        if status_os:
+            registrar_evento_outbox(update, status_os, agora)
+        
+        document = await self.collection.find_one_and_update(
+            filtro, update, return_document=ReturnDocument.AFTER
         )
+        if not document:
+            return None
         
-        if result.matched_count == 0:
-            raise ValueError(f"Fila com ID {fila.fila_id} não encontrada")
+        if status_os:
+            despachante_outbox.acordar()
         
+        fila = FilaExecucaoMapper.document_to_entity(document)
+        self._publicar(tipo_evento_alteracao(alteracoes), fila)
         return fila
     
-    async def remover(self, fila_id: str) -> None:
-        """Remove uma fila"""
-        try:
-            await self.collection.delete_one({"_id": ObjectId(fila_id)})
-        except:
-            pass
+    async def atualizar_campos_lote(self, alteracoes: list[AlteracaoFila]) -> list[tuple[bool, FilaExecucao | None]]:
+        """Aplica várias alterações condicionais em um único bulk_write não ordenado.
+
+        Cada alteração segue as regras de `atualizar_campos`. Retorna, na ordem da
+        entrada, se ela foi aplicada e o estado atual do item (None se não existir),
+        lidos de volta em uma única consulta. Cada update aplicado grava o id do
+        lote em `lotes_aplicados`, que a releitura usa para saber quais foram e
+        depois remove.
+        """
+        agora = datetime.now()
+        lote_id = ObjectId()
+        
+        ids, operacoes = [], []
+        for alteracao in alteracoes:
+            if not ObjectId.is_valid(alteracao.fila_id):
+                continue
+            ids.append(ObjectId(alteracao.fila_id))
+            filtro = {"_id": ids[-1]}
+            if alteracao.status_esperado:
+                filtro["status"] = alteracao.status_esperado.value
+            update = {"$set": {
+                **FilaExecucaoMapper.alteracoes_to_document(alteracao.alteracoes), "dta_atualizacao": agora
+            }}
+            update["$push"] = {"lotes_aplicados": {"$each": [lote_id], "$slice": -LOTES_APLICADOS_MAXIMO}}
+            if alteracao.status_os:
+                registrar_evento_outbox(update, alteracao.status_os, agora)
+            operacoes.append(UpdateOne(filtro, update))
+        
+        if not operacoes:
+            return [(False, None) for _ in alteracoes]
+        
+        result = await self.collection.bulk_write(operacoes, ordered=False)
+        if result.modified_count and any(alteracao.status_os for alteracao in alteracoes):
+            despachante_outbox.acordar()
+        
+        documents = {
+            str(document["_id"]): document
+            async for document in self.collection.find({"_id": {"$in": ids}})
+        }
+        
+        resultado, aplicados = [], []
+        for alteracao in alteracoes:
+            document = documents.get(alteracao.fila_id)
+            if not document:
+                resultado.append((False, None))
+                continue
+            aplicada = lote_id in document.get("lotes_aplicados", [])
+            fila = FilaExecucaoMapper.document_to_entity(document)
+            if aplicada:
+                aplicados.append(document["_id"])
+                self._publicar(tipo_evento_alteracao(alteracao.alteracoes), fila)
+            resultado.append((aplicada, fila))
+        
+        if aplicados:
+            # Sem dta_atualizacao: a limpeza não é uma alteração do item (ETag, rollup, feed)
+            await self.collection.update_many(
+                {"_id": {"$in": aplicados}}, {"$pull": {"lotes_aplicados": lote_id}}
+            )
+        return resultado
+    
+    async def reivindicar_proxima(
+        self, status_esperado: StatusExecucao, alteracoes: dict, status_os: str | None = None
+    ) -> FilaExecucao | None:
+        """Seleciona e altera atomicamente o próximo item da fila ainda sem diagnóstico.
+
+        O item de maior prioridade e mais antigo em `status_esperado` é escolhido e
+        alterado na mesma operação, usando o índice de ordenação da fila; duas
+        chamadas concorrentes nunca recebem o mesmo item.
+        Retorna None se não houver item disponível.
+        """
+        agora = datetime.now()
+        update = {"$set": {**FilaExecucaoMapper.alteracoes_to_document(alteracoes), "dta_atualizacao": agora}}
+        if status_os:
+            registrar_evento_outbox(update, status_os, agora)
+        
+        document = await self.collection.find_one_and_update(
+            # Itens já diagnosticados aguardam aprovação do orçamento, não um mecânico
+            {"status": status_esperado.value, "dta_fim_diagnostico": None},
+            update,
+            sort=ORDENACAO_FILA,
+            return_document=ReturnDocument.AFTER,
+        )
+        if not document:
+            return None
+        
+        if status_os:
+            despachante_outbox.acordar()
+        
+        fila = FilaExecucaoMapper.document_to_entity(document)
+        self._publicar(TipoEventoFila.TRANSICIONADO, fila)
+        return fila
+    
+    async def remover(self, fila_id: str) -> bool:
+        """Remove uma fila; retorna False se ela não existir ou tiver eventos pendentes no outbox.
+
+        Apagar o documento apagaria junto as notificações ainda não entregues à OS.
+        """
+        if not ObjectId.is_valid(fila_id):
+            return False
+        result = await self.collection.delete_one(
+            {"_id": ObjectId(fila_id), "outbox_disponivel_em": {"$exists": False}}
+        )
+        if result.deleted_count == 0:
+            return False
+        
+        self._publicar(TipoEventoFila.REMOVIDO, fila_id=fila_id)
+        return True
+    
+    def _publicar(self, tipo: TipoEventoFila, fila: FilaExecucao | None = None, fila_id: str | None = None) -> None:
+        """Publica a escrita no feed da fila desta réplica, só com SSE_FONTE_LOCAL.
+
+        Com a visão em memória ligada, o feed é alimentado pelo change stream,
+        que também enxerga as escritas das outras réplicas.
+        """
+        if not publicacao_local():
+            return
+        publicador_eventos_fila.publicar(EventoFila(tipo, fila_id or fila.fila_id, fila))
+
+
+def _milissegundos_para_segundos(valor: float | None) -> float | None:
+    return None if valor is None else valor / 1000
@@ -0,0 +1,219 @@
+import asyncio
+import logging
+from contextlib import suppress
+from datetime import date, datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.modules.execucao.application.interfaces import IRollupFilaRepository
+from app.modules.execucao.domain.entities import PrioridadeExecucao
+
+
+logger = logging.getLogger(__name__)
+
+
+CONTROLE_ID = "diario"
+
+# Eventos contados por dia: (contador, campo com a data do evento, campo com o início da etapa)
+EVENTOS_ROLLUP = [
+    ("diagnosticos_iniciados", "dta_inicio_diagnostico", None),
+    ("diagnosticos_finalizados", "dta_fim_diagnostico", "dta_inicio_diagnostico"),
+    ("reparos_iniciados", "dta_inicio_reparo", None),
+    ("reparos_finalizados", "dta_fim_reparo", "dta_inicio_reparo"),
+]
+DURACOES_ROLLUP = {
+    "diagnosticos_finalizados": "duracao_diagnostico_ms",
+    "reparos_finalizados": "duracao_reparo_ms",
+}
+CONTADORES_ROLLUP = [evento for evento, _, _ in EVENTOS_ROLLUP] + list(DURACOES_ROLLUP.values())
+
+
+def pipeline_rollup(de: datetime, ate: datetime) -> list[dict]:
+    """Agrega por dia, prioridade e mecânico os eventos ocorridos em (de, ate].
+
+    Só lê os itens alterados depois de `de` (índice de dta_atualizacao): a data de
+    um evento nunca é posterior à dta_atualizacao da escrita que o registrou.
+    Cada faceta já sai agrupada, então o documento do $facet tem no máximo um
+    grupo por dia/prioridade/mecânico e evento, qualquer que seja a janela.
+    """
+    return [
+        {"$match": {"dta_atualizacao": {"$gt": de}}},
+        {"$facet": {evento: _faceta_evento(evento, campo, inicio, de, ate) for evento, campo, inicio in EVENTOS_ROLLUP}},
+        {"$project": {"grupos": {"$concatArrays": [f"${evento}" for evento, _, _ in EVENTOS_ROLLUP]}}},
+        {"$unwind": "$grupos"},
+        {"$replaceRoot": {"newRoot": "$grupos"}},
+        {"$group": {"_id": "$_id", **{contador: {"$sum": f"${contador}"} for contador in CONTADORES_ROLLUP}}},
+        {"$set": {
+            "dia": "$_id.dia",
+            "prioridade": "$_id.prioridade",
+            "mecanico_responsavel_id": "$_id.mecanico_responsavel_id",
+            "consolidado_ate": ate,
+        }},
+    ]
+
+
+def _faceta_evento(evento: str, campo: str, inicio: str | None, de: datetime, ate: datetime) -> list[dict]:
+    grupo = {
+        "_id": {
+            "dia": {"$dateToString": {"format": "%Y-%m-%d", "date": f"${campo}"}},
+            "prioridade": "$prioridade",
+            "mecanico_responsavel_id": "$mecanico_responsavel_id",
+        },
+        evento: {"$sum": 1},
+    }
+    if inicio:
+        grupo[DURACOES_ROLLUP[evento]] = {"$sum": {"$subtract": [f"${campo}", f"${inicio}"]}}
+    return [{"$match": {campo: {"$gt": de, "$lte": ate}}}, {"$group": grupo}]
+
+
+def estagio_merge(colecao: str) -> dict:
+    """Soma a janela aos totais já consolidados de cada dia/prioridade/mecânico.
+
+    Um documento que já registra esta janela (`consolidado_ate`) fica como está:
+    repetir a janela depois de uma falha não conta os eventos duas vezes.
+    """
+    return {"$merge": {
+        "into": colecao,
+        "on": "_id",
+        "whenMatched": [{"$replaceWith": {"$cond": [
+            {"$gte": ["$consolidado_ate", "$$new.consolidado_ate"]},
+            "$$ROOT",
+            {"$mergeObjects": ["$$ROOT", {
+                "consolidado_ate": "$$new.consolidado_ate",
+                **{contador: {"$add": [f"${contador}", f"$$new.{contador}"]} for contador in CONTADORES_ROLLUP},
+            }]},
+        ]}}],
+        "whenNotMatched": "insert",
+    }}
+
+
+class RollupFilaRepository(IRollupFilaRepository):
+    """Totais diários de diagnósticos e reparos em `fila_execucao_rollup`.
+
+    Cada consolidação processa só a janela desde a marca d'água gravada em
+    `fila_execucao_rollup_controle`, então o custo acompanha o volume de
+    alterações, não o tamanho do histórico.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.collection = db.fila_execucao_rollup
+        self.controle = db.fila_execucao_rollup_controle
+
+    async def consolidar(self) -> bool:
+        """Consolida a próxima janela; retorna False se não havia janela a processar.
+
+        A janela planejada é gravada antes do $merge e reaproveitada se a
+        consolidação anterior não terminou. O fim da janela fica ROLLUP_ATRASO
+        segundos no passado, para que escritas em andamento já estejam visíveis,
+        e no máximo ROLLUP_JANELA_MAXIMA_DIAS depois do início: um histórico
+        longo é consolidado janela a janela, com a marca d'água avançando a cada uma.
+        """
+        controle = await self.controle.find_one({"_id": CONTROLE_ID}) or {}
+        de = controle.get("marca_dagua")
+        ate = controle.get("proxima_marca")
+
+        if ate is None:
+            if de is None:
+                de = await self._inicio_historico()
+                if de is None:
+                    return False
+            agora = datetime.now() - timedelta(seconds=settings.ROLLUP_ATRASO)
+            limite = agora.replace(microsecond=agora.microsecond // 1000 * 1000)
+            ate = min(limite, de + timedelta(days=settings.ROLLUP_JANELA_MAXIMA_DIAS))
+            if ate <= de:
+                return False
+            try:
+                result = await self.controle.update_one(
+                    {"_id": CONTROLE_ID, "marca_dagua": controle.get("marca_dagua"), "proxima_marca": None},
+                    {"$set": {"marca_dagua": de, "proxima_marca": ate}},
+                    upsert=True,
+                )
+            except DuplicateKeyError:
+                # Outra réplica planejou a janela primeiro
+                return False
+            if not (result.matched_count or result.upserted_id):
+                return False
+
+        await self._mesclar(de, ate)
+        await self.controle.update_one(
+            {"_id": CONTROLE_ID, "proxima_marca": ate},
+            {"$set": {"marca_dagua": ate}, "$unset": {"proxima_marca": ""}},
+        )
+        return True
+
+    async def _inicio_historico(self) -> datetime | None:
+        """Início da primeira janela: logo antes do item mais antigo da fila.
+
+        Usa dta_criacao e não dta_atualizacao: os eventos de um item nunca são
+        anteriores à sua criação, mas podem ser anteriores à sua última alteração.
+        """
+        primeiro = await self.db.fila_execucao.find_one(
+            {"dta_criacao": {"$type": "date"}}, {"dta_criacao": 1}, sort=[("dta_criacao", 1)]
+        )
+        return primeiro["dta_criacao"] - timedelta(milliseconds=1) if primeiro else None
+
+    async def _mesclar(self, de: datetime, ate: datetime) -> None:
+        pipeline = pipeline_rollup(de, ate) + [estagio_merge(self.collection.name)]
+        await self.db.fila_execucao.aggregate(pipeline).to_list(length=None)
+
+    async def listar(
+        self,
+        inicio: date,
+        fim: date,
+        prioridade: PrioridadeExecucao | None = None,
+        mecanico_responsavel_id: int | None = None,
+    ) -> list[dict]:
+        filtro: dict = {"dia": {"$gte": inicio.isoformat(), "$lte": fim.isoformat()}}
+        if prioridade:
+            filtro["prioridade"] = prioridade.value
+        if mecanico_responsavel_id is not None:
+            filtro["mecanico_responsavel_id"] = mecanico_responsavel_id
+
+        busca = self.collection.find(filtro, {"_id": 0, "consolidado_ate": 0})
+        busca = busca.sort([("dia", 1), ("prioridade", 1), ("mecanico_responsavel_id", 1)])
+        return await busca.to_list(length=None)
+
+    async def marca_dagua(self) -> datetime | None:
+        controle = await self.controle.find_one({"_id": CONTROLE_ID})
+        return controle.get("marca_dagua") if controle else None
+
+
+class ConsolidadorRollupFila:
+    """Executa a consolidação dos totais diários a cada ROLLUP_INTERVALO segundos.
+
+    Enquanto a marca d'água estiver mais de uma janela atrás do relógio, as
+    janelas seguem uma após a outra, sem esperar o intervalo.
+    """
+
+    def __init__(self):
+        self._tarefa: asyncio.Task | None = None
+
+    def iniciar(self, db: AsyncIOMotorDatabase) -> None:
+        self._tarefa = asyncio.create_task(self._executar(db))
+
+    async def parar(self) -> None:
+        if self._tarefa:
+            self._tarefa.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._tarefa
+            self._tarefa = None
+
+    async def _executar(self, db: AsyncIOMotorDatabase) -> None:
+        repo = RollupFilaRepository(db)
+        while True:
+            atrasado = False
+            try:
+                if await repo.consolidar():
+                    # Recuperando um histórico longo: a próxima janela segue sem esperar o intervalo
+                    marca_dagua = await repo.marca_dagua()
+                    atrasado = datetime.now() - marca_dagua > timedelta(days=settings.ROLLUP_JANELA_MAXIMA_DIAS)
+            except Exception as e:
+                logger.error(f"Erro ao consolidar os totais diários da fila: {e}")
+            if not atrasado:
+                await asyncio.sleep(settings.ROLLUP_INTERVALO)
+
+
+consolidador_rollup_fila = ConsolidadorRollupFila()
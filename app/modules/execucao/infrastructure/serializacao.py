@@ -0,0 +1,25 @@
+from pydantic_core import to_json
+
+from app.modules.execucao.application.dto import FilaExecucaoOutputDTO
+from app.modules.execucao.domain.entities import FilaExecucao
+
+
+# Campos de saída, na ordem de FilaExecucaoOutputDTO
+CAMPOS_SAIDA = list(FilaExecucaoOutputDTO.model_fields)
+
+
+def documentos_to_json(documents: list[dict], campos: list[str] = CAMPOS_SAIDA) -> bytes:
+    """Serializa documentos do MongoDB direto para o JSON da API, sem entidade nem DTO.
+
+    Só para dados gravados pela própria aplicação (já válidos): não há validação.
+    O resultado é o mesmo JSON de FilaExecucaoOutputDTO para os mesmos campos.
+    """
+    return to_json([
+        {campo: str(document["_id"]) if campo == "fila_id" else document.get(campo) for campo in campos}
+        for document in documents
+    ])
+
+
+def entidades_to_json(filas: list[FilaExecucao], campos: list[str] = CAMPOS_SAIDA) -> bytes:
+    """Como documentos_to_json, para entidades já em memória (visão da fila)"""
+    return to_json([{campo: getattr(fila, campo) for campo in campos} for fila in filas])
@@ -0,0 +1,146 @@
+import asyncio
+import bisect
+import logging
+from contextlib import suppress
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.core.config import settings
+from app.modules.execucao.application.dto import TipoEventoFila
+from app.modules.execucao.domain.entities import FilaExecucao, StatusExecucao
+from app.modules.execucao.infrastructure.eventos import EventoFila, publicador_eventos_fila
+from app.modules.execucao.infrastructure.mapper import FilaExecucaoMapper
+from app.modules.execucao.infrastructure.paginacao import decodificar_cursor
+
+
+logger = logging.getLogger(__name__)
+
+
+class VisaoFilaExecucao:
+    """Cópia em memória da fila, ordenada por status, mantida por um change stream.
+
+    Carrega a coleção uma vez e aplica as alterações do change stream de
+    `fila_execucao` (requer replica set). Enquanto não está pronta, ou depois de
+    uma queda do stream até recarregar, `listar` retorna None e as consultas vão
+    ao MongoDB. As escritas aparecem aqui com o atraso do stream (milissegundos).
+    """
+
+    def __init__(self):
+        self.pronta = False
+        self._tarefa: asyncio.Task | None = None
+        self._limpar()
+
+    def iniciar(self, colecao: AsyncIOMotorCollection) -> None:
+        self._tarefa = asyncio.create_task(self._executar(colecao))
+
+    async def parar(self) -> None:
+        if self._tarefa:
+            self._tarefa.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._tarefa
+            self._tarefa = None
+        self.pronta = False
+        self._limpar()
+
+    def listar(
+        self, status: StatusExecucao | None = None, limite: int | None = None, cursor: str | None = None
+    ) -> list[FilaExecucao] | None:
+        """Mesmo resultado de `listar_por_status`/`listar_todas` do repositório, ou None se indisponível"""
+        if not self.pronta:
+            return None
+
+        chaves = self._chaves[status]
+        inicio = 0
+        if cursor:
+            peso, dta_criacao, fila_id = decodificar_cursor(cursor)
+            inicio = bisect.bisect_right(chaves, (-peso, dta_criacao, fila_id))
+        fim = inicio + limite if limite else len(chaves)
+        return [self._itens[chave[2]][1] for chave in chaves[inicio:fim]]
+
+    async def _executar(self, colecao: AsyncIOMotorCollection) -> None:
+        while True:
+            try:
+                # O stream é aberto antes da carga: nada do que mudar durante ela se perde
+                async with colecao.watch(full_document="updateLookup") as stream:
+                    await self._carregar(colecao)
+                    self.pronta = True
+                    logger.info(f"Visão da fila carregada com {len(self._itens)} itens")
+                    async for mudanca in stream:
+                        self._aplicar(mudanca)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Change stream da fila interrompido, consultas voltam ao MongoDB: {e}")
+            self.pronta = False
+            # Eventos do intervalo sem stream se perdem: o feed recomeça pelo snapshot
+            publicador_eventos_fila.encerrar_assinaturas()
+            self._limpar()
+            await asyncio.sleep(settings.VISAO_FILA_RECONEXAO)
+
+    async def _carregar(self, colecao: AsyncIOMotorCollection) -> None:
+        self._limpar()
+        async for document in colecao.find({}):
+            self._guardar(document)
+
+    def _aplicar(self, mudanca: dict) -> None:
+        """Aplica um evento do change stream e o publica no feed da fila"""
+        operacao = mudanca["operationType"]
+        if operacao in ("insert", "update", "replace"):
+            # Com updateLookup, fullDocument é o estado atual (None se já foi removido)
+            document = mudanca.get("fullDocument")
+            if document:
+                anterior = self._itens.get(document["_id"])
+                fila = self._guardar(document)
+                self._publicar(anterior[1] if anterior else None, fila)
+            else:
+                self._remover_e_publicar(mudanca["documentKey"]["_id"])
+        elif operacao == "delete":
+            self._remover_e_publicar(mudanca["documentKey"]["_id"])
+        elif operacao in ("drop", "rename", "dropDatabase", "invalidate"):
+            raise RuntimeError(f"change stream encerrado por {operacao}")
+
+    def _publicar(self, anterior: FilaExecucao | None, fila: FilaExecucao) -> None:
+        if anterior is None:
+            tipo = TipoEventoFila.ADICIONADO
+        elif anterior.status != fila.status:
+            tipo = TipoEventoFila.TRANSICIONADO
+        elif anterior.prioridade != fila.prioridade:
+            tipo = TipoEventoFila.REPRIORIZADO
+        elif anterior.dta_atualizacao != fila.dta_atualizacao:
+            tipo = TipoEventoFila.ATUALIZADO
+        else:
+            # Só campos internos mudaram (ex.: outbox)
+            return
+        publicador_eventos_fila.publicar(EventoFila(tipo, fila.fila_id, fila))
+
+    def _remover_e_publicar(self, fila_id) -> None:
+        self._remover(fila_id)
+        publicador_eventos_fila.publicar(EventoFila(TipoEventoFila.REMOVIDO, str(fila_id)))
+
+    def _guardar(self, document: dict) -> FilaExecucao:
+        self._remover(document["_id"])
+        fila = FilaExecucaoMapper.document_to_entity(document)
+        # Mesma ordem de ORDENACAO_FILA: peso desc, dta_criacao asc, _id asc
+        chave = (-fila.prioridade.peso, fila.dta_criacao, document["_id"])
+        self._itens[document["_id"]] = (chave, fila)
+        bisect.insort(self._chaves[None], chave)
+        bisect.insort(self._chaves[fila.status], chave)
+        return fila
+
+    def _remover(self, fila_id) -> None:
+        item = self._itens.pop(fila_id, None)
+        if not item:
+            return
+        chave, fila = item
+        for chaves in (self._chaves[None], self._chaves[fila.status]):
+            chaves.pop(bisect.bisect_left(chaves, chave))
+
+    def _limpar(self) -> None:
+        self._itens: dict = {}
+        # Uma lista ordenada por status e uma com todos os itens (chave None)
+        self._chaves: dict[StatusExecucao | None, list[tuple]] = {
+            status: [] for status in [None, *StatusExecucao]
+        }
+
+
+visao_fila_execucao = VisaoFilaExecucao()
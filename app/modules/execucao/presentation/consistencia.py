@@ -0,0 +1,36 @@
+import time
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+
+
+COOKIE_ESCRITA = "fila_escrita_em"
+HEADER_ESCRITA = "X-Escrita-Em"
+
+
+async def marcar_escrita(request: Request, response: Response) -> None:
+    """Marca nas respostas de escrita o instante da escrita (cookie e header).
+
+    O cliente que a reenvia em uma listagem, por cookie ou pelo header
+    X-Escrita-Em, lê da primária enquanto uma secundária ainda pode estar atrasada.
+    """
+    if request.method in ("GET", "HEAD", "OPTIONS"):
+        return
+    escrita_em = f"{time.time():.3f}"
+    response.headers[HEADER_ESCRITA] = escrita_em
+    response.set_cookie(
+        COOKIE_ESCRITA, escrita_em, max_age=settings.MONGODB_MAX_STALENESS_SECONDS, httponly=True, samesite="lax"
+    )
+
+
+def escrita_recente(escrita_em: str | None) -> bool:
+    """True se a escrita informada ainda cabe na defasagem aceita das secundárias"""
+    if not escrita_em:
+        return False
+    try:
+        decorrido = time.time() - float(escrita_em)
+    except ValueError:
+        return False
+    # Tolera relógios um pouco adiantados entre réplicas, sem fixar na primária para sempre
+    return abs(decorrido) < settings.MONGODB_MAX_STALENESS_SECONDS
@@ -0,0 +1,23 @@
+from fastapi import Response
+
+
+def formatar_etag(versao: str) -> str:
+    """ETag fraco: a representação é equivalente, não necessariamente idêntica byte a byte"""
+    return f'W/"{versao}"'
+
+
+def versoes_if_none_match(if_none_match: str | None) -> set[str]:
+    """Versões enviadas em If-None-Match, comparadas de forma fraca (sem o prefixo W/)"""
+    if not if_none_match:
+        return set()
+    versoes = set()
+    for etag in if_none_match.split(","):
+        etag = etag.strip()
+        if etag.startswith("W/"):
+            etag = etag[2:]
+        versoes.add(etag.strip('"'))
+    return versoes
+
+
+def nao_modificado(versao: str) -> Response:
+    return Response(status_code=304, headers={"ETag": formatar_etag(versao)})
@@ -1,29 +1,56 @@
-from fastapi import APIRouter, Depends, Query
+from datetime import date
+
+from fastapi import APIRouter, Cookie, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 from app.core.database import get_database
-from app.modules.execucao.domain.entities import StatusExecucao
+from app.modules.execucao.domain.entities import PrioridadeExecucao, StatusExecucao
 from app.modules.execucao.application.use_cases import (
     AdicionarFilaExecucaoUseCase,
+    AdicionarFilaExecucaoLoteUseCase,
     IniciarDiagnosticoUseCase,
     FinalizarDiagnosticoUseCase,
     IniciarReparoUseCase,
     FinalizarReparoUseCase,
     ConsultarFilaExecucaoUseCase,
+    ExportarFilaExecucaoUseCase,
+    ConsultarMetricasFilaUseCase,
+    ConsultarRollupFilaUseCase,
+    AcompanharFilaExecucaoUseCase,
     AtualizarPrioridadeUseCase,
+    AplicarOperacoesLoteUseCase,
     RemoverDaFilaUseCase,
 )
 from app.modules.execucao.application.dto import (
     FilaExecucaoOutputDTO,
+    FilaExecucaoParcialOutputDTO,
+    FilaExecucaoMetricasOutputDTO,
+    FilaExecucaoRollupOutputDTO,
     FilaExecucaoCriacaoInputDTO,
+    FilaExecucaoLoteItemOutputDTO,
     IniciarDiagnosticoInputDTO,
     FinalizarDiagnosticoInputDTO,
     IniciarReparoInputDTO,
     FinalizarReparoInputDTO,
     AtualizarPrioridadeInputDTO,
+    FormatoExportacao,
+    OperacaoFilaInputDTO,
+    OperacaoFilaResultadoOutputDTO,
 )
+from app.modules.execucao.infrastructure.exportacao import MEDIA_TYPES
+from app.modules.execucao.presentation.consistencia import escrita_recente, marcar_escrita
+from app.modules.execucao.presentation.etag import formatar_etag, nao_modificado, versoes_if_none_match
+
+
+router = APIRouter(dependencies=[Depends(marcar_escrita)])
 
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
 
-router = APIRouter()
+HEADERS_PAGINACAO = {
+    "X-Next-Cursor": {"description": "Cursor da próxima página; ausente na última", "schema": {"type": "string"}},
+    "Link": {"description": 'URL da próxima página (rel="next"); ausente na última', "schema": {"type": "string"}},
+}
 
 
 @router.post('/fila-execucao', response_model=FilaExecucaoOutputDTO, status_code=201)
@@ -36,37 +63,188 @@ async def adicionar_fila_execucao(
     return await use_case.execute(dados)
 
 
-@router.get('/fila-execucao', response_model=list[FilaExecucaoOutputDTO])
+@router.post('/fila-execucao/lote', response_model=list[FilaExecucaoLoteItemOutputDTO])
+async def adicionar_fila_execucao_lote(
+    dados: list[FilaExecucaoCriacaoInputDTO],
+    db = Depends(get_database),
+):
+    """Adiciona várias Ordens de Serviço à fila; o resultado informa cada item"""
+    use_case = AdicionarFilaExecucaoLoteUseCase(db)
+    return await use_case.execute(dados)
+
+
+@router.post('/fila-execucao/lote/operacoes', response_model=list[OperacaoFilaResultadoOutputDTO])
+async def aplicar_operacoes_lote(
+    operacoes: list[OperacaoFilaInputDTO],
+    db = Depends(get_database),
+):
+    """Aplica em lote alterações de prioridade e transições; o resultado informa cada operação"""
+    use_case = AplicarOperacoesLoteUseCase(db)
+    return await use_case.execute(operacoes)
+
+
+# O JSON sai pronto do caso de uso (sem response_model); o schema só documenta as duas formas
+@router.get(
+    '/fila-execucao',
+    response_class=Response,
+    responses={200: {
+        "model": list[FilaExecucaoOutputDTO] | list[FilaExecucaoParcialOutputDTO],
+        "description": "Itens completos ou, com `fields`, só com os campos pedidos",
+        "headers": HEADERS_PAGINACAO,
+    }},
+)
 async def listar_fila_execucao(
+    request: Request,
     status: StatusExecucao | None = Query(None, description="Filtrar por status"),
+    limit: int = Query(
+        LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO,
+        description=f"Itens por página; sem `limit`, a resposta também para em {LIMITE_PADRAO} itens",
+    ),
+    cursor: str | None = Query(None, description="Cursor retornado no header X-Next-Cursor"),
+    fields: str | None = Query(None, description="Campos a retornar, separados por vírgula (ex.: fila_id,status)"),
+    if_none_match: str | None = Header(None),
+    x_escrita_em: str | None = Header(None),
+    fila_escrita_em: str | None = Cookie(None),
     db = Depends(get_database),
 ):
-    """Lista todos os itens da fila de execução, opcionalmente filtrados por status"""
-    use_case = ConsultarFilaExecucaoUseCase(db)
+    """Lista os itens da fila de execução, opcionalmente filtrados por status.
+
+    A resposta é sempre uma página: sem `limit`, de LIMITE_PADRAO itens. Quando
+    houver mais itens, o header X-Next-Cursor traz o valor a ser enviado em
+    `cursor` e o header Link (rel="next") a URL completa da próxima página.
+    O ETag é calculado a partir dos itens da própria página: com If-None-Match
+    igual ao ETag anterior, responde 304 se a página não mudou.
+    Com `fields`, cada item traz apenas os campos pedidos.
+    Logo depois de uma escrita do mesmo cliente (cookie fila_escrita_em ou
+    header X-Escrita-Em devolvidos pela escrita), a leitura vai à primária.
+    """
+    use_case = ConsultarFilaExecucaoUseCase(db, leitura_secundaria=not escrita_recente(x_escrita_em or fila_escrita_em))
+    campos = [campo.strip() for campo in fields.split(",") if campo.strip()] if fields else None
+    # Documentos confiáveis, gravados pela própria API: o JSON sai direto do MongoDB,
+    # sem passar por entidade, DTO e revalidação do response_model
+    pagina = await use_case.execute_paginado_json(status, limit, cursor, campos, versoes_if_none_match(if_none_match))
+    if pagina.conteudo is None:
+        return nao_modificado(pagina.versao)
+    
+    headers = {"ETag": formatar_etag(pagina.versao)}
+    if pagina.next_cursor:
+        headers["X-Next-Cursor"] = pagina.next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=pagina.next_cursor)}>; rel="next"'
+    return Response(content=pagina.conteudo, media_type="application/json", headers=headers)
+
+
+@router.get('/fila-execucao/exportar', response_class=StreamingResponse)
+async def exportar_fila_execucao(
+    status: StatusExecucao | None = Query(None, description="Filtrar por status"),
+    formato: FormatoExportacao = Query(FormatoExportacao.NDJSON, description="Formato do arquivo"),
+    gzip: bool = Query(False, description="Compactar o arquivo com gzip"),
+    db = Depends(get_database),
+):
+    """Exporta a fila de execução (inclusive itens finalizados) em streaming"""
+    use_case = ExportarFilaExecucaoUseCase(db)
+    
+    nome_arquivo = f"fila-execucao.{formato.value}"
+    media_type = MEDIA_TYPES[formato]
+    if gzip:
+        nome_arquivo += ".gz"
+        media_type = "application/gzip"
     
-    if status:
-        return await use_case.execute_por_status(status)
-    return await use_case.execute_listar_todas()
+    return StreamingResponse(
+        use_case.execute(status, formato, compactar=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}"'},
+    )
+
+
+@router.get('/fila-execucao/metricas', response_model=FilaExecucaoMetricasOutputDTO)
+async def metricas_fila_execucao(
+    db = Depends(get_database),
+):
+    """Totais por status e prioridade e durações médias de diagnóstico e reparo.
+
+    Calculadas no MongoDB em uma única agregação e reaproveitadas por alguns segundos.
+    """
+    use_case = ConsultarMetricasFilaUseCase(db)
+    return await use_case.execute()
+
+
+@router.get('/fila-execucao/rollups', response_model=FilaExecucaoRollupOutputDTO)
+async def rollups_fila_execucao(
+    inicio: date = Query(..., description="Primeiro dia do período"),
+    fim: date = Query(..., description="Último dia do período"),
+    prioridade: PrioridadeExecucao | None = Query(None, description="Filtrar por prioridade"),
+    mecanico_responsavel_id: int | None = Query(None, description="Filtrar por mecânico"),
+    db = Depends(get_database),
+):
+    """Diagnósticos e reparos iniciados e finalizados por dia, prioridade e mecânico.
+
+    Lidos dos totais diários consolidados periodicamente; `consolidado_ate` indica
+    até quando os eventos já foram contabilizados.
+    """
+    use_case = ConsultarRollupFilaUseCase(db)
+    return await use_case.execute(inicio, fim, prioridade, mecanico_responsavel_id)
+
+
+@router.get('/fila-execucao/eventos', response_class=StreamingResponse)
+async def acompanhar_fila_execucao(
+    status: StatusExecucao | None = Query(None, description="Filtrar por status"),
+    db = Depends(get_database),
+):
+    """Feed da fila em Server-Sent Events.
+
+    Envia um evento `snapshot` com os itens atuais e depois um evento por
+    alteração (ADICIONADO, TRANSICIONADO, REPRIORIZADO, ATUALIZADO, REMOVIDO).
+    """
+    use_case = AcompanharFilaExecucaoUseCase(db)
+    return StreamingResponse(
+        use_case.execute(status),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get('/fila-execucao/{fila_id}', response_model=FilaExecucaoOutputDTO)
 async def consultar_fila_execucao(
     fila_id: str,
+    response: Response,
+    if_none_match: str | None = Header(None),
     db = Depends(get_database),
 ):
     """Consulta um item específico da fila de execução"""
     use_case = ConsultarFilaExecucaoUseCase(db)
-    return await use_case.execute_por_id(fila_id)
+    versao, fila = await use_case.execute_versionado_por_id(fila_id, versoes_if_none_match(if_none_match))
+    if fila is None:
+        return nao_modificado(versao)
+    response.headers["ETag"] = formatar_etag(versao)
+    return fila
 
 
 @router.get('/fila-execucao/ordem-servico/{ordem_servico_id}', response_model=FilaExecucaoOutputDTO)
 async def consultar_fila_por_ordem_servico(
     ordem_servico_id: int,
+    response: Response,
+    if_none_match: str | None = Header(None),
     db = Depends(get_database),
 ):
     """Consulta item da fila por ID da Ordem de Serviço"""
     use_case = ConsultarFilaExecucaoUseCase(db)
-    return await use_case.execute_por_ordem_servico(ordem_servico_id)
+    versao, fila = await use_case.execute_versionado_por_ordem_servico(
+        ordem_servico_id, versoes_if_none_match(if_none_match)
+    )
+    if fila is None:
+        return nao_modificado(versao)
+    response.headers["ETag"] = formatar_etag(versao)
+    return fila
+
+
+@router.post('/fila-execucao/proxima', response_model=FilaExecucaoOutputDTO)
+async def reivindicar_proxima(
+    dados: IniciarDiagnosticoInputDTO,
+    db = Depends(get_database),
+):
+    """Atribui ao mecânico o próximo item aguardando e inicia o diagnóstico"""
+    use_case = IniciarDiagnosticoUseCase(db)
+    return await use_case.execute_proxima(dados)
 
 
 @router.post('/fila-execucao/{fila_id}/iniciar-diagnostico', response_model=FilaExecucaoOutputDTO)
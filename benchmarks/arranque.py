@@ -0,0 +1,98 @@
+"""Cold start da API: tempo de import de app.main e tempo até a primeira resposta.
+
+    python -m benchmarks.arranque --repeticoes 5
+
+Cada medição roda em um processo novo, com as variáveis de ambiente da API já
+exportadas (ver README). Modos comparados:
+
+- sem tracing: TRACING_HABILITADO=false (ddtrace nem é importado)
+- tracing: iniciar_tracing() com as integrações de TRACING_INTEGRACOES
+- ddtrace-run: o entrypoint anterior da imagem, que instrumenta tudo no boot
+
+A primeira resposta é a de GET /health, que não consulta o MongoDB. A
+verificação de índices do startup é desligada (MONGODB_VERIFICAR_INDICES=false)
+para não medir a seleção de servidor; sem MongoDB acessível, as tarefas em
+segundo plano só registram erros, sem atrasar a resposta.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+MODOS = {
+    "sem tracing": ({"TRACING_HABILITADO": "false"}, []),
+    "tracing": ({"TRACING_HABILITADO": "true"}, []),
+    "ddtrace-run": ({"TRACING_HABILITADO": "false"}, ["ddtrace-run"]),
+}
+
+CODIGO_IMPORT = "import time; inicio = time.perf_counter(); import app.main; print(time.perf_counter() - inicio)"
+
+
+def ambiente(variaveis: dict) -> dict:
+    return {**os.environ, "MONGODB_VERIFICAR_INDICES": "false", **variaveis}
+
+
+def medir_import(variaveis: dict, prefixo: list[str]) -> float:
+    """Segundos gastos no import de app.main, sem a inicialização do interpretador"""
+    saida = subprocess.run(
+        [*prefixo, sys.executable, "-c", CODIGO_IMPORT],
+        env=ambiente(variaveis), capture_output=True, text=True, check=True,
+    )
+    return float(saida.stdout.strip().splitlines()[-1])
+
+
+def porta_livre() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def medir_primeira_requisicao(variaveis: dict, prefixo: list[str], limite: float = 60.0) -> float:
+    """Segundos entre o início do processo do uvicorn e a primeira resposta 200"""
+    porta = porta_livre()
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [*prefixo, sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(porta), "--log-level", "warning"],
+        env=ambiente(variaveis), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - inicio < limite:
+            if processo.poll() is not None:
+                raise RuntimeError(f"uvicorn terminou com código {processo.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{porta}/health", timeout=1) as resposta:
+                    if resposta.status == 200:
+                        return time.perf_counter() - inicio
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"sem resposta em {limite}s")
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--modos", nargs="+", choices=list(MODOS), default=list(MODOS))
+    args = parser.parse_args()
+
+    print(f"Mediana de {args.repeticoes} processos")
+    print(f"  {'modo':<12} {'import app.main':>16} {'1ª resposta':>12}")
+    for modo in args.modos:
+        variaveis, prefixo = MODOS[modo]
+        imports = [medir_import(variaveis, prefixo) for _ in range(args.repeticoes)]
+        respostas = [medir_primeira_requisicao(variaveis, prefixo) for _ in range(args.repeticoes)]
+        print(
+            f"  {modo:<12} {statistics.median(imports) * 1000:>13.0f} ms"
+            f" {statistics.median(respostas) * 1000:>9.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
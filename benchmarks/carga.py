@@ -0,0 +1,394 @@
+"""Teste de carga do ciclo de vida da fila: RPS e p50/p95/p99 por endpoint.
+
+    python -m benchmarks.carga --duracao 30 --usuarios 20
+    python -m benchmarks.carga --mongodb --duracao 60 --limites benchmarks/limites_carga.json
+    python -m benchmarks.carga --gravar-limites benchmarks/limites_carga.json
+
+A API roda no próprio processo (httpx + ASGITransport), sem servidor HTTP. O
+banco é o mesmo MongoDB em memória dos testes (mongomock, ver tests/conftest.py)
+ou, com --mongodb, o MongoDB de MONGODB_URL, em um banco descartável
+(`<MONGODB_DATABASE>_carga`) apagado no fim. O serviço de OS é substituído por
+um transporte httpx que responde 200 depois de --latencia-os ms, e o
+despachante do outbox roda como no startup da API.
+
+Cada usuário virtual sorteia, pelos pesos de --mix, um dos cenários:
+
+- enfileirar: POST /fila-execucao
+- atender: POST /fila-execucao/proxima, finalizar-diagnostico, iniciar-reparo
+  e finalizar-reparo do item reivindicado
+- listar: GET /fila-execucao (uma página, às vezes filtrada por status)
+- repriorizar: PATCH /fila-execucao/{id}/prioridade de um item enfileirado
+
+Com o mongomock as operações do banco rodam no próprio event loop: os números
+medem o custo da aplicação (rotas, casos de uso, serialização), não o do
+MongoDB. Compare execuções do mesmo modo na mesma máquina.
+
+O tracing fica desligado (TRACING_HABILITADO=false) independentemente do
+ambiente: sem agente do Datadog, ele mede o exportador, não a aplicação.
+
+Com --limites, sai com código 1 se algum limite for excedido. O arquivo JSON
+tem `rps_minimo`, `taxa_erros_maxima` e, em `endpoints`, `p50_ms`/`p95_ms`/
+`p99_ms` por endpoint (`*` vale para os não listados). Como em
+benchmarks.micro, o arquivo guarda o custo da carga de referência da máquina
+em que foi gerado: os limites são multiplicados (latências) ou divididos (RPS)
+pela razão entre a referência medida agora e a gravada, o que desconta uma
+máquina mais lenta ou mais rápida como um todo. --gravar-limites gera o
+arquivo a partir da execução, com --folga de margem, e registra a máquina.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import httpx
+
+# Antes de importar a aplicação, que lê a configuração e instrumenta na importação
+os.environ["TRACING_HABILITADO"] = "false"
+
+from app.core.config import settings
+from app.core.database import get_database, opcoes_pool
+from app.main import app
+from app.modules.execucao.domain.entities import PrioridadeExecucao, StatusExecucao
+from app.modules.execucao.infrastructure.indices import sincronizar_indices
+from app.modules.execucao.infrastructure.ordem_servico_client import ordem_servico_client
+from app.modules.execucao.infrastructure.outbox import despachante_outbox
+from benchmarks.micro import ITENS_POR_CASO, maquina, medir, referencia
+
+
+MIX_PADRAO = "enfileirar=2,atender=2,listar=4,repriorizar=1"
+LOTE_CARGA_INICIAL = 500
+
+
+class Medicoes:
+    """Latências e erros por endpoint, só depois do aquecimento"""
+
+    def __init__(self):
+        self.latencias: dict[str, list[float]] = defaultdict(list)
+        self.erros: dict[str, int] = defaultdict(int)
+        self.medindo = False
+        self.inicio = 0.0
+        self.fim = 0.0
+
+    def iniciar(self) -> None:
+        self.medindo = True
+        self.inicio = time.perf_counter()
+
+    def encerrar(self) -> None:
+        self.medindo = False
+        self.fim = time.perf_counter()
+
+    async def requisitar(
+        self, cliente: httpx.AsyncClient, endpoint: str, metodo: str, url: str,
+        esperados: tuple[int, ...] = (200, 201), **kwargs,
+    ) -> httpx.Response | None:
+        """Executa e mede a requisição; retorna None se a resposta não for a esperada"""
+        inicio = time.perf_counter()
+        try:
+            resposta = await cliente.request(metodo, url, **kwargs)
+        except Exception:
+            resposta = None
+        duracao = time.perf_counter() - inicio
+
+        if self.medindo:
+            self.latencias[endpoint].append(duracao)
+            if resposta is None or resposta.status_code not in esperados:
+                self.erros[endpoint] += 1
+        if resposta is None or resposta.status_code not in esperados:
+            return None
+        return resposta
+
+
+class Cenarios:
+    """Cenários do usuário virtual, com o estado compartilhado entre eles"""
+
+    def __init__(self, cliente: httpx.AsyncClient, medicoes: Medicoes, proxima_os: itertools.count):
+        self.cliente = cliente
+        self.medicoes = medicoes
+        self.proxima_os = proxima_os
+        self.aguardando: list[str] = []
+
+    async def enfileirar(self) -> None:
+        resposta = await self.medicoes.requisitar(
+            self.cliente, "POST /fila-execucao", "POST", "/fila-execucao",
+            json={"ordem_servico_id": next(self.proxima_os), "prioridade": random.choice(list(PrioridadeExecucao))},
+        )
+        if resposta:
+            self.aguardando.append(resposta.json()["fila_id"])
+
+    async def atender(self) -> None:
+        mecanico = random.randint(1, 20)
+        # 404: fila vazia, não é erro
+        resposta = await self.medicoes.requisitar(
+            self.cliente, "POST /fila-execucao/proxima", "POST", "/fila-execucao/proxima",
+            esperados=(200, 404), json={"mecanico_responsavel_id": mecanico},
+        )
+        if resposta is None or resposta.status_code == 404:
+            return
+        fila_id = resposta.json()["fila_id"]
+        etapas = [
+            ("finalizar-diagnostico", {"diagnostico": "Troca de pastilhas e disco de freio dianteiro."}),
+            ("iniciar-reparo", {"mecanico_responsavel_id": mecanico}),
+            ("finalizar-reparo", {"observacoes_reparo": "Reparo concluído."}),
+        ]
+        for etapa, corpo in etapas:
+            resposta = await self.medicoes.requisitar(
+                self.cliente, f"POST /fila-execucao/{{id}}/{etapa}", "POST", f"/fila-execucao/{fila_id}/{etapa}",
+                json=corpo,
+            )
+            if resposta is None:
+                return
+
+    async def listar(self) -> None:
+        params = {"limit": 50}
+        if random.random() < 0.5:
+            params["status"] = random.choice(list(StatusExecucao)).value
+        await self.medicoes.requisitar(
+            self.cliente, "GET /fila-execucao", "GET", "/fila-execucao", params=params,
+        )
+
+    async def repriorizar(self) -> None:
+        if not self.aguardando:
+            return await self.enfileirar()
+        fila_id = random.choice(self.aguardando)
+        await self.medicoes.requisitar(
+            self.cliente, "PATCH /fila-execucao/{id}/prioridade", "PATCH", f"/fila-execucao/{fila_id}/prioridade",
+            json={"prioridade": random.choice(list(PrioridadeExecucao))},
+        )
+
+
+def ler_mix(valor: str) -> dict[str, int]:
+    mix = {}
+    for parte in valor.split(","):
+        nome, _, peso = parte.partition("=")
+        if nome.strip() not in ("enfileirar", "atender", "listar", "repriorizar"):
+            raise argparse.ArgumentTypeError(f"cenário desconhecido: {nome}")
+        mix[nome.strip()] = int(peso)
+    return mix
+
+
+def percentil(valores: list[float], p: float) -> float:
+    """Percentil pelo posto mais próximo, em milissegundos"""
+    ordenados = sorted(valores)
+    posto = max(0, min(len(ordenados) - 1, math.ceil(p / 100 * len(ordenados)) - 1))
+    return ordenados[posto] * 1000
+
+
+def resumir(medicoes: Medicoes) -> dict:
+    duracao = medicoes.fim - medicoes.inicio
+    endpoints = {}
+    for endpoint, latencias in sorted(medicoes.latencias.items()):
+        endpoints[endpoint] = {
+            "requisicoes": len(latencias),
+            "erros": medicoes.erros[endpoint],
+            "rps": len(latencias) / duracao,
+            "p50_ms": percentil(latencias, 50),
+            "p95_ms": percentil(latencias, 95),
+            "p99_ms": percentil(latencias, 99),
+        }
+    total = sum(resultado["requisicoes"] for resultado in endpoints.values())
+    erros = sum(resultado["erros"] for resultado in endpoints.values())
+    return {
+        "duracao": duracao,
+        "rps": total / duracao if duracao else 0.0,
+        "taxa_erros": erros / total if total else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def medir_referencia() -> float:
+    """Custo da carga de referência de benchmarks.micro nesta máquina (µs/item)"""
+    return min(medir(referencia, ITENS_POR_CASO, 7) for _ in range(3))
+
+
+def escalar_limites(limites: dict, referencia_atual: float) -> dict:
+    """Limites ajustados à máquina atual pela razão entre as referências"""
+    if "referencia" not in limites:
+        return limites
+    escala = referencia_atual / limites["referencia"]
+    print(f"Referência: {limites['referencia']:.3f} -> {referencia_atual:.3f} µs/item (limites x{escala:.2f})")
+    ajustados = {
+        **limites,
+        "endpoints": {
+            endpoint: {metrica: maximo * escala for metrica, maximo in metricas.items()}
+            for endpoint, metricas in limites.get("endpoints", {}).items()
+        },
+    }
+    if "rps_minimo" in limites:
+        ajustados["rps_minimo"] = limites["rps_minimo"] / escala
+    return ajustados
+
+
+def gerar_limites(resumo: dict, referencia_atual: float, folga: float, args: argparse.Namespace) -> dict:
+    """Limites a partir de uma execução, com `folga` de margem sobre o medido.
+
+    Um limite só (`*`), o do endpoint mais lento: com usuários em laço fechado a
+    latência é dominada pela espera na fila do event loop, parecida entre os
+    endpoints, e os percentis de um endpoint com poucas requisições oscilam demais.
+    """
+    endpoints = {"*": {
+        metrica: math.ceil(max(resultado[metrica] for resultado in resumo["endpoints"].values()) * (1 + folga))
+        for metrica in ("p95_ms", "p99_ms")
+    }}
+    return {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "maquina": {**maquina(), "cpus": os.cpu_count()},
+        "parametros": {
+            "duracao": args.duracao, "usuarios": args.usuarios, "itens_iniciais": args.itens_iniciais,
+            "mongodb": args.mongodb,
+        },
+        "referencia": round(referencia_atual, 4),
+        "rps_minimo": math.floor(resumo["rps"] / (1 + folga)),
+        "taxa_erros_maxima": 0.01,
+        "endpoints": endpoints,
+    }
+
+
+def verificar_limites(resumo: dict, limites: dict) -> list[str]:
+    """Descrição de cada limite excedido; vazia se a execução passou"""
+    violacoes = []
+    if "rps_minimo" in limites and resumo["rps"] < limites["rps_minimo"]:
+        violacoes.append(f"RPS total {resumo['rps']:.1f} < {limites['rps_minimo']:.1f}")
+    if "taxa_erros_maxima" in limites and resumo["taxa_erros"] > limites["taxa_erros_maxima"]:
+        violacoes.append(f"taxa de erros {resumo['taxa_erros']:.2%} > {limites['taxa_erros_maxima']:.2%}")
+    por_endpoint = limites.get("endpoints", {})
+    for endpoint, resultado in resumo["endpoints"].items():
+        for metrica, maximo in por_endpoint.get(endpoint, por_endpoint.get("*", {})).items():
+            if resultado[metrica] > maximo:
+                violacoes.append(f"{endpoint}: {metrica} {resultado[metrica]:.1f} > {maximo:.0f}")
+    return violacoes
+
+
+def imprimir(resumo: dict) -> None:
+    print(f"{resumo['duracao']:.1f}s medidos, {resumo['rps']:.1f} req/s, {resumo['taxa_erros']:.2%} de erros")
+    print(f"  {'endpoint':<48} {'req':>7} {'erros':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for endpoint, resultado in resumo["endpoints"].items():
+        print(
+            f"  {endpoint:<48} {resultado['requisicoes']:>7} {resultado['erros']:>6} {resultado['rps']:>8.1f}"
+            f" {resultado['p50_ms']:>6.1f}ms {resultado['p95_ms']:>6.1f}ms {resultado['p99_ms']:>6.1f}ms"
+        )
+
+
+async def abrir_banco(usar_mongodb: bool):
+    """Banco da execução e a função que o descarta no fim"""
+    if usar_mongodb:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        cliente = AsyncIOMotorClient(settings.MONGODB_URL, **opcoes_pool())
+        nome = f"{settings.MONGODB_DATABASE}_carga"
+        await cliente.drop_database(nome)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+
+        cliente = AsyncMongoMockClient()
+        nome = "carga_oficina_execucao"
+    db = cliente[nome]
+    await sincronizar_indices(db)
+
+    async def descartar():
+        await cliente.drop_database(nome)
+        cliente.close()
+
+    return db, descartar
+
+
+async def carga_inicial(cliente: httpx.AsyncClient, quantidade: int, proxima_os: itertools.count) -> None:
+    """Itens aguardando antes da medição, para as listagens e reivindicações não partirem do vazio"""
+    prioridades = list(PrioridadeExecucao)
+    for inicio in range(0, quantidade, LOTE_CARGA_INICIAL):
+        itens = [
+            {"ordem_servico_id": next(proxima_os), "prioridade": random.choice(prioridades).value}
+            for _ in range(min(LOTE_CARGA_INICIAL, quantidade - inicio))
+        ]
+        resposta = await cliente.post("/fila-execucao/lote", json=itens)
+        resposta.raise_for_status()
+
+
+async def executar(args: argparse.Namespace) -> dict:
+    async def responder_os(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(args.latencia_os / 1000)
+        return httpx.Response(200, json={})
+
+    db, descartar = await abrir_banco(args.mongodb)
+    app.dependency_overrides[get_database] = lambda: db
+    ordem_servico_client.iniciar(transport=httpx.MockTransport(responder_os))
+    if settings.OUTBOX_HABILITADO:
+        despachante_outbox.iniciar(db)
+
+    medicoes = Medicoes()
+    proxima_os = itertools.count(1)
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://carga") as cliente:
+            await carga_inicial(cliente, args.itens_iniciais, proxima_os)
+            cenarios = Cenarios(cliente, medicoes, proxima_os)
+            nomes, pesos = zip(*args.mix.items())
+
+            async def usuario(ate: float) -> None:
+                while time.perf_counter() < ate:
+                    await getattr(cenarios, random.choices(nomes, pesos)[0])()
+
+            fim = time.perf_counter() + args.aquecimento + args.duracao
+            usuarios = [asyncio.create_task(usuario(fim)) for _ in range(args.usuarios)]
+            await asyncio.sleep(args.aquecimento)
+            medicoes.iniciar()
+            await asyncio.gather(*usuarios)
+            medicoes.encerrar()
+    finally:
+        await despachante_outbox.parar()
+        await ordem_servico_client.fechar()
+        app.dependency_overrides.clear()
+        await descartar()
+    return resumir(medicoes)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duracao", type=float, default=30.0, help="segundos medidos")
+    parser.add_argument("--aquecimento", type=float, default=3.0, help="segundos iniciais descartados")
+    parser.add_argument("--usuarios", type=int, default=20, help="usuários virtuais simultâneos")
+    parser.add_argument("--mix", type=ler_mix, default=ler_mix(MIX_PADRAO), help=f"pesos dos cenários ({MIX_PADRAO})")
+    parser.add_argument("--itens-iniciais", type=int, default=1000)
+    parser.add_argument("--latencia-os", type=float, default=5.0, help="ms de resposta do serviço de OS simulado")
+    parser.add_argument("--mongodb", action="store_true", help="usa o MongoDB de MONGODB_URL em vez do mongomock")
+    parser.add_argument("--limites", help="JSON com os limites de regressão")
+    parser.add_argument("--gravar-limites", help="grava limites gerados a partir desta execução neste arquivo")
+    parser.add_argument("--folga", type=float, default=0.5, help="margem dos limites gravados (0.5 = 50%%)")
+    parser.add_argument("--json", help="grava o resumo neste arquivo")
+    parser.add_argument("--semente", type=int, help="semente do sorteio dos cenários")
+    args = parser.parse_args()
+    random.seed(args.semente)
+    # Um log por requisição, do cliente da carga e do serviço de OS simulado
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    # Antes e depois da carga, para uma variação de carga da máquina durante a execução pesar menos
+    medidas_referencia = [medir_referencia()]
+    resumo = asyncio.run(executar(args))
+    medidas_referencia.append(medir_referencia())
+    resumo["referencia"] = min(medidas_referencia)
+    imprimir(resumo)
+    if args.json:
+        with open(args.json, "w") as arquivo:
+            json.dump(resumo, arquivo, indent=2)
+    if args.gravar_limites:
+        with open(args.gravar_limites, "w") as arquivo:
+            json.dump(gerar_limites(resumo, resumo["referencia"], args.folga, args), arquivo, indent=2, ensure_ascii=False)
+            arquivo.write("\n")
+
+    if not args.limites:
+        return 0
+    with open(args.limites) as arquivo:
+        violacoes = verificar_limites(resumo, escalar_limites(json.load(arquivo), resumo["referencia"]))
+    for violacao in violacoes:
+        print(f"LIMITE EXCEDIDO: {violacao}", file=sys.stderr)
+    return 1 if violacoes else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
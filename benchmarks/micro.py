@@ -0,0 +1,177 @@
+"""Microbenchmarks dos caminhos executados por item: mapper, DTOs, enums e listagem.
+
+    python -m benchmarks.micro                                   # só mede
+    python -m benchmarks.micro --comparar benchmarks/baseline_micro.json
+    python -m benchmarks.micro --gravar benchmarks/baseline_micro.json
+
+Cada caso reporta o menor custo por item (µs) entre as repetições, com o
+coletor de lixo desligado durante a medição, como no timeit. A listagem
+completa é medida com 1k, 10k e 100k itens pelos dois caminhos de
+benchmarks.serializacao: com DTOs e direto documento -> JSON.
+
+O baseline é um JSON com o custo de cada caso, o de uma carga de referência
+(dicts e strings em Python puro, sem código da aplicação) e a máquina em que
+foi gerado. --comparar divide cada caso pela referência medida na mesma
+execução, o que desconta uma máquina mais lenta ou mais carregada como um todo,
+e sai com código 1 se algum caso ficar mais de --tolerancia (padrão 30%) acima
+do baseline. Mudanças de versão do Python ainda mudam a proporção: nesse caso,
+gere de novo com --gravar.
+
+O custo do MongoDB fica de fora; as consultas são medidas por benchmarks.carga.
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Callable
+
+from app.modules.execucao.domain.entities import PrioridadeExecucao, StatusExecucao
+from app.modules.execucao.infrastructure.mapper import FilaExecucaoMapper
+from app.modules.execucao.infrastructure.paginacao import codificar_cursor_documento, filtro_apos_cursor
+from benchmarks.serializacao import gerar_documentos, serializar_com_dtos, serializar_direto
+
+
+TAMANHOS_LISTAGEM = [1_000, 10_000, 100_000]
+ITENS_POR_CASO = 1_000
+ITENS_POR_REPETICAO = 10_000  # Casos menores repetem a função até processar esse total
+
+
+def casos(tamanhos: list[int]) -> dict[str, tuple[Callable[[], object], int]]:
+    """Nome do caso -> (função medida, itens processados por chamada)"""
+    documentos = gerar_documentos(ITENS_POR_CASO)
+    entidades = [FilaExecucaoMapper.document_to_entity(document) for document in documentos]
+    status = [list(StatusExecucao)[indice % len(StatusExecucao)].value for indice in range(ITENS_POR_CASO)]
+    prioridades = [list(PrioridadeExecucao)[indice % len(PrioridadeExecucao)].value for indice in range(ITENS_POR_CASO)]
+    cursores = [codificar_cursor_documento(document) for document in documentos]
+
+    resultado = {
+        "mapper.document_to_entity": (
+            lambda: [FilaExecucaoMapper.document_to_entity(document) for document in documentos], ITENS_POR_CASO,
+        ),
+        "mapper.entity_to_document": (
+            lambda: [FilaExecucaoMapper.entity_to_document(entidade) for entidade in entidades], ITENS_POR_CASO,
+        ),
+        "mapper.entity_to_output_dto": (
+            lambda: [FilaExecucaoMapper.entity_to_output_dto(entidade) for entidade in entidades], ITENS_POR_CASO,
+        ),
+        "enum.StatusExecucao": (lambda: [StatusExecucao(valor) for valor in status], ITENS_POR_CASO),
+        "enum.PrioridadeExecucao": (lambda: [PrioridadeExecucao(valor) for valor in prioridades], ITENS_POR_CASO),
+        "enum.PrioridadeExecucao.peso": (
+            lambda: [PrioridadeExecucao(valor).peso for valor in prioridades], ITENS_POR_CASO,
+        ),
+        "paginacao.codificar_cursor": (
+            lambda: [codificar_cursor_documento(document) for document in documentos], ITENS_POR_CASO,
+        ),
+        "paginacao.filtro_apos_cursor": (lambda: [filtro_apos_cursor(cursor) for cursor in cursores], ITENS_POR_CASO),
+    }
+    for tamanho in tamanhos:
+        listagem = gerar_documentos(tamanho)
+        resultado[f"listagem.dtos.{tamanho}"] = (lambda listagem=listagem: serializar_com_dtos(listagem), tamanho)
+        resultado[f"listagem.direto.{tamanho}"] = (lambda listagem=listagem: serializar_direto(listagem), tamanho)
+    return resultado
+
+
+def referencia() -> list[dict]:
+    """Carga fixa, sem código da aplicação, usada para normalizar os tempos"""
+    return [{"id": indice, "nome": f"item-{indice}", "valor": str(indice * 3)} for indice in range(ITENS_POR_CASO)]
+
+
+def medir(funcao: Callable[[], object], itens: int, repeticoes: int) -> float:
+    """Menor custo por item (µs) entre as repetições"""
+    voltas = max(1, ITENS_POR_REPETICAO // itens)
+    funcao()  # aquecimento
+    melhor = float("inf")
+    gc_ativo = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            for _ in range(voltas):
+                funcao()
+            melhor = min(melhor, (time.perf_counter() - inicio) / voltas)
+    finally:
+        if gc_ativo:
+            gc.enable()
+    return melhor / itens * 1_000_000
+
+
+def maquina() -> dict:
+    return {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "processador": platform.machine(),
+    }
+
+
+def comparar(resultados: dict[str, float], referencia_atual: float, baseline: dict, tolerancia: float) -> list[str]:
+    """Imprime a variação de cada caso e retorna os que passaram da tolerância.
+
+    A variação considerada é a do custo relativo à referência; a absoluta só é exibida.
+    """
+    if baseline.get("maquina") != maquina():
+        print(f"Aviso: baseline gerado em outra máquina ({baseline.get('maquina')})", file=sys.stderr)
+    escala = referencia_atual / baseline["referencia"]
+    print(f"Referência: {baseline['referencia']:.3f} -> {referencia_atual:.3f} µs/item ({escala - 1:+.1%})")
+
+    regressoes = []
+    print(f"  {'caso':<34} {'baseline':>10} {'atual':>10} {'absoluta':>9} {'relativa':>9}")
+    for nome, atual in resultados.items():
+        base = baseline["resultados"].get(nome)
+        if base is None:
+            print(f"  {nome:<34} {'-':>10} {atual:>7.3f} µs {'novo':>9}")
+            continue
+        variacao = atual / (base * escala) - 1
+        print(f"  {nome:<34} {base:>7.3f} µs {atual:>7.3f} µs {atual / base - 1:>+8.1%} {variacao:>+8.1%}")
+        if variacao > tolerancia:
+            regressoes.append(f"{nome}: {base:.3f} -> {atual:.3f} µs/item ({variacao:+.1%})")
+    return regressoes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=7)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS_LISTAGEM, help="itens da listagem completa")
+    parser.add_argument("--filtro", help="mede só os casos cujo nome contém este texto")
+    parser.add_argument("--gravar", help="grava os resultados como baseline neste arquivo")
+    parser.add_argument("--comparar", help="compara com o baseline deste arquivo")
+    parser.add_argument("--tolerancia", type=float, default=0.30, help="aumento máximo aceito (0.30 = 30%%)")
+    args = parser.parse_args()
+
+    # Antes e depois dos casos, para uma variação de carga da máquina durante a execução pesar menos
+    medidas_referencia = [medir(referencia, ITENS_POR_CASO, args.repeticoes)]
+    resultados = {}
+    for nome, (funcao, itens) in casos(args.tamanhos).items():
+        if args.filtro and args.filtro not in nome:
+            continue
+        resultados[nome] = medir(funcao, itens, args.repeticoes)
+        if not args.comparar:
+            print(f"  {nome:<34} {resultados[nome]:>8.3f} µs/item")
+    medidas_referencia.append(medir(referencia, ITENS_POR_CASO, args.repeticoes))
+    custo_referencia = min(medidas_referencia)
+
+    if args.gravar:
+        with open(args.gravar, "w") as arquivo:
+            json.dump({
+                "gerado_em": datetime.now().isoformat(timespec="seconds"),
+                "maquina": maquina(),
+                "repeticoes": args.repeticoes,
+                "unidade": "µs/item",
+                "referencia": round(custo_referencia, 4),
+                "resultados": {nome: round(valor, 4) for nome, valor in resultados.items()},
+            }, arquivo, indent=2, ensure_ascii=False)
+            arquivo.write("\n")
+
+    if not args.comparar:
+        return 0
+    with open(args.comparar) as arquivo:
+        regressoes = comparar(resultados, custo_referencia, json.load(arquivo), args.tolerancia)
+    for regressao in regressoes:
+        print(f"REGRESSÃO: {regressao}", file=sys.stderr)
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,97 @@
+"""Custo por item da serialização da listagem: caminho com DTOs x caminho direto.
+
+    python -m benchmarks.serializacao --itens 1000 --repeticoes 50
+
+O caminho com DTOs reproduz o que a rota fazia: documento -> FilaExecucao ->
+FilaExecucaoOutputDTO, depois o tratamento do response_model do FastAPI
+(model_dump, revalidação, serialização) e o json.dumps do JSONResponse.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from app.modules.execucao.application.dto import FilaExecucaoOutputDTO
+from app.modules.execucao.domain.entities import PrioridadeExecucao, StatusExecucao
+from app.modules.execucao.infrastructure.mapper import FilaExecucaoMapper
+from app.modules.execucao.infrastructure.serializacao import CAMPOS_SAIDA, documentos_to_json
+
+
+RESPONSE_MODEL = TypeAdapter(list[FilaExecucaoOutputDTO])
+
+
+def gerar_documentos(quantidade: int) -> list[dict]:
+    """Documentos como saem do MongoDB com a projeção dos campos de saída"""
+    inicio = datetime(2025, 1, 1, 8)
+    prioridades = list(PrioridadeExecucao)
+    documentos = []
+    for indice in range(quantidade):
+        prioridade = prioridades[indice % len(prioridades)]
+        criacao = inicio + timedelta(minutes=indice)
+        documentos.append({
+            "_id": ObjectId(),
+            "ordem_servico_id": indice,
+            "status": StatusExecucao.EM_REPARO.value,
+            "prioridade": prioridade.value,
+            "peso_prioridade": prioridade.peso,
+            "mecanico_responsavel_id": indice % 12,
+            "diagnostico": "Troca de pastilhas e disco de freio dianteiro; verificar fluido.",
+            "observacoes_reparo": None,
+            "dta_inicio_diagnostico": criacao + timedelta(hours=1),
+            "dta_fim_diagnostico": criacao + timedelta(hours=2),
+            "dta_inicio_reparo": criacao + timedelta(hours=3),
+            "dta_fim_reparo": None,
+            "dta_criacao": criacao,
+            "dta_atualizacao": criacao + timedelta(hours=3),
+        })
+    return documentos
+
+
+def serializar_com_dtos(documentos: list[dict]) -> bytes:
+    itens = [
+        FilaExecucaoMapper.entity_to_output_dto(FilaExecucaoMapper.document_to_entity(document))
+        for document in documentos
+    ]
+    # fastapi.routing.serialize_response: model_dump, validação pelo response_model e serialização
+    conteudo = RESPONSE_MODEL.validate_python([item.model_dump() for item in itens])
+    conteudo = RESPONSE_MODEL.dump_python(conteudo, mode="json")
+    # JSONResponse.render
+    return json.dumps(conteudo, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def serializar_direto(documentos: list[dict]) -> bytes:
+    return documentos_to_json(documentos, CAMPOS_SAIDA)
+
+
+def medir(funcao, documentos: list[dict], repeticoes: int) -> float:
+    """Menor tempo por item (µs) entre as repetições"""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(documentos)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor / len(documentos) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--itens", type=int, default=1000)
+    parser.add_argument("--repeticoes", type=int, default=50)
+    args = parser.parse_args()
+
+    documentos = gerar_documentos(args.itens)
+    assert json.loads(serializar_com_dtos(documentos)) == json.loads(serializar_direto(documentos))
+
+    antes = medir(serializar_com_dtos, documentos, args.repeticoes)
+    depois = medir(serializar_direto, documentos, args.repeticoes)
+    print(f"{args.itens} itens, melhor de {args.repeticoes} repetições")
+    print(f"  documento -> entidade -> DTO -> response_model -> json: {antes:8.2f} µs/item")
+    print(f"  documento -> JSON (documentos_to_json):                 {depois:8.2f} µs/item")
+    print(f"  {antes / depois:.1f}x mais rápido")
+
+
+if __name__ == "__main__":
+    main()
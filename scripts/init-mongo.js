@@ -8,8 +8,18 @@ db.createCollection('fila_execucao');
 
 // Cria índices para melhor performance
 db.fila_execucao.createIndex({ "ordem_servico_id": 1 }, { unique: true });
-db.fila_execucao.createIndex({ "status": 1 });
-db.fila_execucao.createIndex({ "prioridade": -1, "dta_criacao": 1 });
+db.fila_execucao.createIndex(
+  { "status": 1, "peso_prioridade": -1, "dta_criacao": 1, "_id": 1 },
+  {
+    name: "fila_ativa_status_peso_prioridade",
+    partialFilterExpression: { "status": { $in: ["AGUARDANDO", "EM_DIAGNOSTICO", "EM_REPARO"] } }
+  }
+);
+db.fila_execucao.createIndex({ "peso_prioridade": -1, "dta_criacao": 1, "_id": 1 });
+db.fila_execucao.createIndex({ "outbox_disponivel_em": 1 }, { sparse: true });
+db.fila_execucao.createIndex({ "dta_atualizacao": -1 });
+db.fila_execucao_rollup.createIndex({ "dia": 1 });
+db.fila_execucao_historico.createIndex({ "ordem_servico_id": 1 }, { unique: true });
 
 // Inserir dados de exemplo (opcional)
 db.fila_execucao.insertMany([
@@ -17,6 +27,7 @@ db.fila_execucao.insertMany([
         ordem_servico_id: 1,
         status: "AGUARDANDO",
         prioridade: "NORMAL",
+        peso_prioridade: 2,
         mecanico_responsavel_id: null,
         diagnostico: null,
         observacoes_reparo: null,
@@ -31,6 +42,7 @@ db.fila_execucao.insertMany([
         ordem_servico_id: 2,
         status: "EM_DIAGNOSTICO",
         prioridade: "ALTA",
+        peso_prioridade: 3,
         mecanico_responsavel_id: 1,
         diagnostico: null,
         observacoes_reparo: null,
@@ -45,6 +57,7 @@ db.fila_execucao.insertMany([
         ordem_servico_id: 3,
         status: "EM_REPARO",
         prioridade: "URGENTE",
+        peso_prioridade: 4,
         mecanico_responsavel_id: 2,
         diagnostico: "Problema no motor identificado",
         observacoes_reparo: null,
@@ -1,10 +1,30 @@
+import os
+from uuid import uuid4
+
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
 from mongomock_motor import AsyncMongoMockClient
+from motor.motor_asyncio import AsyncIOMotorClient
 
 from app.core.database import get_database
 from app.main import app
+from app.modules.execucao.infrastructure.indices import sincronizar_indices
+from app.modules.execucao.infrastructure.cache import cache_fila_execucao, cache_metricas_fila
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "mongodb_real: usa um MongoDB real (MONGODB_TESTE_URL); ignorado quando a variável não existe"
+    )
+
+
+@pytest.fixture(autouse=True)
+def limpar_cache_fila():
+    """Cada teste usa um banco novo; os caches do processo não podem atravessar testes"""
+    cache_fila_execucao.limpar()
+    cache_metricas_fila.limpar()
+    yield
 
 
 @pytest_asyncio.fixture(scope="function")
@@ -13,15 +33,32 @@ async def mongodb():
     client = AsyncMongoMockClient()
     database = client.get_database("test_oficina_execucao")
     
-    # Criar índices
-    await database.fila_execucao.create_index("ordem_servico_id", unique=True)
-    await database.fila_execucao.create_index("status")
-    await database.fila_execucao.create_index([("prioridade", -1), ("dta_criacao", 1)])
+    await sincronizar_indices(database)
     
     yield database
     
     # Limpar dados após o teste
     await database.fila_execucao.drop()
+    await database.fila_execucao_rollup.drop()
+    await database.fila_execucao_historico.drop()
+    await database.fila_execucao_rollup_controle.drop()
+
+
+@pytest_asyncio.fixture(scope="function")
+async def mongodb_real():
+    """Banco temporário em um MongoDB real, para o que o mongomock não executa (ex.: $merge)"""
+    url = os.environ.get("MONGODB_TESTE_URL")
+    if not url:
+        pytest.skip("MONGODB_TESTE_URL não definida")
+    client = AsyncIOMotorClient(url, serverSelectionTimeoutMS=5000)
+    database = client.get_database(f"test_oficina_execucao_{uuid4().hex[:8]}")
+    
+    await sincronizar_indices(database)
+    
+    yield database
+    
+    await client.drop_database(database.name)
+    client.close()
 
 
 @pytest_asyncio.fixture(scope="function")
@@ -32,8 +69,10 @@ async def client(mongodb):
 
     app.dependency_overrides[get_database] = override_get_database
     
+    # O handler global de Exception responde e relança o erro; sem isso o
+    # teste receberia a exceção em vez da resposta mapeada por tratar_erro_dominio
     async with AsyncClient(
-        transport=ASGITransport(app=app),
+        transport=ASGITransport(app=app, raise_app_exceptions=False),
         base_url="http://test"
     ) as ac:
         yield ac
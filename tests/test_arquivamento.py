@@ -0,0 +1,110 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.modules.execucao.infrastructure.arquivamento import ArquivadorFilaExecucao
+from app.modules.execucao.infrastructure.eventos import publicador_eventos_fila
+from app.modules.execucao.infrastructure.rollup import CONTROLE_ID
+
+
+ANTIGO = datetime.now() - timedelta(days=30)
+
+
+@pytest.mark.asyncio
+async def test_arquiva_so_finalizados_antigos_sem_outbox_pendente(mongodb, monkeypatch):
+    """Testa a seleção dos itens, o histórico, o evento de remoção e o limite da marca d'água"""
+    monkeypatch.setattr(settings, "ARQUIVAMENTO_LOTE", 2)
+    monkeypatch.setattr(settings, "SSE_FONTE_LOCAL", True)
+    await mongodb.fila_execucao.insert_many([
+        {"ordem_servico_id": 1, "status": "FINALIZADA", "prioridade": "NORMAL", "dta_atualizacao": ANTIGO},
+        {"ordem_servico_id": 2, "status": "FINALIZADA", "prioridade": "NORMAL", "dta_atualizacao": ANTIGO},
+        {"ordem_servico_id": 3, "status": "FINALIZADA", "prioridade": "ALTA", "dta_atualizacao": ANTIGO},
+        {"ordem_servico_id": 4, "status": "FINALIZADA", "prioridade": "NORMAL", "dta_atualizacao": datetime.now()},
+        {"ordem_servico_id": 5, "status": "EM_REPARO", "prioridade": "NORMAL", "dta_atualizacao": ANTIGO},
+        {
+            "ordem_servico_id": 6, "status": "FINALIZADA", "prioridade": "NORMAL", "dta_atualizacao": ANTIGO,
+            "outbox": [{"evento_id": "e1", "status": "FINALIZADA"}], "outbox_disponivel_em": ANTIGO,
+        },
+    ])
+    arquivador = ArquivadorFilaExecucao()
+
+    # Os totais diários ainda não leram esses itens
+    assert await arquivador.arquivar(mongodb) == 0
+
+    await mongodb.fila_execucao_rollup_controle.insert_one({"_id": CONTROLE_ID, "marca_dagua": datetime.now()})
+    assinatura = publicador_eventos_fila.assinar()
+    try:
+        assert await arquivador.arquivar(mongodb) == 3
+    finally:
+        publicador_eventos_fila.cancelar(assinatura)
+
+    ativos = await mongodb.fila_execucao.distinct("ordem_servico_id")
+    arquivados = await mongodb.fila_execucao_historico.distinct("ordem_servico_id")
+    assert sorted(ativos) == [4, 5, 6]
+    assert sorted(arquivados) == [1, 2, 3]
+    assert assinatura.qsize() == 3
+    assert assinatura.get_nowait().tipo == "REMOVIDO"
+
+    assert await arquivador.arquivar(mongodb) == 0
+
+
+@pytest.mark.asyncio
+async def test_consulta_por_ordem_servico_encontra_item_arquivado(client, mongodb):
+    """Testa a consulta transparente ao histórico e a recusa de recriar a OS"""
+    await mongodb.fila_execucao_historico.insert_one({
+        "ordem_servico_id": 40, "status": "FINALIZADA", "prioridade": "NORMAL", "peso_prioridade": 2,
+        "dta_criacao": ANTIGO, "dta_atualizacao": ANTIGO,
+    })
+
+    response = await client.get("/fila-execucao/ordem-servico/40")
+    assert response.status_code == 200
+    assert response.json()["status"] == "FINALIZADA"
+
+    response = await client.post("/fila-execucao", json={"ordem_servico_id": 40})
+    assert response.status_code == 400
+
+    response = await client.post("/fila-execucao/lote", json=[{"ordem_servico_id": 40}, {"ordem_servico_id": 41}])
+    assert [item["criado"] for item in response.json()] == [False, True]
+
+
+@pytest.mark.asyncio
+async def test_exportacao_e_metricas_com_itens_arquivados(client, mongodb):
+    """Testa a exportação incluindo o histórico e o total de arquivados nas métricas"""
+    await mongodb.fila_execucao_historico.insert_one({
+        "ordem_servico_id": 70, "status": "FINALIZADA", "prioridade": "NORMAL", "peso_prioridade": 2,
+        "dta_criacao": ANTIGO, "dta_atualizacao": ANTIGO,
+    })
+    await client.post("/fila-execucao", json={"ordem_servico_id": 71})
+
+    todos = await client.get("/fila-execucao/exportar")
+    assert [json.loads(linha)["ordem_servico_id"] for linha in todos.text.splitlines()] == [71, 70]
+
+    finalizados = await client.get("/fila-execucao/exportar", params={"status": "FINALIZADA"})
+    assert [json.loads(linha)["ordem_servico_id"] for linha in finalizados.text.splitlines()] == [70]
+
+    aguardando = await client.get("/fila-execucao/exportar", params={"status": "AGUARDANDO"})
+    assert [json.loads(linha)["ordem_servico_id"] for linha in aguardando.text.splitlines()] == [71]
+
+    metricas = (await client.get("/fila-execucao/metricas")).json()
+    assert metricas["total"] == 1
+    assert metricas["arquivados"] == 1
+
+
+@pytest.mark.asyncio
+async def test_item_alterado_durante_arquivamento_nao_fica_no_historico(mongodb):
+    """Testa que um item que deixa o filtro entre a leitura e a remoção não deixa cópia no histórico"""
+    await mongodb.fila_execucao.insert_many([
+        {"ordem_servico_id": ordem_servico_id, "status": "FINALIZADA", "prioridade": "NORMAL", "dta_atualizacao": ANTIGO}
+        for ordem_servico_id in (80, 81)
+    ])
+    filtro = {"status": "FINALIZADA", "dta_atualizacao": {"$lt": datetime.now() - timedelta(days=1)}}
+    documents = await mongodb.fila_execucao.find(filtro).to_list(length=None)
+    # Alteração concorrente depois da leitura do lote
+    await mongodb.fila_execucao.update_one({"ordem_servico_id": 81}, {"$set": {"dta_atualizacao": datetime.now()}})
+
+    assert await ArquivadorFilaExecucao()._mover(mongodb, filtro, documents) == 1
+
+    assert await mongodb.fila_execucao.distinct("ordem_servico_id") == [81]
+    assert await mongodb.fila_execucao_historico.distinct("ordem_servico_id") == [80]
@@ -0,0 +1,71 @@
+import pytest
+
+from app.modules.execucao.application.dto import FilaExecucaoCriacaoInputDTO, AtualizarPrioridadeInputDTO
+from app.modules.execucao.application.use_cases import (
+    AdicionarFilaExecucaoUseCase,
+    AtualizarPrioridadeUseCase,
+    ConsultarFilaExecucaoUseCase,
+    RemoverDaFilaUseCase,
+)
+from app.modules.execucao.domain.entities import FilaExecucao, StatusExecucao, PrioridadeExecucao
+from app.modules.execucao.infrastructure.cache import CacheFilaExecucao, cache_fila_execucao
+from app.core.exceptions import FilaExecucaoNotFoundError
+
+
+def criar_fila(fila_id: str, ordem_servico_id: int) -> FilaExecucao:
+    return FilaExecucao(
+        fila_id=fila_id,
+        ordem_servico_id=ordem_servico_id,
+        status=StatusExecucao.AGUARDANDO,
+        prioridade=PrioridadeExecucao.NORMAL,
+    )
+
+
+def test_cache_descarta_o_menos_usado_e_os_expirados(monkeypatch):
+    """Testa o limite LRU, o TTL e os contadores"""
+    agora = [100.0]
+    monkeypatch.setattr("app.modules.execucao.infrastructure.cache.time.monotonic", lambda: agora[0])
+    cache = CacheFilaExecucao(tamanho_maximo=2, ttl=5)
+    
+    cache.guardar(criar_fila("a", 1), cache.versao)
+    cache.guardar(criar_fila("b", 2), cache.versao)
+    assert cache.buscar_por_id("a").ordem_servico_id == 1
+    cache.guardar(criar_fila("c", 3), cache.versao)
+    
+    # "b" era o menos usado
+    assert cache.buscar_por_ordem_servico(2) is None
+    assert cache.buscar_por_ordem_servico(3).fila_id == "c"
+    
+    agora[0] += 6
+    assert cache.buscar_por_id("a") is None
+    assert cache.estatisticas() == {"itens": 1, "acertos": 2, "falhas": 2}
+
+
+def test_cache_ignora_leitura_iniciada_antes_de_invalidacao():
+    """Testa que uma leitura concorrente com uma escrita não guarda o estado anterior"""
+    cache = CacheFilaExecucao(tamanho_maximo=10, ttl=5)
+    versao = cache.versao
+    cache.invalidar("a")
+    cache.guardar(criar_fila("a", 1), versao)
+    assert cache.buscar_por_id("a") is None
+
+
+@pytest.mark.asyncio
+async def test_consultas_usam_cache_e_escritas_invalidam(mongodb):
+    """Testa leituras repetidas servidas da memória e leitura após escrita"""
+    fila = await AdicionarFilaExecucaoUseCase(mongodb).execute(FilaExecucaoCriacaoInputDTO(ordem_servico_id=90))
+    consulta = ConsultarFilaExecucaoUseCase(mongodb)
+    
+    for _ in range(3):
+        assert (await consulta.execute_por_id(fila.fila_id)).prioridade == PrioridadeExecucao.NORMAL
+        assert (await consulta.execute_por_ordem_servico(90)).fila_id == fila.fila_id
+    assert cache_fila_execucao.acertos == 5
+    
+    await AtualizarPrioridadeUseCase(mongodb).execute(
+        fila.fila_id, AtualizarPrioridadeInputDTO(prioridade=PrioridadeExecucao.URGENTE)
+    )
+    assert (await consulta.execute_por_ordem_servico(90)).prioridade == PrioridadeExecucao.URGENTE
+    
+    await RemoverDaFilaUseCase(mongodb).execute(fila.fila_id)
+    with pytest.raises(FilaExecucaoNotFoundError):
+        await consulta.execute_por_id(fila.fila_id)
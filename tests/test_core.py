@@ -2,9 +2,11 @@ from datetime import datetime
 
 import pytest
 from fastapi import HTTPException
+from pymongo.monitoring import ConnectionClosedEvent, ConnectionReadyEvent, PoolClearedEvent, PoolReadyEvent
 
 from app.core import database
 from app.core.config import settings
+from app.core.prontidao import prontidao
 from app.core.exceptions import (
     ExecucaoNotFoundError,
     FilaExecucaoNotFoundError,
@@ -44,7 +46,8 @@ def test_tratar_erro_dominio_mapeamentos():
 
 
 @pytest.mark.asyncio
-async def test_connect_to_mongo_cria_indices(monkeypatch):
+async def test_connect_to_mongo_nao_cria_indices(monkeypatch):
+    """Os índices ficam com `python -m app.manage migrar`; o startup só conecta"""
     class FakeCollection:
         def __init__(self):
             self.calls = []
@@ -84,11 +87,7 @@ async def test_connect_to_mongo_cria_indices(monkeypatch):
         assert database.mongodb.client.db_name == settings.MONGODB_DATABASE
         assert database.mongodb.database is database.mongodb.client.db
 
-        calls = database.mongodb.database.fila_execucao.calls
-        assert len(calls) == 3
-        assert calls[0] == (("ordem_servico_id",), {"unique": True})
-        assert calls[1] == (("status",), {})
-        assert calls[2] == (([("prioridade", -1), ("dta_criacao", 1)],), {})
+        assert database.mongodb.database.fila_execucao.calls == []
     finally:
         database.mongodb.client = client_original
         database.mongodb.database = db_original
@@ -141,3 +140,78 @@ def test_get_database_retorna_instancia_atual():
         assert database.get_database() is marcador
     finally:
         database.mongodb.database = db_original
+
+
+@pytest.mark.asyncio
+async def test_prontidao_so_depois_das_verificacoes(client):
+    """Testa liveness sempre ok e readiness 503 até todas as verificações passarem"""
+    tentativas = []
+
+    async def servico_os():
+        tentativas.append(1)
+        if len(tentativas) == 1:
+            raise ConnectionError("serviço indisponível")
+
+    async def mongo():
+        pass
+
+    prontidao.registrar("mongodb", mongo)
+    prontidao.registrar("ordem_servico", servico_os)
+    try:
+        assert (await client.get("/health/live")).status_code == 200
+        assert (await client.get("/health/ready")).status_code == 503
+
+        assert await prontidao.verificar() is False
+        response = await client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["verificacoes"] == {"mongodb": True, "ordem_servico": False}
+
+        assert await prontidao.verificar() is True
+        response = await client.get("/health/ready")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ok"
+    finally:
+        await prontidao.parar()
+
+
+@pytest.mark.asyncio
+async def test_aquecer_pool_espera_conexoes_prontas(monkeypatch):
+    """Testa que o aquecimento só termina com MONGODB_MIN_POOL_SIZE conexões prontas por pool"""
+    primaria, secundaria = ("mongo-1", 27017), ("mongo-2", 27017)
+    monitor = database.MonitorPool()
+
+    class FakeDatabase:
+        """Como o driver: abre no máximo duas conexões por vez, a cada ping"""
+
+        def __init__(self):
+            self.abertas = 0
+
+        async def command(self, nome):
+            for _ in range(2):
+                if self.abertas < 4:
+                    self.abertas += 1
+                    monitor.connection_ready(ConnectionReadyEvent(primaria, self.abertas, 0.0))
+
+    monkeypatch.setattr(settings, "MONGODB_MIN_POOL_SIZE", 4)
+    monkeypatch.setattr(settings, "PRONTIDAO_INTERVALO", 0.1)
+    monkeypatch.setattr(database.mongodb, "monitor", monitor)
+    monkeypatch.setattr(database.mongodb, "database", FakeDatabase())
+
+    # Nenhum pool pronto ainda: não está aquecido
+    with pytest.raises(RuntimeError):
+        await database.aquecer_pool_mongo()
+
+    monitor.pool_ready(PoolReadyEvent(primaria))
+    await database.aquecer_pool_mongo()
+    assert monitor.conexoes_prontas() == {primaria: 4}
+
+    # Uma secundária pronta e ainda vazia volta a segurar a prontidão
+    monitor.pool_ready(PoolReadyEvent(secundaria))
+    with pytest.raises(RuntimeError):
+        await database.aquecer_pool_mongo()
+
+    monitor.pool_cleared(PoolClearedEvent(secundaria))
+    monitor.connection_closed(ConnectionClosedEvent(primaria, 1, "stale"))
+    assert monitor.conexoes_prontas() == {primaria: 3}
+    assert not monitor.aquecido(4)
+    assert monitor.aquecido(0)
@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.modules.execucao.application.dto import (
+    AtualizarPrioridadeInputDTO,
+    FilaExecucaoCriacaoInputDTO,
+    IniciarDiagnosticoInputDTO,
+)
+from app.modules.execucao.application.use_cases import (
+    AcompanharFilaExecucaoUseCase,
+    AdicionarFilaExecucaoUseCase,
+    AtualizarPrioridadeUseCase,
+    IniciarDiagnosticoUseCase,
+    RemoverDaFilaUseCase,
+)
+from app.modules.execucao.domain.entities import StatusExecucao, PrioridadeExecucao
+from app.modules.execucao.infrastructure.eventos import EventoFila, PublicadorEventosFila
+
+
+@pytest.fixture(autouse=True)
+def feed_local(monkeypatch):
+    """Sem replica set nos testes: o feed é alimentado pelas escritas do próprio processo"""
+    monkeypatch.setattr(settings, "SSE_FONTE_LOCAL", True)
+
+
+def ler_sse(mensagem: str) -> tuple[str, dict | list]:
+    campos = dict(linha.split(": ", 1) for linha in mensagem.strip().split("\n"))
+    return campos["event"], json.loads(campos["data"])
+
+
+async def proximo(feed) -> tuple[str, dict | list]:
+    return ler_sse(await asyncio.wait_for(anext(feed), 1))
+
+
+@pytest.mark.asyncio
+async def test_feed_envia_snapshot_e_alteracoes_do_status(mongodb):
+    """Testa o snapshot filtrado e os eventos incrementais, com saída do status como REMOVIDO"""
+    adicionar = AdicionarFilaExecucaoUseCase(mongodb)
+    primeira = await adicionar.execute(FilaExecucaoCriacaoInputDTO(ordem_servico_id=100))
+    
+    feed = AcompanharFilaExecucaoUseCase(mongodb).execute(StatusExecucao.AGUARDANDO)
+    evento, itens = await proximo(feed)
+    assert evento == "snapshot"
+    assert [item["ordem_servico_id"] for item in itens] == [100]
+    
+    segunda = await adicionar.execute(FilaExecucaoCriacaoInputDTO(ordem_servico_id=101))
+    await AtualizarPrioridadeUseCase(mongodb).execute(
+        segunda.fila_id, AtualizarPrioridadeInputDTO(prioridade=PrioridadeExecucao.URGENTE)
+    )
+    await IniciarDiagnosticoUseCase(mongodb).execute(
+        primeira.fila_id, IniciarDiagnosticoInputDTO(mecanico_responsavel_id=1)
+    )
+    await RemoverDaFilaUseCase(mongodb).execute(segunda.fila_id)
+    
+    evento, dados = await proximo(feed)
+    assert (evento, dados["fila"]["ordem_servico_id"]) == ("ADICIONADO", 101)
+    evento, dados = await proximo(feed)
+    assert (evento, dados["fila"]["prioridade"]) == ("REPRIORIZADO", "URGENTE")
+    assert await proximo(feed) == ("REMOVIDO", {"tipo": "REMOVIDO", "fila_id": primeira.fila_id, "fila": None})
+    assert await proximo(feed) == ("REMOVIDO", {"tipo": "REMOVIDO", "fila_id": segunda.fila_id, "fila": None})
+    
+    await feed.aclose()
+
+
+@pytest.mark.asyncio
+async def test_feed_envia_keep_alive_sem_eventos(mongodb, monkeypatch):
+    """Testa o comentário de keep-alive enquanto a fila não muda"""
+    monkeypatch.setattr(settings, "SSE_HEARTBEAT", 0.01)
+    feed = AcompanharFilaExecucaoUseCase(mongodb).execute()
+    
+    assert (await anext(feed)).startswith("event: snapshot")
+    assert await anext(feed) == ": keep-alive\n\n"
+    await feed.aclose()
+
+
+@pytest.mark.asyncio
+async def test_publicador_desconecta_assinante_lento(monkeypatch):
+    """Testa que um assinante com a fila cheia recebe o sinal de encerramento"""
+    monkeypatch.setattr(settings, "SSE_FILA_MAXIMA", 2)
+    publicador = PublicadorEventosFila()
+    lento = publicador.assinar()
+    
+    for indice in range(3):
+        publicador.publicar(EventoFila("REMOVIDO", str(indice)))
+    
+    assert lento.get_nowait() is None
+    assert lento.empty()
+    # Não recebe mais eventos
+    publicador.publicar(EventoFila("REMOVIDO", "3"))
+    assert lento.empty()
+
+
+@pytest.mark.asyncio
+async def test_rota_feed_exige_change_stream(client, monkeypatch):
+    """Testa que, sem a visão nem SSE_FONTE_LOCAL, o feed não é servido pela metade"""
+    monkeypatch.setattr(settings, "SSE_FONTE_LOCAL", False)
+    monkeypatch.setattr(settings, "VISAO_FILA_HABILITADA", False)
+    
+    response = await client.get("/fila-execucao/eventos")
+    assert response.status_code == 503
@@ -1,7 +1,20 @@
+import csv
+import gzip
+import io
+import json
+
 import pytest
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+from app.core.config import settings
+from app.core.database import preferencia_leitura
+from app.modules.execucao.application.interfaces import AlteracaoFila
 from app.modules.execucao.domain.entities import FilaExecucao, StatusExecucao, PrioridadeExecucao
 from app.modules.execucao.infrastructure.repositories import FilaExecucaoRepository
-from datetime import datetime
+from app.modules.execucao.infrastructure.indices import indices_pendentes, sincronizar_indices
+from app.modules.execucao.infrastructure.migrations import executar_migracoes
+from app.modules.execucao.infrastructure.paginacao import codificar_cursor
+from datetime import datetime, timedelta
 
 
 @pytest.mark.asyncio
@@ -112,11 +125,11 @@ async def test_atualizar_fila(mongodb):
     fila_salva = await repo.salvar(fila)
     
     # Atualizar status
-    fila_salva.status = StatusExecucao.EM_DIAGNOSTICO
-    fila_salva.mecanico_responsavel_id = 1
-    fila_salva.dta_inicio_diagnostico = datetime.now()
-    
-    fila_atualizada = await repo.atualizar(fila_salva)
+    fila_atualizada = await repo.atualizar_campos(
+        fila_salva.fila_id,
+        {"status": StatusExecucao.EM_DIAGNOSTICO, "mecanico_responsavel_id": 1, "dta_inicio_diagnostico": datetime.now()},
+        status_esperado=StatusExecucao.AGUARDANDO,
+    )
     
     assert fila_atualizada.status == StatusExecucao.EM_DIAGNOSTICO
     assert fila_atualizada.mecanico_responsavel_id == 1
@@ -165,3 +178,476 @@ async def test_ordem_servico_duplicada(mongodb):
     # Deve lançar erro de duplicidade
     with pytest.raises(ValueError):
         await repo.salvar(fila2)
+
+
+@pytest.mark.asyncio
+async def test_listar_todas_ordena_por_peso_da_prioridade(mongodb):
+    """Testa que a ordenação segue a regra de negócio e não a ordem alfabética"""
+    repo = FilaExecucaoRepository(mongodb)
+    
+    prioridades = [
+        PrioridadeExecucao.ALTA,
+        PrioridadeExecucao.BAIXA,
+        PrioridadeExecucao.URGENTE,
+        PrioridadeExecucao.NORMAL,
+    ]
+    for ordem_servico_id, prioridade in enumerate(prioridades, start=10):
+        await repo.salvar(FilaExecucao(
+            fila_id=None,
+            ordem_servico_id=ordem_servico_id,
+            status=StatusExecucao.AGUARDANDO,
+            prioridade=prioridade,
+        ))
+    
+    filas = await repo.listar_todas()
+    
+    assert [fila.prioridade for fila in filas] == [
+        PrioridadeExecucao.URGENTE,
+        PrioridadeExecucao.ALTA,
+        PrioridadeExecucao.NORMAL,
+        PrioridadeExecucao.BAIXA,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_migracao_backfill_peso_prioridade(mongodb):
+    """Testa o preenchimento de peso_prioridade em documentos antigos"""
+    await mongodb.fila_execucao.insert_many([
+        {"ordem_servico_id": 20, "status": "AGUARDANDO", "prioridade": "BAIXA", "dta_criacao": datetime(2026, 1, 1)},
+        {"ordem_servico_id": 21, "status": "AGUARDANDO", "prioridade": "URGENTE", "dta_criacao": datetime(2026, 1, 2)},
+    ])
+    await mongodb.fila_execucao.create_index([("prioridade", -1), ("dta_criacao", 1)])
+    
+    resultados = await executar_migracoes(mongodb)
+    
+    assert resultados["backfill_peso_prioridade"] == 2
+    assert resultados["sincronizar_indices"]["fila_execucao"] == {
+        "criar": [], "remover": ["prioridade_-1_dta_criacao_1"]
+    }
+    
+    filas = await FilaExecucaoRepository(mongodb).listar_por_status(StatusExecucao.AGUARDANDO)
+    assert [fila.ordem_servico_id for fila in filas] == [21, 20]
+    
+    # Idempotente: uma segunda execução não altera nada
+    resultados = await executar_migracoes(mongodb)
+    assert resultados["backfill_peso_prioridade"] == 0
+    assert await indices_pendentes(mongodb) == []
+    assert all(not diferenca["remover"] for diferenca in resultados["sincronizar_indices"].values())
+
+
+@pytest.mark.asyncio
+async def test_listagem_paginada_com_documento_sem_peso_prioridade(client, mongodb):
+    """Testa o cursor de documentos gravados sem peso_prioridade (réplicas antigas durante o rollout)"""
+    await client.post("/fila-execucao", json={"ordem_servico_id": 24, "prioridade": "URGENTE"})
+    await mongodb.fila_execucao.insert_many([
+        {
+            "ordem_servico_id": ordem_servico_id, "status": "AGUARDANDO", "prioridade": "BAIXA",
+            "dta_criacao": datetime(2026, 1, 1, 8, minuto), "dta_atualizacao": datetime(2026, 1, 1, 8, minuto),
+        }
+        for minuto, ordem_servico_id in enumerate((25, 26))
+    ])
+    
+    # O cursor sai de um documento sem o campo, inclusive projetado
+    for params in ({"limit": 2}, {"limit": 2, "fields": "ordem_servico_id"}):
+        response = await client.get("/fila-execucao", params=params)
+        assert response.status_code == 200
+        assert "x-next-cursor" in response.headers
+    
+    # O backfill executado de novo depois do rollout acerta a ordenação keyset
+    assert (await executar_migracoes(mongodb))["backfill_peso_prioridade"] == 2
+    vistos, cursor = [], None
+    while True:
+        response = await client.get("/fila-execucao", params={"limit": 1, **({"cursor": cursor} if cursor else {})})
+        vistos += [item["ordem_servico_id"] for item in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert vistos == [24, 25, 26]
+
+
+@pytest.mark.asyncio
+async def test_sincronizacao_cria_indices_declarados_ausentes(mongodb):
+    """Testa a verificação barata do startup e a criação só do que falta"""
+    await mongodb.fila_execucao_historico.drop_indexes()
+    assert await indices_pendentes(mongodb) == ["fila_execucao_historico.ordem_servico_id_1"]
+    
+    diferencas = await sincronizar_indices(mongodb)
+    assert diferencas["fila_execucao_historico"] == {"criar": ["ordem_servico_id_1"], "remover": []}
+    assert diferencas["fila_execucao"] == {"criar": [], "remover": []}
+    assert await indices_pendentes(mongodb) == []
+
+
+@pytest.mark.asyncio
+async def test_roteamento_de_leituras_por_operacao(mongodb, monkeypatch):
+    """Testa listagens/métricas/exportação nas secundárias e o resto na primária"""
+    monkeypatch.setattr(settings, "MONGODB_LEITURA_EXPORTACAO", "primary")
+    repo = FilaExecucaoRepository(mongodb)
+    
+    assert repo.leitura_listagem.read_preference == SecondaryPreferred(max_staleness=90)
+    assert repo.leitura_metricas.read_preference == SecondaryPreferred(max_staleness=90)
+    assert repo.leitura_exportacao.read_preference == Primary()
+    assert repo.historico_metricas.read_preference == SecondaryPreferred(max_staleness=90)
+    assert repo.collection.read_preference == Primary()
+    
+    await repo.salvar(FilaExecucao(
+        fila_id=None, ordem_servico_id=1, status=StatusExecucao.AGUARDANDO, prioridade=PrioridadeExecucao.NORMAL,
+    ))
+    assert len(await repo.listar_todas()) == 1
+    assert (await repo.calcular_metricas())["por_status"] == {"AGUARDANDO": 1}
+    
+    primaria = FilaExecucaoRepository(mongodb, leitura_secundaria=False)
+    assert primaria.leitura_listagem.read_preference == Primary()
+    
+    with pytest.raises(ValueError):
+        preferencia_leitura("secundaria")
+
+
+@pytest.mark.asyncio
+async def test_listar_paginado_por_cursor(mongodb):
+    """Testa que as páginas seguem a ordenação da fila sem repetir itens"""
+    repo = FilaExecucaoRepository(mongodb)
+    
+    for ordem_servico_id in range(30, 37):
+        prioridade = PrioridadeExecucao.ALTA if ordem_servico_id % 2 else PrioridadeExecucao.NORMAL
+        await repo.salvar(FilaExecucao(
+            fila_id=None,
+            ordem_servico_id=ordem_servico_id,
+            status=StatusExecucao.AGUARDANDO,
+            prioridade=prioridade,
+        ))
+    
+    esperado = [fila.ordem_servico_id for fila in await repo.listar_todas()]
+    
+    vistos = []
+    cursor = None
+    while True:
+        pagina = await repo.listar_por_status(StatusExecucao.AGUARDANDO, limite=3, cursor=cursor)
+        vistos.extend(fila.ordem_servico_id for fila in pagina)
+        if len(pagina) < 3:
+            break
+        cursor = codificar_cursor(pagina[-1])
+    
+    assert vistos == esperado
+
+
+@pytest.mark.asyncio
+async def test_rota_listar_fila_com_next_cursor(client):
+    """Testa a paginação da rota de listagem pelo header X-Next-Cursor"""
+    for ordem_servico_id in range(40, 45):
+        response = await client.post("/fila-execucao", json={"ordem_servico_id": ordem_servico_id})
+        assert response.status_code == 201
+    
+    primeira = await client.get("/fila-execucao", params={"limit": 3})
+    assert primeira.status_code == 200
+    assert len(primeira.json()) == 3
+    
+    segunda = await client.get(
+        "/fila-execucao", params={"limit": 3, "cursor": primeira.headers["X-Next-Cursor"]}
+    )
+    assert [item["ordem_servico_id"] for item in segunda.json()] == [43, 44]
+    assert "X-Next-Cursor" not in segunda.headers
+    assert "Link" not in segunda.headers
+    
+    # O Link leva à mesma página seguinte
+    proxima = primeira.links["next"]["url"]
+    assert (await client.get(proxima)).json() == segunda.json()
+    
+    invalido = await client.get("/fila-execucao", params={"cursor": "invalido"})
+    assert invalido.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_rota_exportar_fila(client, monkeypatch):
+    """Testa a exportação em NDJSON, CSV e NDJSON compactado"""
+    # Lotes menores que o total para exercitar a leitura em várias partes
+    monkeypatch.setattr(settings, "EXPORTACAO_TAMANHO_LOTE", 2)
+    for ordem_servico_id in range(50, 53):
+        await client.post("/fila-execucao", json={"ordem_servico_id": ordem_servico_id, "prioridade": "ALTA"})
+    
+    ndjson = await client.get("/fila-execucao/exportar", params={"status": "AGUARDANDO"})
+    assert ndjson.status_code == 200
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    linhas = [json.loads(linha) for linha in ndjson.text.splitlines()]
+    assert [linha["ordem_servico_id"] for linha in linhas] == [50, 51, 52]
+    assert linhas[0]["prioridade"] == "ALTA"
+    
+    vazio = await client.get("/fila-execucao/exportar", params={"status": "FINALIZADA"})
+    assert vazio.text == ""
+    
+    exportado_csv = await client.get("/fila-execucao/exportar", params={"formato": "csv"})
+    registros = list(csv.DictReader(io.StringIO(exportado_csv.text)))
+    assert len(registros) == 3
+    assert registros[0]["status"] == "AGUARDANDO"
+    assert registros[0]["diagnostico"] == ""
+    
+    compactado = await client.get("/fila-execucao/exportar", params={"gzip": True})
+    assert compactado.headers["content-type"] == "application/gzip"
+    assert gzip.decompress(compactado.content) == ndjson.content
+
+
+@pytest.mark.asyncio
+async def test_rota_reivindicar_proxima(client, mongodb):
+    """Testa que cada mecânico recebe o próximo item por prioridade e antiguidade"""
+    await client.post("/fila-execucao", json={"ordem_servico_id": 60, "prioridade": "NORMAL"})
+    await client.post("/fila-execucao", json={"ordem_servico_id": 61, "prioridade": "URGENTE"})
+    await client.post("/fila-execucao", json={"ordem_servico_id": 62, "prioridade": "NORMAL"})
+    # Já diagnosticado, aguardando aprovação do orçamento: não deve ser escolhido
+    await client.post("/fila-execucao", json={"ordem_servico_id": 63, "prioridade": "URGENTE"})
+    await mongodb.fila_execucao.update_one(
+        {"ordem_servico_id": 63}, {"$set": {"dta_fim_diagnostico": datetime.now()}}
+    )
+    
+    atribuidos = []
+    for mecanico in (1, 2, 3):
+        response = await client.post("/fila-execucao/proxima", json={"mecanico_responsavel_id": mecanico})
+        assert response.status_code == 200
+        item = response.json()
+        assert item["status"] == "EM_DIAGNOSTICO"
+        assert item["mecanico_responsavel_id"] == mecanico
+        atribuidos.append(item["ordem_servico_id"])
+    
+    assert atribuidos == [61, 60, 62]
+    
+    response = await client.post("/fila-execucao/proxima", json={"mecanico_responsavel_id": 4})
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_rota_adicionar_fila_em_lote(client):
+    """Testa o cadastro em lote com OSs duplicadas no banco e no próprio lote"""
+    await client.post("/fila-execucao", json={"ordem_servico_id": 70})
+    
+    response = await client.post("/fila-execucao/lote", json=[
+        {"ordem_servico_id": 70},
+        {"ordem_servico_id": 71, "prioridade": "URGENTE"},
+        {"ordem_servico_id": 72},
+        {"ordem_servico_id": 72},
+    ])
+    
+    assert response.status_code == 200
+    resultado = response.json()
+    assert [item["criado"] for item in resultado] == [False, True, True, False]
+    assert "70" in resultado[0]["erro"]
+    assert resultado[1]["fila"]["prioridade"] == "URGENTE"
+    assert resultado[1]["fila"]["fila_id"]
+    
+    listagem = await client.get("/fila-execucao")
+    assert [item["ordem_servico_id"] for item in listagem.json()] == [71, 70, 72]
+
+
+@pytest.mark.asyncio
+async def test_rota_aplicar_operacoes_em_lote(client, mongodb):
+    """Testa prioridades e transições em lote com resultado por operação"""
+    ids = []
+    for ordem_servico_id in (80, 81, 82):
+        response = await client.post("/fila-execucao", json={"ordem_servico_id": ordem_servico_id})
+        ids.append(response.json()["fila_id"])
+    
+    response = await client.post("/fila-execucao/lote/operacoes", json=[
+        {"fila_id": ids[0], "operacao": "ATUALIZAR_PRIORIDADE", "prioridade": "URGENTE"},
+        {"fila_id": ids[1], "operacao": "INICIAR_DIAGNOSTICO", "mecanico_responsavel_id": 7},
+        {"fila_id": ids[2], "operacao": "FINALIZAR_REPARO"},
+        {"fila_id": ids[0], "operacao": "INICIAR_DIAGNOSTICO", "mecanico_responsavel_id": 7},
+        {"fila_id": "507f1f77bcf86cd799439011", "operacao": "INICIAR_REPARO"},
+        {"fila_id": "507f1f77bcf86cd799439012", "operacao": "FINALIZAR_DIAGNOSTICO"},
+    ])
+    
+    assert response.status_code == 200
+    resultado = response.json()
+    assert [item["aplicada"] for item in resultado] == [True, True, False, False, False, False]
+    assert resultado[0]["fila"]["prioridade"] == "URGENTE"
+    assert resultado[1]["fila"]["status"] == "EM_DIAGNOSTICO"
+    assert resultado[1]["fila"]["mecanico_responsavel_id"] == 7
+    # Status inválido: o item volta no estado atual, inalterado
+    assert "EM_REPARO" in resultado[2]["erro"]
+    assert resultado[2]["fila"]["status"] == "AGUARDANDO"
+    assert resultado[3]["erro"] == "Item repetido no lote."
+    assert resultado[4]["erro"] == "Item da fila não encontrado."
+    assert "diagnostico" in resultado[5]["erro"]
+    
+    # Só a transição gera notificação para a OS
+    documentos = {doc["ordem_servico_id"]: doc async for doc in mongodb.fila_execucao.find()}
+    assert [evento["status"] for evento in documentos[81]["outbox"]] == ["EM_DIAGNOSTICO"]
+    assert "outbox" not in documentos[80]
+    assert "outbox" not in documentos[82]
+
+
+@pytest.mark.asyncio
+async def test_lote_identifica_alteracoes_aplicadas_com_escrita_concorrente(mongodb, monkeypatch):
+    """Testa o resultado do lote quando outra escrita altera os itens antes da releitura"""
+    repo = FilaExecucaoRepository(mongodb)
+    filas = [
+        await repo.salvar(FilaExecucao(
+            fila_id=None, ordem_servico_id=ordem_servico_id,
+            status=StatusExecucao.AGUARDANDO, prioridade=PrioridadeExecucao.NORMAL,
+        ))
+        for ordem_servico_id in (90, 91)
+    ]
+    
+    bulk_write = repo.collection.bulk_write
+    async def bulk_write_e_escrita_concorrente(*args, **kwargs):
+        resultado = await bulk_write(*args, **kwargs)
+        for fila in filas:
+            await repo.atualizar_campos(fila.fila_id, {"prioridade": PrioridadeExecucao.ALTA})
+        return resultado
+    monkeypatch.setattr(repo.collection, "bulk_write", bulk_write_e_escrita_concorrente)
+    
+    resultado = await repo.atualizar_campos_lote([
+        AlteracaoFila(filas[0].fila_id, {"status": StatusExecucao.EM_DIAGNOSTICO}, StatusExecucao.AGUARDANDO),
+        AlteracaoFila(filas[1].fila_id, {"status": StatusExecucao.FINALIZADA}, StatusExecucao.EM_REPARO),
+    ])
+    
+    assert [aplicada for aplicada, _ in resultado] == [True, False]
+    assert resultado[0][1].status == StatusExecucao.EM_DIAGNOSTICO
+    assert resultado[1][1].status == StatusExecucao.AGUARDANDO
+    
+    # Depois da releitura, o id do lote não fica nos documentos
+    documentos = await mongodb.fila_execucao.find({"ordem_servico_id": {"$in": [90, 91]}}).to_list(length=None)
+    assert [documento.get("lotes_aplicados", []) for documento in documentos] == [[], []]
+
+
+@pytest.mark.asyncio
+async def test_rota_consultar_item_com_etag(client):
+    """Testa o 304 para um item inalterado e o novo ETag após uma alteração"""
+    criado = (await client.post("/fila-execucao", json={"ordem_servico_id": 110})).json()
+    
+    response = await client.get(f"/fila-execucao/{criado['fila_id']}")
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+    
+    response = await client.get(f"/fila-execucao/{criado['fila_id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    
+    response = await client.get("/fila-execucao/ordem-servico/110", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    
+    await client.patch(f"/fila-execucao/{criado['fila_id']}/prioridade", json={"prioridade": "ALTA"})
+    response = await client.get(f"/fila-execucao/{criado['fila_id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["prioridade"] == "ALTA"
+    assert response.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_rota_listar_fila_com_etag(client):
+    """Testa que a versão da listagem muda com inclusões, alterações e remoções"""
+    criado = (await client.post("/fila-execucao", json={"ordem_servico_id": 120})).json()
+    
+    etags = [(await client.get("/fila-execucao")).headers["etag"]]
+    response = await client.get("/fila-execucao", headers={"If-None-Match": etags[0]})
+    assert response.status_code == 304
+    assert (await client.get("/fila-execucao", headers={"If-None-Match": "*"})).status_code == 304
+    
+    outro = (await client.post("/fila-execucao", json={"ordem_servico_id": 121})).json()
+    etags.append((await client.get("/fila-execucao")).headers["etag"])
+    
+    await client.post(f"/fila-execucao/{criado['fila_id']}/iniciar-diagnostico", json={"mecanico_responsavel_id": 1})
+    etags.append((await client.get("/fila-execucao")).headers["etag"])
+    
+    # O item transicionado ainda tem notificação no outbox; remove o outro
+    await client.delete(f"/fila-execucao/{outro['fila_id']}")
+    response = await client.get("/fila-execucao", headers={"If-None-Match": ", ".join(etags)})
+    assert response.status_code == 200
+    assert response.headers["etag"] not in etags
+    
+    # Com filtro, a versão considera só o status
+    aguardando = (await client.get("/fila-execucao", params={"status": "AGUARDANDO"})).headers["etag"]
+    await client.post("/fila-execucao", json={"ordem_servico_id": 122, "prioridade": "URGENTE"})
+    response = await client.get("/fila-execucao", params={"status": "AGUARDANDO"}, headers={"If-None-Match": aguardando})
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_rota_listar_logo_apos_escrita_le_da_primaria(client, monkeypatch):
+    """Testa que a listagem de quem acabou de escrever não vai a uma secundária"""
+    from app.modules.execucao.presentation import routes
+    
+    leituras = []
+    
+    class ConsultaRegistrada(routes.ConsultarFilaExecucaoUseCase):
+        def __init__(self, db, leitura_secundaria: bool = True):
+            leituras.append(leitura_secundaria)
+            super().__init__(db, leitura_secundaria)
+    
+    monkeypatch.setattr(routes, "ConsultarFilaExecucaoUseCase", ConsultaRegistrada)
+    
+    await client.get("/fila-execucao")
+    response = await client.post("/fila-execucao", json={"ordem_servico_id": 125})
+    escrita_em = response.headers["x-escrita-em"]
+    assert client.cookies["fila_escrita_em"] == escrita_em
+    
+    await client.get("/fila-execucao")
+    client.cookies.clear()
+    await client.get("/fila-execucao", headers={"X-Escrita-Em": escrita_em})
+    await client.get("/fila-execucao", headers={"X-Escrita-Em": str(float(escrita_em) - 3600)})
+    assert leituras == [True, False, False, True]
+
+
+@pytest.mark.asyncio
+async def test_rota_listar_fila_com_fields(client, mongodb):
+    """Testa a listagem parcial, a projeção no MongoDB e a paginação com fields"""
+    for ordem_servico_id in (130, 131, 132):
+        await client.post("/fila-execucao", json={"ordem_servico_id": ordem_servico_id})
+    await mongodb.fila_execucao.update_many({}, {"$set": {"diagnostico": "texto longo " * 100}})
+    
+    response = await client.get("/fila-execucao", params={"fields": "ordem_servico_id, status", "limit": 2})
+    assert response.status_code == 200
+    assert response.json() == [
+        {"ordem_servico_id": 130, "status": "AGUARDANDO"},
+        {"ordem_servico_id": 131, "status": "AGUARDANDO"},
+    ]
+    
+    response = await client.get("/fila-execucao", params={
+        "fields": "fila_id,ordem_servico_id", "cursor": response.headers["x-next-cursor"],
+    })
+    assert [item["ordem_servico_id"] for item in response.json()] == [132]
+    assert set(response.json()[0]) == {"fila_id", "ordem_servico_id"}
+    
+    documentos = await FilaExecucaoRepository(mongodb).listar_projetado(
+        None, {"_id": 1, "peso_prioridade": 1, "dta_criacao": 1, "status": 1}
+    )
+    assert all("diagnostico" not in documento for documento in documentos)
+    
+    response = await client.get("/fila-execucao", params={"fields": "status,senha"})
+    assert response.status_code == 400
+    assert "senha" in response.json()["detail"]
+
+    openapi = (await client.get("/openapi.json")).json()
+    schema = openapi["paths"]["/fila-execucao"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert {opcao["items"]["$ref"].rsplit("/", 1)[-1] for opcao in schema["anyOf"]} == {
+        "FilaExecucaoOutputDTO", "FilaExecucaoParcialOutputDTO",
+    }
+    assert openapi["components"]["schemas"]["FilaExecucaoParcialOutputDTO"].get("required", []) == []
+
+
+@pytest.mark.asyncio
+async def test_rota_metricas_da_fila(client, mongodb):
+    """Testa os totais, as durações médias e o reaproveitamento do resultado"""
+    inicio = datetime(2025, 1, 1, 8)
+    await mongodb.fila_execucao.insert_many([
+        {"ordem_servico_id": 150, "status": "AGUARDANDO", "prioridade": "URGENTE"},
+        {
+            "ordem_servico_id": 151, "status": "EM_REPARO", "prioridade": "NORMAL",
+            "dta_inicio_diagnostico": inicio, "dta_fim_diagnostico": inicio + timedelta(minutes=30),
+            "dta_inicio_reparo": inicio + timedelta(hours=1),
+        },
+        {
+            "ordem_servico_id": 152, "status": "FINALIZADA", "prioridade": "NORMAL",
+            "dta_inicio_diagnostico": inicio, "dta_fim_diagnostico": inicio + timedelta(minutes=90),
+            "dta_inicio_reparo": inicio + timedelta(hours=2), "dta_fim_reparo": inicio + timedelta(hours=4),
+        },
+    ])
+    
+    response = await client.get("/fila-execucao/metricas")
+    assert response.status_code == 200
+    metricas = response.json()
+    assert metricas["total"] == 3
+    assert metricas["por_status"] == {"AGUARDANDO": 1, "EM_DIAGNOSTICO": 0, "EM_REPARO": 1, "FINALIZADA": 1}
+    assert metricas["por_prioridade"] == {"BAIXA": 0, "NORMAL": 2, "ALTA": 0, "URGENTE": 1}
+    assert metricas["duracao_media_diagnostico_segundos"] == 3600
+    assert metricas["duracao_media_reparo_segundos"] == 7200
+    
+    # Dentro do TTL, o resultado é reaproveitado
+    await client.post("/fila-execucao", json={"ordem_servico_id": 153})
+    assert (await client.get("/fila-execucao/metricas")).json() == metricas
@@ -0,0 +1,214 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.modules.execucao.application.dto import (
+    FilaExecucaoCriacaoInputDTO,
+    IniciarDiagnosticoInputDTO,
+    FinalizarDiagnosticoInputDTO,
+)
+from app.modules.execucao.application.use_cases import (
+    AdicionarFilaExecucaoUseCase,
+    IniciarDiagnosticoUseCase,
+    FinalizarDiagnosticoUseCase,
+    RemoverDaFilaUseCase,
+)
+from app.core.exceptions import NotificacaoPendenteError
+from app.modules.execucao.infrastructure.notificador import NotificadorOrdemServico
+from app.modules.execucao.infrastructure.ordem_servico_client import OrdemServicoClient
+from app.modules.execucao.infrastructure.outbox import DespachanteOutbox
+
+
+class ServicoOSStub:
+    """Stub do serviço de OS que registra as chamadas e os status recebidos"""
+
+    def __init__(self, falhas: int = 0):
+        self.falhas = falhas
+        self.chamadas = 0
+        self.recebidos = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.chamadas += 1
+        if self.falhas:
+            self.falhas -= 1
+            return httpx.Response(503)
+        corpo = json.loads(request.content)
+        if request.url.path == "/ordens_servico/status/lote":
+            for atualizacao in corpo["atualizacoes"]:
+                self.recebidos.append((atualizacao["ordem_servico_id"], atualizacao["status"]))
+        else:
+            self.recebidos.append((int(request.url.path.split("/")[2]), corpo["status"]))
+        return httpx.Response(200)
+
+
+def criar_notificador(stub: ServicoOSStub) -> NotificadorOrdemServico:
+    cliente = OrdemServicoClient()
+    cliente.iniciar(transport=httpx.MockTransport(stub))
+    return NotificadorOrdemServico(client=cliente)
+
+
+def criar_despachante(stub: ServicoOSStub) -> DespachanteOutbox:
+    return DespachanteOutbox(notificador=criar_notificador(stub))
+
+
+async def diagnosticar(mongodb, ordem_servico_id: int) -> str:
+    fila = await AdicionarFilaExecucaoUseCase(mongodb).execute(
+        FilaExecucaoCriacaoInputDTO(ordem_servico_id=ordem_servico_id)
+    )
+    await IniciarDiagnosticoUseCase(mongodb).execute(fila.fila_id, IniciarDiagnosticoInputDTO(mecanico_responsavel_id=1))
+    await FinalizarDiagnosticoUseCase(mongodb).execute(fila.fila_id, FinalizarDiagnosticoInputDTO(diagnostico="ok"))
+    return fila.fila_id
+
+
+@pytest.mark.asyncio
+async def test_despachante_entrega_ultimo_status_de_cada_os(mongodb):
+    """Testa a entrega colapsada por OS e a limpeza do outbox"""
+    await diagnosticar(mongodb, 300)
+    await diagnosticar(mongodb, 301)
+
+    stub = ServicoOSStub()
+    despachante = criar_despachante(stub)
+
+    assert await despachante.processar_pendentes(mongodb) == 2
+
+    assert sorted(stub.recebidos) == [(300, "AGUARDANDO_APROVACAO"), (301, "AGUARDANDO_APROVACAO")]
+
+    documento = await mongodb.fila_execucao.find_one({"ordem_servico_id": 300})
+    assert documento["outbox"] == []
+    assert "outbox_disponivel_em" not in documento
+    assert "outbox_lease_ate" not in documento
+
+    # Nada mais a entregar
+    assert await despachante.processar_pendentes(mongodb) == 0
+
+
+@pytest.mark.asyncio
+async def test_despachante_reagenda_com_backoff_e_descarta(mongodb, monkeypatch):
+    """Testa o backoff após falha e o dead-letter ao esgotar as tentativas"""
+    monkeypatch.setattr(settings, "OUTBOX_MAX_TENTATIVAS", 2)
+    await diagnosticar(mongodb, 302)
+
+    despachante = criar_despachante(ServicoOSStub(falhas=10))
+
+    assert await despachante.processar_pendentes(mongodb) == 1
+    documento = await mongodb.fila_execucao.find_one({"ordem_servico_id": 302})
+    assert documento["outbox"][0]["tentativas"] == 1
+    assert len(documento["outbox"]) == 2
+    assert documento["outbox_disponivel_em"] > datetime.now()
+
+    # Ainda em backoff: não é reservado
+    assert await despachante.processar_pendentes(mongodb) == 0
+
+    await mongodb.fila_execucao.update_one(
+        {"ordem_servico_id": 302}, {"$set": {"outbox_disponivel_em": datetime.now() - timedelta(seconds=1)}}
+    )
+    await despachante.processar_pendentes(mongodb)
+
+    documento = await mongodb.fila_execucao.find_one({"ordem_servico_id": 302})
+    assert [evento["status"] for evento in documento["outbox_falhas"]] == ["AGUARDANDO_APROVACAO"]
+    assert documento["outbox_falhas"][0]["eventos_coalescidos"] == 2
+    assert documento["outbox"] == []
+
+
+@pytest.mark.asyncio
+async def test_despachante_respeita_lease_de_outra_replica(mongodb):
+    """Testa que um item reservado por outra réplica não é entregue em paralelo"""
+    await diagnosticar(mongodb, 303)
+    await mongodb.fila_execucao.update_one(
+        {"ordem_servico_id": 303}, {"$set": {"outbox_lease_ate": datetime.now() + timedelta(seconds=30)}}
+    )
+
+    stub = ServicoOSStub()
+    despachante = criar_despachante(stub)
+
+    assert await despachante.processar_pendentes(mongodb) == 0
+    assert stub.recebidos == []
+
+
+@pytest.mark.asyncio
+async def test_remocao_aguarda_entrega_do_outbox(client, mongodb):
+    """Testa que o item não é removido com notificações ainda não entregues à OS"""
+    fila_id = await diagnosticar(mongodb, 304)
+
+    with pytest.raises(NotificacaoPendenteError):
+        await RemoverDaFilaUseCase(mongodb).execute(fila_id)
+    response = await client.delete(f"/fila-execucao/{fila_id}")
+    assert response.status_code == 409
+    assert await mongodb.fila_execucao.count_documents({"ordem_servico_id": 304}) == 1
+
+    stub = ServicoOSStub()
+    assert await criar_despachante(stub).processar_pendentes(mongodb) == 1
+    assert stub.recebidos == [(304, "AGUARDANDO_APROVACAO")]
+
+    response = await client.delete(f"/fila-execucao/{fila_id}")
+    assert response.status_code == 204
+    response = await client.delete(f"/fila-execucao/{fila_id}")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_notificador_agrupa_rajada_em_uma_chamada(monkeypatch):
+    """Testa que uma rajada vira uma única chamada de lote com o último status por OS"""
+    monkeypatch.setattr(settings, "OS_URL_LOTE_STATUS", "/ordens_servico/status/lote")
+    stub = ServicoOSStub()
+    notificador = criar_notificador(stub)
+
+    await asyncio.gather(*(
+        notificador.notificar(ordem_servico_id, status)
+        for status in ["EM_DIAGNOSTICO", "AGUARDANDO_APROVACAO", "EM_EXECUCAO"]
+        for ordem_servico_id in range(1, 21)
+    ))
+
+    assert stub.chamadas == 1
+    assert sorted(stub.recebidos) == [(ordem_servico_id, "EM_EXECUCAO") for ordem_servico_id in range(1, 21)]
+
+
+@pytest.mark.asyncio
+async def test_notificador_sem_endpoint_de_lote_usa_patch_por_os():
+    """Testa o fallback para um PATCH por OS e a propagação de falhas"""
+    stub = ServicoOSStub(falhas=1)
+    notificador = criar_notificador(stub)
+
+    resultados = await asyncio.gather(
+        notificador.notificar(1, "EM_DIAGNOSTICO"),
+        notificador.notificar(1, "AGUARDANDO_APROVACAO"),
+        notificador.notificar(2, "EM_EXECUCAO"),
+        return_exceptions=True,
+    )
+
+    assert stub.chamadas == 2
+    # A primeira chamada (OS 1) falha; as duas notificações colapsadas recebem o erro
+    assert isinstance(resultados[0], httpx.HTTPStatusError)
+    assert isinstance(resultados[1], httpx.HTTPStatusError)
+    assert resultados[2] is None
+    assert stub.recebidos == [(2, "EM_EXECUCAO")]
+
+
+@pytest.mark.asyncio
+async def test_notificador_parar_aguarda_entregas_e_cancela_pendentes(monkeypatch):
+    """Testa que o encerramento espera a descarga em andamento e não deixa tarefas soltas"""
+    monkeypatch.setattr(settings, "OS_URL_LOTE_STATUS", "/ordens_servico/status/lote")
+    monkeypatch.setattr(settings, "OS_NOTIFICACAO_LOTE_MAXIMO", 2)
+    monkeypatch.setattr(settings, "OS_NOTIFICACAO_JANELA", 60.0)
+    stub = ServicoOSStub()
+    notificador = criar_notificador(stub)
+
+    # O lote cheio descarrega na hora; a terceira OS fica esperando a janela
+    entregas = [
+        asyncio.create_task(notificador.notificar(ordem_servico_id, "EM_DIAGNOSTICO")) for ordem_servico_id in (1, 2)
+    ]
+    await asyncio.sleep(0)
+    pendente = asyncio.create_task(notificador.notificar(3, "EM_DIAGNOSTICO"))
+    await asyncio.sleep(0)
+
+    await notificador.parar()
+
+    assert await asyncio.gather(*entregas) == [None, None]
+    with pytest.raises(asyncio.CancelledError):
+        await pendente
+    assert sorted(stub.recebidos) == [(1, "EM_DIAGNOSTICO"), (2, "EM_DIAGNOSTICO")]
+    assert not notificador._tarefas
@@ -0,0 +1,211 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.modules.execucao.infrastructure.rollup import (
+    CONTADORES_ROLLUP,
+    CONTROLE_ID,
+    RollupFilaRepository,
+    estagio_merge,
+    pipeline_rollup,
+)
+
+
+INICIO = datetime(2025, 3, 10, 8)
+
+
+def documento(ordem_servico_id: int, prioridade: str, mecanico: int | None, **datas) -> dict:
+    return {
+        "ordem_servico_id": ordem_servico_id,
+        "status": "AGUARDANDO",
+        "prioridade": prioridade,
+        "mecanico_responsavel_id": mecanico,
+        "dta_atualizacao": max(datas.values(), default=INICIO),
+        **datas,
+    }
+
+
+@pytest.mark.asyncio
+async def test_pipeline_agrega_so_eventos_da_janela(mongodb):
+    """Testa a contagem por dia/prioridade/mecânico, as durações e os limites da janela"""
+    await mongodb.fila_execucao.insert_many([
+        documento(
+            1, "NORMAL", 7,
+            dta_inicio_diagnostico=INICIO,
+            dta_fim_diagnostico=INICIO + timedelta(minutes=30),
+            dta_inicio_reparo=INICIO + timedelta(hours=1),
+            dta_fim_reparo=INICIO + timedelta(hours=3),
+        ),
+        documento(
+            2, "NORMAL", 7,
+            dta_inicio_diagnostico=INICIO + timedelta(hours=1),
+            dta_fim_diagnostico=INICIO + timedelta(hours=2),
+        ),
+        # Diagnóstico antes da janela: só o reparo, no dia seguinte, entra
+        documento(
+            3, "URGENTE", None,
+            dta_inicio_diagnostico=INICIO - timedelta(days=2),
+            dta_fim_diagnostico=INICIO - timedelta(days=2) + timedelta(hours=1),
+            dta_inicio_reparo=INICIO + timedelta(days=1),
+        ),
+        # Alterado só depois do fim da janela
+        documento(4, "BAIXA", 7, dta_inicio_diagnostico=INICIO + timedelta(days=5)),
+    ])
+
+    pipeline = pipeline_rollup(INICIO - timedelta(days=1), INICIO + timedelta(days=2))
+    grupos = await mongodb.fila_execucao.aggregate(pipeline).to_list(length=None)
+    grupos = {(grupo["dia"], grupo["prioridade"], grupo["mecanico_responsavel_id"]): grupo for grupo in grupos}
+
+    assert set(grupos) == {("2025-03-10", "NORMAL", 7), ("2025-03-11", "URGENTE", None)}
+    normal = grupos[("2025-03-10", "NORMAL", 7)]
+    assert normal["diagnosticos_iniciados"] == 2
+    assert normal["diagnosticos_finalizados"] == 2
+    assert normal["reparos_iniciados"] == 1
+    assert normal["reparos_finalizados"] == 1
+    assert normal["duracao_diagnostico_ms"] == 90 * 60 * 1000
+    assert normal["duracao_reparo_ms"] == 2 * 3600 * 1000
+    urgente = grupos[("2025-03-11", "URGENTE", None)]
+    assert (urgente["diagnosticos_iniciados"], urgente["diagnosticos_finalizados"]) == (0, 0)
+    assert urgente["reparos_iniciados"] == 1
+
+
+def test_estagio_merge_soma_so_janelas_novas():
+    """Testa o pipeline do whenMatched: janela já registrada fica como está, janela nova é somada"""
+    merge = estagio_merge("fila_execucao_rollup")["$merge"]
+    assert (merge["into"], merge["on"], merge["whenNotMatched"]) == ("fila_execucao_rollup", "_id", "insert")
+
+    [substituicao] = merge["whenMatched"]
+    ja_registrada, atual, somada = substituicao["$replaceWith"]["$cond"]
+    assert ja_registrada == {"$gte": ["$consolidado_ate", "$$new.consolidado_ate"]}
+    assert atual == "$$ROOT"
+    raiz, soma = somada["$mergeObjects"]
+    assert raiz == "$$ROOT"
+    assert soma == {
+        "consolidado_ate": "$$new.consolidado_ate",
+        **{contador: {"$add": [f"${contador}", f"$$new.{contador}"]} for contador in CONTADORES_ROLLUP},
+    }
+
+
+@pytest.mark.mongodb_real
+@pytest.mark.asyncio
+async def test_merge_repetido_nao_conta_a_janela_duas_vezes(mongodb_real):
+    """Testa o $merge em um MongoDB real: janelas somadas e repetidas sem contagem dupla"""
+    await mongodb_real.fila_execucao.insert_many([
+        documento(
+            1, "NORMAL", 7,
+            dta_inicio_diagnostico=INICIO,
+            dta_fim_diagnostico=INICIO + timedelta(minutes=30),
+        ),
+        documento(2, "NORMAL", 7, dta_inicio_diagnostico=INICIO + timedelta(hours=2)),
+    ])
+    repo = RollupFilaRepository(mongodb_real)
+    # As duas janelas dividem o mesmo dia: a segunda soma ao documento criado pela primeira
+    primeira = (INICIO - timedelta(days=1), INICIO + timedelta(hours=1))
+    segunda = (INICIO + timedelta(hours=1), INICIO + timedelta(days=1))
+
+    async def totais() -> dict:
+        [dia] = await repo.listar(date(2025, 3, 10), date(2025, 3, 10))
+        return dia
+
+    await repo._mesclar(*primeira)
+    await repo._mesclar(*primeira)
+    dia = await totais()
+    assert (dia["diagnosticos_iniciados"], dia["diagnosticos_finalizados"]) == (1, 1)
+    assert dia["duracao_diagnostico_ms"] == 30 * 60 * 1000
+
+    await repo._mesclar(*segunda)
+    await repo._mesclar(*segunda)
+    # Uma janela antiga repetida fora de ordem também não altera os totais
+    await repo._mesclar(*primeira)
+    dia = await totais()
+    assert (dia["diagnosticos_iniciados"], dia["diagnosticos_finalizados"]) == (2, 1)
+    assert dia["duracao_diagnostico_ms"] == 30 * 60 * 1000
+    documento_rollup = await mongodb_real.fila_execucao_rollup.find_one({})
+    assert documento_rollup["consolidado_ate"] == segunda[1]
+
+
+@pytest.mark.asyncio
+async def test_consolidacao_avanca_marca_dagua_e_repete_janela_interrompida(mongodb, monkeypatch):
+    """Testa o início no item mais antigo, as janelas limitadas e a retomada após uma falha no $merge"""
+    janelas = []
+    falhar = [True]
+
+    async def mesclar(self, de, ate):
+        janelas.append((de, ate))
+        if falhar[0]:
+            falhar[0] = False
+            raise RuntimeError("conexão perdida")
+
+    monkeypatch.setattr(RollupFilaRepository, "_mesclar", mesclar)
+    monkeypatch.setattr(settings, "ROLLUP_JANELA_MAXIMA_DIAS", 1)
+    repo = RollupFilaRepository(mongodb)
+
+    # Fila vazia: nada a consolidar e nenhuma marca d'água
+    assert await repo.consolidar() is False
+    assert await repo.marca_dagua() is None
+
+    criacao = (datetime.now() - timedelta(days=2, hours=12)).replace(microsecond=0)
+    await mongodb.fila_execucao.insert_many([
+        {**documento(1, "NORMAL", 7), "dta_criacao": criacao + timedelta(hours=1)},
+        {**documento(2, "NORMAL", 7), "dta_criacao": criacao},
+    ])
+
+    with pytest.raises(RuntimeError):
+        await repo.consolidar()
+    inicio = criacao - timedelta(milliseconds=1)
+    assert await repo.marca_dagua() == inicio
+
+    # A retomada usa a janela já planejada
+    assert await repo.consolidar() is True
+    assert janelas[0] == janelas[1] == (inicio, inicio + timedelta(days=1))
+    assert await repo.marca_dagua() == inicio + timedelta(days=1)
+
+    # O histórico segue janela a janela, até ROLLUP_ATRASO segundos atrás do relógio
+    assert await repo.consolidar() is True
+    assert await repo.consolidar() is True
+    assert janelas[2] == (inicio + timedelta(days=1), inicio + timedelta(days=2))
+    assert janelas[3][0] == inicio + timedelta(days=2)
+    assert janelas[3][1] <= datetime.now() - timedelta(seconds=settings.ROLLUP_ATRASO)
+
+    monkeypatch.setattr(settings, "ROLLUP_ATRASO", 0)
+    assert await repo.consolidar() is True
+    assert janelas[4][0] == janelas[3][1]
+    controle = await mongodb.fila_execucao_rollup_controle.find_one({"_id": CONTROLE_ID})
+    assert "proxima_marca" not in controle
+
+
+@pytest.mark.asyncio
+async def test_rota_rollups(client, mongodb):
+    """Testa o período, os filtros, as médias e a validação das datas"""
+    await mongodb.fila_execucao_rollup_controle.insert_one({"_id": CONTROLE_ID, "marca_dagua": INICIO})
+    contadores = {
+        "diagnosticos_iniciados": 3,
+        "diagnosticos_finalizados": 2,
+        "reparos_iniciados": 1,
+        "reparos_finalizados": 0,
+        "duracao_diagnostico_ms": 3_600_000,
+        "duracao_reparo_ms": 0,
+    }
+    await mongodb.fila_execucao_rollup.insert_many([
+        {"_id": {"dia": dia, "prioridade": prioridade, "mecanico_responsavel_id": 7},
+         "dia": dia, "prioridade": prioridade, "mecanico_responsavel_id": 7,
+         "consolidado_ate": INICIO, **contadores}
+        for dia, prioridade in [("2025-03-09", "ALTA"), ("2025-03-08", "NORMAL"), ("2025-02-01", "ALTA")]
+    ])
+
+    response = await client.get("/fila-execucao/rollups", params={"inicio": "2025-03-01", "fim": "2025-03-31"})
+    assert response.status_code == 200
+    corpo = response.json()
+    assert corpo["consolidado_ate"] == INICIO.isoformat()
+    assert [dia["dia"] for dia in corpo["dias"]] == ["2025-03-08", "2025-03-09"]
+    assert corpo["dias"][0]["duracao_media_diagnostico_segundos"] == 1800
+    assert corpo["dias"][0]["duracao_media_reparo_segundos"] is None
+
+    response = await client.get(
+        "/fila-execucao/rollups", params={"inicio": "2025-01-01", "fim": "2025-03-31", "prioridade": "ALTA"}
+    )
+    assert [dia["dia"] for dia in response.json()["dias"]] == ["2025-02-01", "2025-03-09"]
+
+    response = await client.get("/fila-execucao/rollups", params={"inicio": "2025-03-31", "fim": "2025-03-01"})
+    assert response.status_code == 400
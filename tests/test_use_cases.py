@@ -1,5 +1,8 @@
+import asyncio
+import json
+
+import httpx
 import pytest
-from unittest.mock import patch, AsyncMock
 from app.modules.execucao.application.use_cases import (
     AdicionarFilaExecucaoUseCase,
     IniciarDiagnosticoUseCase,
@@ -8,6 +11,7 @@ from app.modules.execucao.application.use_cases import (
     FinalizarReparoUseCase,
     ConsultarFilaExecucaoUseCase,
     AtualizarPrioridadeUseCase,
+    RemoverDaFilaUseCase,
 )
 from app.modules.execucao.application.dto import (
     FilaExecucaoCriacaoInputDTO,
@@ -18,9 +22,19 @@ from app.modules.execucao.application.dto import (
     AtualizarPrioridadeInputDTO,
 )
 from app.modules.execucao.domain.entities import StatusExecucao, PrioridadeExecucao
+from app.modules.execucao.infrastructure.mapper import FilaExecucaoMapper
+from app.modules.execucao.infrastructure.ordem_servico_client import OrdemServicoClient
+from app.modules.execucao.infrastructure.paginacao import codificar_cursor
+from app.modules.execucao.infrastructure.repositories import FilaExecucaoRepository
 from app.core.exceptions import FilaExecucaoNotFoundError, StatusExecucaoInvalido
 
 
+async def status_no_outbox(mongodb, ordem_servico_id: int) -> list[str]:
+    """Status de OS que aguardam entrega no outbox do item"""
+    documento = await mongodb.fila_execucao.find_one({"ordem_servico_id": ordem_servico_id})
+    return [evento["status"] for evento in documento.get("outbox", [])]
+
+
 @pytest.mark.asyncio
 async def test_adicionar_fila_execucao_use_case(mongodb):
     """Testa o caso de uso de adicionar uma OS à fila"""
@@ -64,20 +78,15 @@ async def test_iniciar_diagnostico_use_case(mongodb):
     use_case_criar = AdicionarFilaExecucaoUseCase(mongodb)
     fila = await use_case_criar.execute(dados_criacao)
     
-    # Mock httpx AsyncClient
-    with patch('httpx.AsyncClient') as mock_client:
-        mock_response = AsyncMock()
-        mock_response.status_code = 200
-        mock_client.return_value.__aenter__.return_value.patch = AsyncMock(return_value=mock_response)
-        
-        # Iniciar diagnóstico
-        dados_diagnostico = IniciarDiagnosticoInputDTO(mecanico_responsavel_id=1)
-        use_case_diagnostico = IniciarDiagnosticoUseCase(mongodb)
-        resultado = await use_case_diagnostico.execute(fila.fila_id, dados_diagnostico)
-        
-        assert resultado.status == StatusExecucao.EM_DIAGNOSTICO
-        assert resultado.mecanico_responsavel_id == 1
-        assert resultado.dta_inicio_diagnostico is not None
+    # Iniciar diagnóstico
+    dados_diagnostico = IniciarDiagnosticoInputDTO(mecanico_responsavel_id=1)
+    use_case_diagnostico = IniciarDiagnosticoUseCase(mongodb)
+    resultado = await use_case_diagnostico.execute(fila.fila_id, dados_diagnostico)
+    
+    assert resultado.status == StatusExecucao.EM_DIAGNOSTICO
+    assert resultado.mecanico_responsavel_id == 1
+    assert resultado.dta_inicio_diagnostico is not None
+    assert await status_no_outbox(mongodb, 102) == ['EM_DIAGNOSTICO']
 
 
 @pytest.mark.asyncio
@@ -91,18 +100,16 @@ async def test_iniciar_diagnostico_status_invalido(mongodb):
     use_case_criar = AdicionarFilaExecucaoUseCase(mongodb)
     fila = await use_case_criar.execute(dados_criacao)
     
-    with patch('httpx.AsyncClient') as mock_client:
-        mock_response = AsyncMock()
-        mock_response.status_code = 200
-        mock_client.return_value.__aenter__.return_value.patch = AsyncMock(return_value=mock_response)
-        
-        dados_diagnostico = IniciarDiagnosticoInputDTO(mecanico_responsavel_id=1)
-        use_case_diagnostico = IniciarDiagnosticoUseCase(mongodb)
-        await use_case_diagnostico.execute(fila.fila_id, dados_diagnostico)
+    dados_diagnostico = IniciarDiagnosticoInputDTO(mecanico_responsavel_id=1)
+    use_case_diagnostico = IniciarDiagnosticoUseCase(mongodb)
+    await use_case_diagnostico.execute(fila.fila_id, dados_diagnostico)
     
     # Tentar iniciar novamente (já está em diagnóstico)
     with pytest.raises(StatusExecucaoInvalido):
         await use_case_diagnostico.execute(fila.fila_id, dados_diagnostico)
+    
+    # A transição recusada não notifica a OS
+    assert await status_no_outbox(mongodb, 103) == ['EM_DIAGNOSTICO']
 
 
 @pytest.mark.asyncio
@@ -116,25 +123,21 @@ async def test_finalizar_diagnostico_use_case(mongodb):
     use_case_criar = AdicionarFilaExecucaoUseCase(mongodb)
     fila = await use_case_criar.execute(dados_criacao)
     
-    with patch('httpx.AsyncClient') as mock_client:
-        mock_response = AsyncMock()
-        mock_response.status_code = 200
-        mock_client.return_value.__aenter__.return_value.patch = AsyncMock(return_value=mock_response)
-        
-        dados_iniciar = IniciarDiagnosticoInputDTO(mecanico_responsavel_id=1)
-        use_case_iniciar = IniciarDiagnosticoUseCase(mongodb)
-        await use_case_iniciar.execute(fila.fila_id, dados_iniciar)
-        
-        # Finalizar diagnóstico
-        dados_finalizar = FinalizarDiagnosticoInputDTO(
-            diagnostico="Problema identificado no motor"
-        )
-        use_case_finalizar = FinalizarDiagnosticoUseCase(mongodb)
-        resultado = await use_case_finalizar.execute(fila.fila_id, dados_finalizar)
-        
-        assert resultado.status == StatusExecucao.AGUARDANDO
-        assert resultado.diagnostico == "Problema identificado no motor"
-        assert resultado.dta_fim_diagnostico is not None
+    dados_iniciar = IniciarDiagnosticoInputDTO(mecanico_responsavel_id=1)
+    use_case_iniciar = IniciarDiagnosticoUseCase(mongodb)
+    await use_case_iniciar.execute(fila.fila_id, dados_iniciar)
+    
+    # Finalizar diagnóstico
+    dados_finalizar = FinalizarDiagnosticoInputDTO(
+        diagnostico="Problema identificado no motor"
+    )
+    use_case_finalizar = FinalizarDiagnosticoUseCase(mongodb)
+    resultado = await use_case_finalizar.execute(fila.fila_id, dados_finalizar)
+    
+    assert resultado.status == StatusExecucao.AGUARDANDO
+    assert resultado.diagnostico == "Problema identificado no motor"
+    assert resultado.dta_fim_diagnostico is not None
+    assert await status_no_outbox(mongodb, 104) == ['EM_DIAGNOSTICO', 'AGUARDANDO_APROVACAO']
 
 
 @pytest.mark.asyncio
@@ -148,19 +151,15 @@ async def test_iniciar_reparo_use_case(mongodb):
     use_case_criar = AdicionarFilaExecucaoUseCase(mongodb)
     fila = await use_case_criar.execute(dados_criacao)
     
-    with patch('httpx.AsyncClient') as mock_client:
-        mock_response = AsyncMock()
-        mock_response.status_code = 200
-        mock_client.return_value.__aenter__.return_value.patch = AsyncMock(return_value=mock_response)
-        
-        # Iniciar reparo
-        dados_reparo = IniciarReparoInputDTO(mecanico_responsavel_id=2)
-        use_case_reparo = IniciarReparoUseCase(mongodb)
-        resultado = await use_case_reparo.execute(fila.fila_id, dados_reparo)
-        
-        assert resultado.status == StatusExecucao.EM_REPARO
-        assert resultado.mecanico_responsavel_id == 2
-        assert resultado.dta_inicio_reparo is not None
+    # Iniciar reparo
+    dados_reparo = IniciarReparoInputDTO(mecanico_responsavel_id=2)
+    use_case_reparo = IniciarReparoUseCase(mongodb)
+    resultado = await use_case_reparo.execute(fila.fila_id, dados_reparo)
+    
+    assert resultado.status == StatusExecucao.EM_REPARO
+    assert resultado.mecanico_responsavel_id == 2
+    assert resultado.dta_inicio_reparo is not None
+    assert await status_no_outbox(mongodb, 105) == ['EM_EXECUCAO']
 
 
 @pytest.mark.asyncio
@@ -189,3 +188,161 @@ async def test_atualizar_prioridade_use_case(mongodb):
     resultado = await use_case_prioridade.execute(fila.fila_id, dados_prioridade)
     
     assert resultado.prioridade == PrioridadeExecucao.URGENTE
+
+
+@pytest.mark.asyncio
+async def test_transicao_registra_notificacao_no_outbox(mongodb):
+    """Testa que a transição grava a notificação da OS sem chamar o serviço"""
+    use_case_criar = AdicionarFilaExecucaoUseCase(mongodb)
+    fila = await use_case_criar.execute(FilaExecucaoCriacaoInputDTO(ordem_servico_id=107))
+    
+    use_case = IniciarDiagnosticoUseCase(mongodb)
+    await use_case.execute(fila.fila_id, IniciarDiagnosticoInputDTO(mecanico_responsavel_id=3))
+    
+    documento = await mongodb.fila_execucao.find_one({"ordem_servico_id": 107})
+    assert [evento["status"] for evento in documento["outbox"]] == ['EM_DIAGNOSTICO']
+    assert documento["outbox_disponivel_em"] is not None
+
+
+@pytest.mark.asyncio
+async def test_ordem_servico_client_reaproveita_pool():
+    """Testa o PATCH no serviço de OS e a propagação de falhas"""
+    requisicoes = []
+    
+    def responder(request: httpx.Request) -> httpx.Response:
+        requisicoes.append(request)
+        if request.url.path.endswith("/2/status"):
+            raise httpx.ConnectError("serviço indisponível")
+        if request.url.path.endswith("/3/status"):
+            return httpx.Response(503)
+        return httpx.Response(200)
+    
+    cliente = OrdemServicoClient()
+    cliente.iniciar(transport=httpx.MockTransport(responder))
+    pool = cliente.client
+    try:
+        await cliente.atualizar_status(1, 'EM_DIAGNOSTICO')
+        with pytest.raises(httpx.ConnectError):
+            await cliente.atualizar_status(2, 'FINALIZADA')
+        with pytest.raises(httpx.HTTPStatusError):
+            await cliente.atualizar_status(3, 'FINALIZADA')
+        
+        assert cliente.client is pool
+        assert [r.method for r in requisicoes] == ["PATCH", "PATCH", "PATCH"]
+        assert requisicoes[0].url.path == "/ordens_servico/1/status"
+        assert json.loads(requisicoes[0].content) == {"status": "EM_DIAGNOSTICO"}
+    finally:
+        await cliente.fechar()
+    
+    assert cliente.client is None
+
+
+@pytest.mark.asyncio
+async def test_ordem_servico_client_aquecer_abre_conexao():
+    """Testa que qualquer resposta conta como conectado e falhas de conexão propagam"""
+    disponivel = [False]
+    
+    def responder(request: httpx.Request) -> httpx.Response:
+        if not disponivel[0]:
+            raise httpx.ConnectError("serviço indisponível")
+        return httpx.Response(404)
+    
+    cliente = OrdemServicoClient()
+    cliente.iniciar(transport=httpx.MockTransport(responder))
+    try:
+        with pytest.raises(httpx.ConnectError):
+            await cliente.aquecer()
+        disponivel[0] = True
+        await cliente.aquecer()
+    finally:
+        await cliente.fechar()
+
+
+@pytest.mark.asyncio
+async def test_transicoes_concorrentes_apenas_uma_vence(mongodb):
+    """Testa que duas transições simultâneas do mesmo item não são ambas aplicadas"""
+    fila = await AdicionarFilaExecucaoUseCase(mongodb).execute(FilaExecucaoCriacaoInputDTO(ordem_servico_id=108))
+    
+    use_case = IniciarDiagnosticoUseCase(mongodb)
+    resultados = await asyncio.gather(
+        use_case.execute(fila.fila_id, IniciarDiagnosticoInputDTO(mecanico_responsavel_id=1)),
+        use_case.execute(fila.fila_id, IniciarDiagnosticoInputDTO(mecanico_responsavel_id=2)),
+        return_exceptions=True,
+    )
+    
+    sucessos = [r for r in resultados if not isinstance(r, Exception)]
+    erros = [r for r in resultados if isinstance(r, Exception)]
+    assert len(sucessos) == 1
+    assert len(erros) == 1 and isinstance(erros[0], StatusExecucaoInvalido)
+    
+    documento = await mongodb.fila_execucao.find_one({"ordem_servico_id": 108})
+    assert documento["mecanico_responsavel_id"] == sucessos[0].mecanico_responsavel_id
+    assert len(documento["outbox"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_transicao_altera_apenas_campos_da_transicao(mongodb):
+    """Testa que a transição não sobrescreve campos que ela não altera"""
+    fila = await AdicionarFilaExecucaoUseCase(mongodb).execute(FilaExecucaoCriacaoInputDTO(ordem_servico_id=109))
+    
+    # Alteração feita por outra requisição entre a leitura e a transição
+    await mongodb.fila_execucao.update_one(
+        {"ordem_servico_id": 109}, {"$set": {"prioridade": "URGENTE", "peso_prioridade": 4}}
+    )
+    
+    resultado = await IniciarReparoUseCase(mongodb).execute(fila.fila_id, IniciarReparoInputDTO())
+    
+    assert resultado.status == StatusExecucao.EM_REPARO
+    assert resultado.prioridade == PrioridadeExecucao.URGENTE
+    assert resultado.mecanico_responsavel_id is None
+
+
+@pytest.mark.asyncio
+async def test_transicao_e_remocao_de_item_inexistente(mongodb):
+    """Testa o 404 de transição e remoção para itens que não existem"""
+    with pytest.raises(FilaExecucaoNotFoundError):
+        await FinalizarReparoUseCase(mongodb).execute("507f1f77bcf86cd799439011", FinalizarReparoInputDTO())
+    
+    with pytest.raises(FilaExecucaoNotFoundError):
+        await AtualizarPrioridadeUseCase(mongodb).execute(
+            "id-invalido", AtualizarPrioridadeInputDTO(prioridade=PrioridadeExecucao.ALTA)
+        )
+    
+    with pytest.raises(FilaExecucaoNotFoundError):
+        await RemoverDaFilaUseCase(mongodb).execute("507f1f77bcf86cd799439011")
+
+
+@pytest.mark.asyncio
+async def test_paginado_json_igual_ao_dos_dtos(mongodb):
+    """Testa que o caminho rápido gera o mesmo JSON e o mesmo cursor dos DTOs"""
+    adicionar = AdicionarFilaExecucaoUseCase(mongodb)
+    for ordem_servico_id, prioridade in [(140, "BAIXA"), (141, "URGENTE"), (142, "NORMAL")]:
+        await adicionar.execute(FilaExecucaoCriacaoInputDTO(ordem_servico_id=ordem_servico_id, prioridade=prioridade))
+    await mongodb.fila_execucao.update_one({"ordem_servico_id": 142}, {"$set": {"diagnostico": "ação – çã"}})
+    
+    # Referência: entidades e DTOs, um item a mais para saber se há próxima página
+    filas = await FilaExecucaoRepository(mongodb).listar_todas(3)
+    itens = [FilaExecucaoMapper.entity_to_output_dto(fila).model_dump(mode="json") for fila in filas[:2]]
+    pagina_json = await ConsultarFilaExecucaoUseCase(mongodb).execute_paginado_json(None, 2)
+    
+    assert json.loads(pagina_json.conteudo) == itens
+    assert pagina_json.next_cursor == codificar_cursor(filas[1])
+
+
+@pytest.mark.asyncio
+async def test_paginado_json_nao_serializa_versao_conhecida(mongodb, monkeypatch):
+    """Testa que a página já conhecida pelo cliente (ou If-None-Match: *) não é serializada"""
+    from app.modules.execucao.application import use_cases
+    
+    await AdicionarFilaExecucaoUseCase(mongodb).execute(FilaExecucaoCriacaoInputDTO(ordem_servico_id=150))
+    consulta = ConsultarFilaExecucaoUseCase(mongodb)
+    versao = (await consulta.execute_paginado_json(None, 10)).versao
+    
+    def serializar(*args):
+        raise AssertionError("página serializada para um 304")
+    
+    monkeypatch.setattr(use_cases, "documentos_to_json", serializar)
+    for versoes in ({versao}, {"*"}):
+        pagina = await consulta.execute_paginado_json(None, 10, versoes_conhecidas=versoes)
+        assert pagina.conteudo is None
+        assert pagina.versao == versao
@@ -0,0 +1,199 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.core.config import settings
+from app.modules.execucao.application.dto import TipoEventoFila
+from app.modules.execucao.application.use_cases import ConsultarFilaExecucaoUseCase
+from app.modules.execucao.domain.entities import FilaExecucao, StatusExecucao, PrioridadeExecucao
+from app.modules.execucao.infrastructure.eventos import publicador_eventos_fila
+from app.modules.execucao.infrastructure.mapper import FilaExecucaoMapper
+from app.modules.execucao.infrastructure.paginacao import codificar_cursor
+from app.modules.execucao.infrastructure.repositories import FilaExecucaoRepository
+from app.modules.execucao.infrastructure.visao_fila import VisaoFilaExecucao, visao_fila_execucao
+
+
+class ChangeStreamStub:
+    def __init__(self):
+        self.eventos: asyncio.Queue = asyncio.Queue()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        evento = await self.eventos.get()
+        if isinstance(evento, Exception):
+            raise evento
+        return evento
+
+
+class ColecaoReplicaSetStub:
+    """Coleção mongomock que publica suas escritas em um change stream, como um replica set"""
+
+    def __init__(self, colecao):
+        self.colecao = colecao
+        self.streams: list[ChangeStreamStub] = []
+
+    def find(self, *args, **kwargs):
+        return self.colecao.find(*args, **kwargs)
+
+    def watch(self, full_document: str | None = None) -> ChangeStreamStub:
+        stream = ChangeStreamStub()
+        self.streams.append(stream)
+        return stream
+
+    async def insert_one(self, document: dict) -> None:
+        result = await self.colecao.insert_one(document)
+        await self._publicar("insert", result.inserted_id)
+
+    async def update_one(self, filtro: dict, update: dict) -> None:
+        document = await self.colecao.find_one_and_update(filtro, update)
+        await self._publicar("update", document["_id"])
+
+    async def delete_one(self, filtro: dict) -> None:
+        document = await self.colecao.find_one_and_delete(filtro)
+        await self._publicar("delete", document["_id"])
+
+    def derrubar_stream(self) -> None:
+        self.streams[-1].eventos.put_nowait(RuntimeError("conexão perdida"))
+
+    async def _publicar(self, operacao: str, document_id) -> None:
+        evento = {"operationType": operacao, "documentKey": {"_id": document_id}}
+        if operacao != "delete":
+            evento["fullDocument"] = await self.colecao.find_one({"_id": document_id})
+        for stream in self.streams:
+            stream.eventos.put_nowait(evento)
+        # Deixa a visão consumir o evento
+        await asyncio.sleep(0.01)
+
+
+def documento(ordem_servico_id: int, prioridade: PrioridadeExecucao, minuto: int) -> dict:
+    return FilaExecucaoMapper.entity_to_document(FilaExecucao(
+        fila_id=None,
+        ordem_servico_id=ordem_servico_id,
+        status=StatusExecucao.AGUARDANDO,
+        prioridade=prioridade,
+        dta_criacao=datetime(2025, 1, 1, 8, minuto),
+        dta_atualizacao=datetime(2025, 1, 1, 8, minuto),
+    ))
+
+
+async def iniciar_visao(mongodb) -> tuple[VisaoFilaExecucao, ColecaoReplicaSetStub]:
+    colecao = ColecaoReplicaSetStub(mongodb.fila_execucao)
+    visao = VisaoFilaExecucao()
+    visao.iniciar(colecao)
+    await asyncio.sleep(0.01)
+    return visao, colecao
+
+
+def ordens_servico(filas: list[FilaExecucao]) -> list[int]:
+    return [fila.ordem_servico_id for fila in filas]
+
+
+@pytest.mark.asyncio
+async def test_visao_carrega_e_acompanha_o_change_stream(mongodb):
+    """Testa a carga inicial, a ordenação por status e a aplicação dos eventos"""
+    await mongodb.fila_execucao.insert_many([
+        documento(1, PrioridadeExecucao.NORMAL, 0),
+        documento(2, PrioridadeExecucao.URGENTE, 1),
+    ])
+    visao, colecao = await iniciar_visao(mongodb)
+    
+    assert visao.pronta
+    assert ordens_servico(visao.listar()) == [2, 1]
+    
+    assinatura = publicador_eventos_fila.assinar()
+    await colecao.insert_one(documento(3, PrioridadeExecucao.ALTA, 2))
+    await colecao.update_one({"ordem_servico_id": 1}, {"$set": {"status": "EM_DIAGNOSTICO"}})
+    # Só campos internos: não gera evento no feed
+    await colecao.update_one({"ordem_servico_id": 1}, {"$set": {"outbox": []}})
+    await colecao.delete_one({"ordem_servico_id": 2})
+    
+    eventos = []
+    while not assinatura.empty():
+        eventos.append(assinatura.get_nowait().tipo)
+    publicador_eventos_fila.cancelar(assinatura)
+    assert eventos == [TipoEventoFila.ADICIONADO, TipoEventoFila.TRANSICIONADO, TipoEventoFila.REMOVIDO]
+    
+    assert ordens_servico(visao.listar()) == [3, 1]
+    assert ordens_servico(visao.listar(StatusExecucao.AGUARDANDO)) == [3]
+    assert ordens_servico(visao.listar(StatusExecucao.EM_DIAGNOSTICO)) == [1]
+    
+    await visao.parar()
+
+
+@pytest.mark.asyncio
+async def test_visao_pagina_como_o_repositorio(mongodb):
+    """Testa que limite e cursor seguem a mesma ordenação da consulta ao MongoDB"""
+    await mongodb.fila_execucao.insert_many([
+        documento(ordem_servico_id, prioridade, ordem_servico_id)
+        for ordem_servico_id, prioridade in enumerate(
+            [PrioridadeExecucao.BAIXA, PrioridadeExecucao.URGENTE, PrioridadeExecucao.NORMAL] * 3
+        )
+    ])
+    visao, _ = await iniciar_visao(mongodb)
+    
+    pagina = visao.listar(limite=4)
+    seguinte = visao.listar(limite=4, cursor=codificar_cursor(pagina[-1]))
+    
+    await visao.parar()
+    esperado = await FilaExecucaoRepository(mongodb).listar_todas()
+    assert ordens_servico(pagina + seguinte) == ordens_servico(esperado)[:8]
+
+
+@pytest.mark.asyncio
+async def test_consulta_volta_ao_mongodb_se_o_stream_cair(mongodb, monkeypatch):
+    """Testa o fallback para o MongoDB durante a queda do change stream e a recarga"""
+    monkeypatch.setattr(settings, "VISAO_FILA_RECONEXAO", 0.05)
+    await mongodb.fila_execucao.insert_one(documento(10, PrioridadeExecucao.NORMAL, 0))
+    colecao = ColecaoReplicaSetStub(mongodb.fila_execucao)
+    visao_fila_execucao.iniciar(colecao)
+    await asyncio.sleep(0.01)
+    consulta = ConsultarFilaExecucaoUseCase(mongodb)
+    
+    try:
+        assert [item.ordem_servico_id for item in await consulta.execute_listar_todas()] == [10]
+        
+        colecao.derrubar_stream()
+        await asyncio.sleep(0.01)
+        assert not visao_fila_execucao.pronta
+        # Escrita não publicada pela visão: só o MongoDB a enxerga
+        await mongodb.fila_execucao.insert_one(documento(11, PrioridadeExecucao.URGENTE, 1))
+        assert [item.ordem_servico_id for item in await consulta.execute_listar_todas()] == [11, 10]
+        
+        await asyncio.sleep(0.1)
+        assert visao_fila_execucao.pronta
+        assert ordens_servico(visao_fila_execucao.listar(StatusExecucao.AGUARDANDO)) == [11, 10]
+    finally:
+        await visao_fila_execucao.parar()
+
+
+@pytest.mark.asyncio
+async def test_versao_da_pagina_igual_na_visao_e_no_mongodb(mongodb):
+    """Testa que a visão e o MongoDB geram o mesmo ETag para a mesma página"""
+    await mongodb.fila_execucao.insert_many([
+        documento(ordem_servico_id, PrioridadeExecucao.NORMAL, ordem_servico_id) for ordem_servico_id in range(5)
+    ])
+    consulta = ConsultarFilaExecucaoUseCase(mongodb)
+    pelo_mongodb = await consulta.execute_paginado_json(None, 3)
+    
+    colecao = ColecaoReplicaSetStub(mongodb.fila_execucao)
+    visao_fila_execucao.iniciar(colecao)
+    await asyncio.sleep(0.01)
+    try:
+        assert visao_fila_execucao.pronta
+        pela_visao = await consulta.execute_paginado_json(None, 3)
+        assert pela_visao.versao == pelo_mongodb.versao
+        assert pela_visao.next_cursor == pelo_mongodb.next_cursor
+        
+        await colecao.update_one({"ordem_servico_id": 1}, {"$set": {"dta_atualizacao": datetime(2025, 1, 2)}})
+        assert (await consulta.execute_paginado_json(None, 3)).versao != pelo_mongodb.versao
+    finally:
+        await visao_fila_execucao.parar()